@@ -0,0 +1,439 @@
+"""Benchmarks for the parsing, update, formatting and drawing hot paths.
+
+Everything runs offline on synthetic payloads (or a recorded archive, see
+footballscores.replay) so results can be compared between commits:
+
+    python benchmarks/bench.py --save       # save a baseline
+    python benchmarks/bench.py --compare    # fail if anything regressed
+
+Each benchmark reports the median time per call over several runs and the
+peak memory allocated by one call. When comparing, benchmarks which look
+slower are run again and only fail if the median of all their runs is
+still worse than the baseline by more than the threshold and the noise
+floor.
+"""
+import argparse
+import copy
+import gc
+import json
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "livefootballscores"))
+
+from footballscores import FootballMatch, League  # noqa: E402
+from footballscores.matchdict import MatchDict  # noqa: E402
+from footballscores.snapshot import MatchSnapshot  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_RUNS = 5
+
+# Differences smaller than these are treated as noise
+NOISE_FLOOR = 0.5e-6
+MEMORY_FLOOR = 1024
+
+INFO_TEXT = ["{T:^12}", "{H:.3}: {G:10}", "{A:.3}: {g:10}", "{C}"]
+STATUS_TEXT = "{H:.3} {h}-{a} {A:.3}"
+
+
+# Synthetic data
+
+def makeAction(player, action_type, minute):
+    return {"name": {"full": player, "abbreviation": player[:8],
+                     "first": player.split()[0], "last": player.split()[-1]},
+            "actions": [{"type": action_type,
+                         "displayTime": "{}'".format(minute),
+                         "timeElapsed": minute, "addedTime": 0,
+                         "ownGoal": False, "penalty": minute % 7 == 0}]}
+
+
+def makeTeam(name, score, actions):
+    return {"name": {"full": name, "first": name, "last": name,
+                     "abbreviation": name[:3].upper()},
+            "scores": {"score": score},
+            "playerActions": actions}
+
+
+def makeEvent(i, goals=2, slug="premier-league"):
+    home = [makeAction("Home Player {}".format(g % 3), "goal", 10 + g * 17)
+            for g in range(goals)]
+    away = [makeAction("Away Player", "red-card", 55)]
+
+    return {"eventKey": "EFBO{:06d}".format(i),
+            "homeTeam": makeTeam("Home Team {}".format(i), goals, home),
+            "awayTeam": makeTeam("Away Team {}".format(i), 0, away),
+            "tournamentSlug": slug,
+            "tournamentName": {"full": "Premier League"},
+            "eventStatus": "mid-event",
+            "eventStatusNote": "",
+            "eventProgress": {"period": "SECONDHALF"},
+            "minutesElapsed": 70,
+            "minutesIntoAddedTime": 0,
+            "venue": {"name": {"full": "Stadium {}".format(i)}},
+            "startTime": "2020-01-01T15:00:00+00:00",
+            "startTimeInUKHHMM": "15:00"}
+
+
+def changed(event):
+    '''Returns a copy of the event with an extra goal.'''
+    event = copy.deepcopy(event)
+    home = event["homeTeam"]
+    home["scores"]["score"] += 1
+    home["playerActions"].append(makeAction("Late Scorer", "goal", 89))
+    return event
+
+
+def loadArchive(path):
+    '''Returns the events from the largest match list in a recorded
+    archive.'''
+    from footballscores.base import iterEvents
+    from footballscores.replay import ReplayArchive
+
+    archive = ReplayArchive(path)
+    best = []
+
+    for method, key in archive.requests:
+        if "match-list-data" not in key:
+            continue
+
+        for rec in archive._responses[(method, key)]:
+            try:
+                events = list(iterEvents(json.loads(rec["b"])))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            if len(events) > len(best):
+                best = events
+
+    return best
+
+
+# Benchmarks
+
+class Benchmarks(object):
+
+    def __init__(self, events):
+        self.events = events
+        self.event = events[0]
+        self.event2 = changed(self.event)
+        self.cases = []
+        self.skipped = {}
+
+    def add(self, name, func):
+        self.cases.append((name, func))
+
+    def skip(self, names, reason):
+        self.skipped.update((name, reason) for name in names)
+
+    def setup(self):
+        self._matchdict()
+        self._match()
+        self._events()
+        self._format()
+        self._league()
+        self._widget()
+
+    def _matchdict(self):
+        event, event2 = self.event, self.event2
+        md = MatchDict(event, add_callbacks=True)
+        toggle = [event, event2]
+
+        def update():
+            toggle.reverse()
+            md.update(toggle[0])
+
+        self.add("matchdict.construct", lambda: MatchDict(event))
+        self.add("matchdict.update.nochange", lambda: md.update(event2))
+        self.add("matchdict.update.change", update)
+        self.add("snapshot.parse", lambda: MatchSnapshot(event))
+
+    def _match(self):
+        event, event2 = self.event, self.event2
+        m = FootballMatch("Home Team 0", data=event)
+        toggle = [event, event2]
+
+        def update():
+            toggle.reverse()
+            m.update(data=toggle[0])
+
+        self.add("footballmatch.update.nochange",
+                 lambda: m.update(data=event))
+        self.add("footballmatch.update.change", update)
+
+    def _events(self):
+        m = FootballMatch("Home Team 0", data=self.event2)
+        team = m.snapshot.homeTeam
+
+        self.add("events.getEvents",
+                 lambda: m._getEvents(team, m.ACTION_GOAL))
+        self.add("events.grouped",
+                 lambda: m._groupedEvents(m.HomeScorers))
+        self.add("events.format", lambda: m._formatEvents(m.HomeScorers))
+        self.add("events.lastRed", lambda: m.LastRedCard)
+
+    def _format(self):
+        m = FootballMatch("Home Team 0", data=self.event2)
+
+        def cold():
+            # Pretend the match changed so nothing is cached
+            m.revision += 1
+            return [m.formatText(t) for t in INFO_TEXT]
+
+        self.add("formatText.status", lambda: m.formatText(STATUS_TEXT))
+        self.add("formatText.info", lambda: [m.formatText(t)
+                                             for t in INFO_TEXT])
+        self.add("formatText.cold", cold)
+
+    def _league(self):
+        for size in (20, 200, 2000):
+            events = [dict(e, eventKey="{}-{}".format(e["eventKey"], i))
+                      for i, e in enumerate(
+                          (self.events * (size // len(self.events) + 1))
+                          [:size])]
+
+            # A tenth of the matches change on each update
+            events2 = [changed(e) if i % 10 == 0 else e
+                       for i, e in enumerate(events)]
+
+            lg = League("Premier League", data=events)
+            toggle = [events, events2]
+
+            def update(lg=lg, toggle=toggle):
+                toggle.reverse()
+                lg.update(data=toggle[0])
+
+            self.add("league.update.{}".format(size), update)
+
+    def _widget(self):
+        try:
+            widget = StubWidget.create(self.event2)
+        except (ImportError, OSError) as e:
+            self.skip(["widget.calculate_length", "widget.draw"], str(e))
+            return
+
+        self.add("widget.calculate_length", widget.calculate_length)
+        self.add("widget.draw", widget.draw)
+
+
+class StubLayout(object):
+
+    def __init__(self, text):
+        self.text = text
+        self.height = 12
+
+    @property
+    def width(self):
+        return 7 * len(self.text)
+
+    def draw(self, x, y):
+        pass
+
+    def finalize(self):
+        pass
+
+
+class StubDrawer(object):
+    '''Stands in for qtile's Drawer so that drawing can be timed without an
+    X server.'''
+
+    def textlayout(self, text, colour, font, fontsize, fontshadow,
+                   wrap=True):
+        return StubLayout(text)
+
+    def max_layout_size(self, texts, font, fontsize):
+        sizes = [StubLayout(t) for t in texts]
+        return max(s.width for s in sizes), max(s.height for s in sizes)
+
+    def clear(self, colour):
+        pass
+
+    def set_source_rgb(self, colour):
+        pass
+
+    def fillrect(self, *args):
+        pass
+
+    def draw(self, *args, **kwargs):
+        pass
+
+
+class StubBar(object):
+    horizontal = True
+    height = 24
+    width = 1920
+    background = "000000"
+
+    def draw(self):
+        pass
+
+
+class StubWidget(object):
+
+    @staticmethod
+    def create(event):
+        from livefootballscores.livefootballscores import (
+            LiveFootballScoresWidget, MatchFlags)
+
+        widget = LiveFootballScoresWidget()
+        widget.drawer = StubDrawer()
+        widget.bar = StubBar()
+        widget.offsetx = 0
+        widget.offsety = 0
+
+        m = FootballMatch("Home Team 0", data=event)
+        widget.matches = [m]
+        widget.flags = {m.HomeTeam: MatchFlags()}
+
+        return widget
+
+
+# Running and comparing
+
+def measure(func, repeat=DEFAULT_RUNS):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"time": statistics.median(times), "times": times, "peak": peak}
+
+
+def _worse(new, old, threshold, floor):
+    return new > old * (1 + threshold) and new - old > floor
+
+
+def compare(results, baseline, threshold):
+    '''Returns a list of (name, field, old, new) for every result that is
+    worse than the baseline by more than threshold and the noise floor.'''
+    regressions = []
+
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+
+        if _worse(result["time"], old["time"], threshold, NOISE_FLOOR):
+            regressions.append((name, "time", old["time"], result["time"]))
+
+        # Ignore tiny changes in memory e.g. from interning
+        if _worse(result["peak"], old["peak"], threshold, MEMORY_FLOOR):
+            regressions.append((name, "peak", old["peak"], result["peak"]))
+
+    return regressions
+
+
+def confirm(bench, results, regressions, runs):
+    '''Runs benchmarks which look slower again, runs times, and replaces
+    their time with the median of every run.'''
+    cases = dict(bench.cases)
+
+    for name in sorted(set(r[0] for r in regressions if r[1] == "time")):
+        times = list(results[name]["times"])
+
+        for _ in range(runs):
+            times.extend(measure(cases[name])["times"])
+
+        results[name]["times"] = times
+        results[name]["time"] = statistics.median(times)
+
+
+def formatRow(name, result, old=None):
+    row = "{:32} {:>12.2f}us {:>10.1f}KB".format(name,
+                                                 result["time"] * 1e6,
+                                                 result["peak"] / 1024)
+    if old:
+        row += " {:>+8.0%}".format(result["time"] / old["time"] - 1)
+
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("filter", nargs="*",
+                        help="Only run benchmarks starting with these names")
+    parser.add_argument("--archive",
+                        help="Use events from a recorded archive")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true",
+                        help="Save the results as the baseline")
+    parser.add_argument("--compare", action="store_true",
+                        help="Fail if results are worse than the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed regression e.g. 0.25 for 25%%")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help="Extra runs for benchmarks which look slower")
+    args = parser.parse_args(argv)
+
+    events = loadArchive(args.archive) if args.archive else []
+    if not events:
+        events = [makeEvent(i, goals=i % 4) for i in range(20)]
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    bench = Benchmarks(events)
+    bench.setup()
+
+    def wanted(name):
+        return not args.filter or any(name.startswith(f)
+                                      for f in args.filter)
+
+    results = {}
+
+    for name, func in bench.cases:
+        if wanted(name):
+            results[name] = measure(func)
+            print(formatRow(name, results[name], baseline.get(name)))
+
+    for name, reason in sorted(bench.skipped.items()):
+        if wanted(name):
+            print("{:32} skipped: {}".format(name, reason))
+
+    if args.save:
+        baseline.update({name: {"time": r["time"], "peak": r["peak"]}
+                         for name, r in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+
+        print("Saved baseline to {}".format(args.baseline))
+
+    if args.compare:
+        regressions = compare(results, baseline, args.threshold)
+
+        if regressions:
+            confirm(bench, results, regressions, args.runs)
+            regressions = compare(results, baseline, args.threshold)
+
+        missing = sorted(name for name in baseline
+                         if wanted(name) and name not in results)
+        if missing:
+            print("Not run: {}".format(", ".join(missing)))
+
+        for name, field, old, new in regressions:
+            print("REGRESSION {} {}: {:.4g} -> {:.4g}".format(name, field,
+                                                             old, new))
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
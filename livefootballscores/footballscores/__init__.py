@@ -1,7 +1,19 @@
 from .footballmatch import FootballMatch  # noqa: F401
 from .base import getAllTeams, getAllTournaments  # noqa: F401
-from .exceptions import FSConnectionError  # noqa: F401
+from .exceptions import FSConnectionError, FSCircuitOpenError  # noqa: F401
 from .league import League  # noqa: F401
+from .coordinator import MatchCoordinator  # noqa: F401
+from .scheduler import PollScheduler  # noqa: F401
+from .fixtures import FixtureCalendar  # noqa: F401
+from .aio import AsyncFootballMatch, AsyncLeague  # noqa: F401
+from .push import PushClient  # noqa: F401
+from .eventbus import EventBus  # noqa: F401
+from .session import configurePool, getPoolStats  # noqa: F401
+from .cache import configureCache, getCacheStats  # noqa: F401
+from .retry import getBreaker, getBreakerState  # noqa: F401
+from .stats import getStats, resetStats  # noqa: F401
+from .store import setStorePath  # noqa: F401
+from .catalogue import addAliases, getCatalogue  # noqa: F401
 
 
 VERSION = "0.4.0"
@@ -0,0 +1,440 @@
+"""asyncio versions of the main footballscores classes.
+
+The classes here share all of their parsing and event handling with the
+synchronous classes. Only the requests are different: they are made through
+an AsyncTransport which limits the number of requests in flight at any one
+time.
+
+e.g.:
+    liverpool = await AsyncFootballMatch.create("Liverpool")
+    prem = await AsyncLeague.create("Premier League")
+    await updateAll([liverpool, prem])
+"""
+import asyncio
+import weakref
+
+import requests
+
+from .base import API_BASE, PROXY_BASE, REFERER, matchcommon
+from .cache import getCache
+from .exceptions import FSConnectionError, FSCircuitOpenError
+from .footballmatch import FootballMatch
+from .league import League
+from .morphlinks import ML
+from .retry import RetryPolicy, getBreaker, getRetryPolicy
+from .session import (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT,
+                      getPool)
+from .stats import endpointName, getMetrics
+from .store import getStore
+
+# aiohttp is not a requirement of the package so we fall back to running
+# requests from the shared pool in the event loop's executor.
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+
+except ImportError:
+    HAS_AIOHTTP = False
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+class _Timeout(FSConnectionError):
+    pass
+
+
+class AsyncTransport(object):
+    '''Makes requests without blocking the event loop.
+
+    concurrency - maximum number of requests in flight at the same time
+    (in each event loop).
+
+    Semaphores and aiohttp sessions belong to the loop they are first used
+    in so the transport keeps one of each per loop. It can therefore be
+    used from more than one loop e.g. by separate calls to asyncio.run.
+    '''
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT):
+        self.concurrency = concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def _limit(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphores[loop] = semaphore
+
+        return semaphore
+
+    def _getSession(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+
+        if session is None or session.closed:
+            timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout,
+                                            sock_read=self.read_timeout)
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            session = aiohttp.ClientSession(timeout=timeout,
+                                            connector=connector)
+            self._sessions[loop] = session
+
+        return session
+
+    async def _aiohttp(self, method, url, params=None, headers=None):
+        session = self._getSession()
+        recorder = getPool().recorder
+        metrics = getMetrics()
+        endpoint = endpointName(url)
+        metrics.incr("requests." + endpoint)
+        loop_time = asyncio.get_running_loop().time
+        start = loop_time()
+        try:
+            async with session.request(method, url, params=params,
+                                       headers=headers) as r:
+                body = await r.read()
+                metrics.observe("request." + endpoint, loop_time() - start)
+                metrics.incr("bytes." + endpoint, len(body))
+
+                if recorder is not None:
+                    recorder.record(method, str(r.url), r.status, r.headers,
+                                    body)
+
+                if method == "HEAD" or r.status != 200:
+                    return r.status, None, r.headers
+
+                try:
+                    return (r.status, await r.json(content_type=None),
+                            r.headers)
+                except ValueError:
+                    return r.status, None, r.headers
+
+        except asyncio.TimeoutError:
+            metrics.incr("errors." + endpoint)
+            raise _Timeout
+
+        except aiohttp.ClientError:
+            metrics.incr("errors." + endpoint)
+            raise FSConnectionError
+
+    async def _executor(self, method, url, params=None, headers=None):
+
+        def send():
+            try:
+                r = getPool().request(method, url, params=params,
+                                      headers=headers)
+            except requests.exceptions.Timeout:
+                raise _Timeout
+            except requests.exceptions.ConnectionError:
+                raise FSConnectionError
+
+            if method == "HEAD" or r.status_code != 200:
+                return r.status_code, None, r.headers
+
+            try:
+                return r.status_code, r.json(), r.headers
+            except ValueError:
+                return r.status_code, None, r.headers
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, send)
+
+    async def _send(self, method, url, params=None, headers=None):
+        rewrite = getPool().rewrite
+        if rewrite is not None and HAS_AIOHTTP:
+            url = rewrite(url)
+
+        async with self._limit():
+            if HAS_AIOHTTP:
+                return await self._aiohttp(method, url, params, headers)
+            else:
+                return await self._executor(method, url, params, headers)
+
+    async def fetch(self, method, url, params=None, headers=None, key=None,
+                    ttl=None):
+        '''Returns a tuple of the status code and the decoded JSON (None if
+        the response was not JSON).
+
+        Requests go through the shared circuit breaker and failures are
+        retried according to the shared retry policy.
+
+        GET responses are kept in the shared response cache, like
+        matchcommon._cachedGet, under key (default url). Requests with
+        params are only cached if a key is given.
+
+        Raises FSConnectionError if the server could not be reached.
+        '''
+        breaker = getBreaker()
+        policy = getRetryPolicy()
+        attempt = 0
+        cache = entry = None
+
+        if method == "GET" and (key or not params):
+            cache = getCache()
+            key = key or url
+            entry = cache.get(key)
+
+            if entry is not None and entry.isFresh:
+                return 200, entry.data
+
+            headers = dict(headers or {})
+            if entry is not None:
+                headers.update(entry.validators())
+
+        while True:
+            if not breaker.allow():
+                getMetrics().incr("circuit_rejected")
+                raise FSCircuitOpenError
+
+            try:
+                status, data, rheaders = await self._send(method, url, params,
+                                                          headers)
+
+            except _Timeout:
+                breaker.recordFailure()
+                if not policy.shouldRetry(RetryPolicy.TIMEOUT, attempt):
+                    raise FSConnectionError
+
+            except FSConnectionError:
+                breaker.recordFailure()
+                if not policy.shouldRetry(RetryPolicy.CONNECTION, attempt):
+                    raise
+
+            except Exception:
+                breaker.recordFailure()
+                raise
+
+            else:
+                if status >= 500:
+                    breaker.recordFailure()
+                else:
+                    breaker.recordSuccess()
+
+                if cache is not None:
+                    if status == 304 and entry is not None:
+                        cache.revalidated(key, ttl)
+                        return 200, entry.data
+
+                    if status == 200 and data is not None:
+                        cache.put(key, data, rheaders, ttl)
+
+                return status, data
+
+            getMetrics().incr("retries")
+            await asyncio.sleep(policy.delay(attempt))
+            attempt += 1
+
+    async def request(self, url, ttl=None):
+        '''Async version of matchcommon._request.'''
+        status, data = await self.fetch("GET", PROXY_BASE + url, ttl=ttl)
+
+        if status == 200 and data is not None:
+            return data
+        else:
+            return dict()
+
+    async def pageStatus(self, page):
+        try:
+            status, _ = await self.fetch("HEAD", page)
+        except FSConnectionError:
+            return None
+
+        return status
+
+    async def checkPage(self, page):
+        return (await self.pageStatus(page)) == 200
+
+    async def close(self):
+        '''Closes the session used by the running loop.'''
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+
+        if session is not None:
+            await session.close()
+
+
+_TRANSPORT = None
+
+
+def getTransport():
+    '''Returns the shared AsyncTransport. It can be used from any event
+    loop.'''
+    global _TRANSPORT
+
+    if _TRANSPORT is None:
+        _TRANSPORT = AsyncTransport()
+
+    return _TRANSPORT
+
+
+class AsyncFootballMatch(FootballMatch):
+    '''FootballMatch whose update method is a coroutine.
+
+    Objects should be created with the create coroutine so that the team's
+    page can be checked without blocking:
+
+        match = await AsyncFootballMatch.create("Liverpool")
+    '''
+    def __init__(self, team, transport=None, **kwargs):
+        # Passing empty data stops FootballMatch from requesting anything
+        kwargs["data"] = dict()
+        super(AsyncFootballMatch, self).__init__(team, **kwargs)
+        self.transport = transport or getTransport()
+
+    def __repr__(self):
+
+        return "<AsyncFootballMatch(\'%s\')>" % (self.myteam)
+
+    @classmethod
+    async def create(cls, team, data=None, events_on_first_run=False,
+                     **kwargs):
+        match = cls(team, **kwargs)
+
+        if data is None:
+            await match.findTeamPage()
+
+        await match.update(data=data, first_run=events_on_first_run)
+
+        return match
+
+    async def findTeamPage(self):
+        team, teampage = self._teamPage()
+        valid = self._storedTeamPage(team)
+
+        if valid is None:
+            status = await self.transport.pageStatus(teampage)
+            valid = self._storeTeamPage(team, status)
+
+        self.hasTeamPage = self._setTeamPage(team, valid)
+        return self.hasTeamPage
+
+    async def _fetch(self):
+        if not self._canUpdate():
+            url = self._scoresFixturesUrl(source=ML.MORPH_FIXTURES_ALL)
+            raw = await self.transport.request(url)
+            return self._findTeamInFixtures(raw)
+
+        raw = await self.transport.request(self._scoresFixturesUrl(),
+                                           ttl=self._cacheTtl())
+
+        if not raw:
+            raise FSConnectionError
+
+        return self._findMatch(raw)
+
+    async def update(self, data=None, first_run=False):
+        if data is None:
+            data = self._dates.rollover(self._currentDate())
+
+        if data is None:
+            data = await self._fetch()
+
+        return FootballMatch.update(self, data=data or dict(),
+                                    first_run=first_run)
+
+
+class AsyncLeague(League):
+    '''League whose update method is a coroutine.
+
+        league = await AsyncLeague.create("Premier League")
+    '''
+    def __init__(self, league, transport=None, **kwargs):
+        kwargs["data"] = list()
+        super(AsyncLeague, self).__init__(league, **kwargs)
+        self.transport = transport or getTransport()
+
+    @classmethod
+    async def create(cls, league, data=None, **kwargs):
+        lg = cls(league, **kwargs)
+        await lg.update(data=data)
+        return lg
+
+    async def _fetch(self):
+        raw = await self.transport.request(self._scoresFixturesUrl(),
+                                           ttl=self._cacheTtl())
+
+        if not raw:
+            raise FSConnectionError
+
+        return self._parseRawData(raw)
+
+    async def update(self, data=None):
+        if data is None:
+            data = self._dates.rollover(self._currentDate())
+
+        if data is None:
+            data = await self._fetch()
+
+        return League.update(self, data=data)
+
+
+class _AsyncCommon(matchcommon):
+
+    def __init__(self, transport=None):
+        super(_AsyncCommon, self).__init__()
+        self.transport = transport or getTransport()
+
+    async def sendRequest(self, page):
+        payload = self._createPayload(page)
+        policy = getRetryPolicy()
+
+        # The counter changes with each request so mustn't be part of the key
+        key = API_BASE + "?t=" + payload["t"]
+
+        for attempt in range(self.RETRY_COUNT):
+            _, result = await self.transport.fetch("GET", API_BASE,
+                                                   params=payload,
+                                                   headers={"Referer":
+                                                            REFERER},
+                                                   key=key)
+            if result and result.get("moments"):
+                return result["moments"]
+
+            getCache().discard(key)
+
+            if attempt == self.RETRY_COUNT - 1:
+                break
+
+            if not policy.shouldRetry(RetryPolicy.EMPTY, attempt):
+                break
+
+            await asyncio.sleep(policy.delay(attempt, base_delay=self.TIMEOUT))
+
+        return None
+
+    async def getCatalogueItems(self):
+        items = getStore().get("catalogue")
+
+        if items is None:
+            moments = await self.sendRequest(ML.MORPH_TEAMS_COMPS)
+            items = self._catalogueFromMoments(moments)
+
+        return items
+
+
+async def getAllTeams(transport=None):
+    common = _AsyncCommon(transport)
+    return common._filterCatalogue(await common.getCatalogueItems())
+
+
+async def getAllTournaments(transport=None):
+    common = _AsyncCommon(transport)
+    items = await common.getCatalogueItems()
+    return common._filterCatalogue(items, teams=False)
+
+
+async def updateAll(sources, return_exceptions=True):
+    '''Updates a number of AsyncFootballMatch and AsyncLeague objects at the
+    same time.
+
+    Returns a list of results in the same order as the sources. With
+    return_exceptions set, a failing source returns its exception rather than
+    stopping the other updates.
+    '''
+    return await asyncio.gather(*[s.update() for s in sources],
+                                return_exceptions=return_exceptions)
@@ -2,17 +2,24 @@ import requests
 import time
 import json
 
-from .exceptions import FSConnectionError
+from .exceptions import FSConnectionError, FSCircuitOpenError
 
 try:
     from json.decoder import JSONDecodeError
 except ImportError:
     JSONDecodeError = ValueError
 
+from .cache import getCache
 from .morphlinks import ML
+from .retry import RetryPolicy, getBreaker, getRetryPolicy
+from .session import getPool
+from .stats import getMetrics
+from .store import CATALOGUE_EXPIRY, getStore
+from .streamscan import STREAM_ERRORS, iterStreamedEvents
 
 
 API_BASE = "http://push.api.bbci.co.uk/p"
+PROXY_BASE = "http://push.api.bbci.co.uk"
 API_MORPH = "morph:/"
 REFERER = "http://www.bbc.co.uk/sport/football/scores-fixtures"
 
@@ -27,7 +34,7 @@ class matchcommon(object):
         self.RETRY_COUNT = retry_count
         self.TIMEOUT = 0.5
 
-    def __create_payload(self, page):
+    def _createPayload(self, page):
 
         now = time.time()
         if now - type(self).LAST_REQUEST < 30:
@@ -35,66 +42,284 @@ class matchcommon(object):
         else:
             type(self).REQUEST_COUNT = 1
 
-        page = API_MORPH + page
+        # Several topics can be requested at once
+        if isinstance(page, (list, tuple)):
+            page = [API_MORPH + p for p in page]
+        else:
+            page = API_MORPH + page
 
         type(self).LAST_REQUEST = now
 
         return {"t": page, "c": type(self).REQUEST_COUNT}
 
-    def checkPage(self, page):
+    @property
+    def pool(self):
+        return getPool()
+
+    def _send(self, method, url, **kwargs):
+        """Sends a request through the circuit breaker.
+
+        Timeouts and connection errors are retried according to the retry
+        policy. Raises FSCircuitOpenError if the breaker is open, otherwise
+        the same exceptions as requests.
+        """
+        breaker = getBreaker()
+        policy = getRetryPolicy()
+        metrics = getMetrics()
+        attempt = 0
 
+        while True:
+            if not breaker.allow():
+                metrics.incr("circuit_rejected")
+                raise FSCircuitOpenError
+
+            try:
+                r = self.pool.request(method, url, **kwargs)
+
+            except requests.exceptions.Timeout:
+                breaker.recordFailure()
+                if not policy.shouldRetry(RetryPolicy.TIMEOUT, attempt):
+                    raise
+
+            except requests.exceptions.ConnectionError:
+                breaker.recordFailure()
+                if not policy.shouldRetry(RetryPolicy.CONNECTION, attempt):
+                    raise
+
+            except Exception:
+                # e.g. ChunkedEncodingError. Not retried but the breaker
+                # must hear about it or a half open probe never finishes.
+                breaker.recordFailure()
+                raise
+
+            else:
+                if r.status_code >= 500:
+                    breaker.recordFailure()
+                else:
+                    breaker.recordSuccess()
+
+                return r
+
+            metrics.incr("retries")
+            time.sleep(policy.delay(attempt))
+            attempt += 1
+
+    def _pageStatus(self, page):
+        """Returns the status code for the page or None if the server
+        couldn't be reached."""
         try:
-            rq = requests.head(page)
-            return rq.status_code == 200
+            return self._send("HEAD", page).status_code
         except (requests.exceptions.ConnectionError,
-                requests.exceptions.Timeout):
-            return False
+                requests.exceptions.Timeout,
+                FSConnectionError):
+            return None
+
+    def checkPage(self, page):
+
+        return self._pageStatus(page) == 200
+
+    def _cachedGet(self, url, key=None, ttl=None, headers=None, **kwargs):
+        """Sends a GET request unless a fresh response is in the cache.
+
+        Stale responses are revalidated with the server using their ETag or
+        Last-Modified headers.
+
+        Responses which can't be decoded are requested again according to
+        the retry policy.
+
+        Returns a tuple of the status code and decoded JSON (None if the
+        status is not 200). Raises the same exceptions as _send and
+        JSONDecodeError if the response still can't be decoded.
+        """
+        cache = getCache()
+        policy = getRetryPolicy()
+        key = key or url
+
+        entry = cache.get(key)
+        if entry is not None and entry.isFresh:
+            return 200, entry.data
+
+        headers = dict(headers or {})
+        if entry is not None:
+            headers.update(entry.validators())
+
+        attempt = 0
+
+        while True:
+            r = self._send("GET", url, headers=headers, **kwargs)
+
+            if r.status_code == 304 and entry is not None:
+                cache.revalidated(key, ttl)
+                return 200, entry.data
+
+            if r.status_code != 200:
+                return r.status_code, None
+
+            try:
+                with getMetrics().timer("json_parse"):
+                    data = r.json()
+                break
+            except JSONDecodeError:
+                getMetrics().incr("decode_failures")
+                if not policy.shouldRetry(RetryPolicy.DECODE, attempt):
+                    raise
+
+            getMetrics().incr("retries")
+            time.sleep(policy.delay(attempt))
+            attempt += 1
+
+        cache.put(key, data, r.headers, ttl)
+
+        return 200, data
 
     def sendRequest(self, page):
 
-        payload = self.__create_payload(page)
+        payload = self._createPayload(page)
+
+        # The counter changes with each request so mustn't be part of the key
+        key = API_BASE + "?t=" + payload["t"]
+        policy = getRetryPolicy()
 
-        for _ in range(self.RETRY_COUNT):
+        for attempt in range(self.RETRY_COUNT):
             try:
-                result = requests.get(API_BASE, params=payload,
-                                      headers={"Referer": REFERER}).json()
-                if result["moments"]:
+                _, result = self._cachedGet(API_BASE, key=key, params=payload,
+                                            headers={"Referer": REFERER})
+                if result and result["moments"]:
                     return result["moments"]
+
+                getCache().discard(key)
+                getMetrics().incr("empty_moments")
+
             except JSONDecodeError:
                 pass
             except (requests.exceptions.ConnectionError,
                     requests.exceptions.Timeout):
                 raise FSConnectionError
 
-            time.sleep(self.TIMEOUT)
+            # Empty responses are common so are retried with a backoff
+            # rather than a fixed delay.
+            if attempt == self.RETRY_COUNT - 1:
+                break
+
+            if not policy.shouldRetry(RetryPolicy.EMPTY, attempt):
+                break
+
+            time.sleep(policy.delay(attempt, base_delay=self.TIMEOUT))
 
         return None
 
-    # Unused?
-    def requestPushStream(self, page):
+    def requestPushStream(self, page, timeout=None):
+        """Opens a streaming request to the push API and returns the
+        response. page can be a list to subscribe to several topics.
+
+        timeout - seconds to wait for more data before giving up.
+        """
+        payload = self._createPayload(page)
+        kwargs = {}
+
+        if timeout is not None:
+            kwargs["timeout"] = (self.pool.connect_timeout, timeout)
+
+        return self._send("GET", API_BASE, params=payload,
+                          headers={"Referer": REFERER}, stream=True, **kwargs)
 
-        payload = self.__create_payload(page)
+    def _requestStream(self, url):
+        """Opens a streaming request to the proxy and returns the response,
+        or None if the request failed. The caller must close the response.
+        """
+        try:
+            r = self._send("GET", PROXY_BASE + url, stream=True)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            raise FSConnectionError
 
-        r = requests.get(API_BASE, params=payload,
-                         headers={"Referer": REFERER}, stream=True).json()
+        if r.status_code != 200:
+            r.close()
+            return None
 
         return r
 
-    def getTeams(self):
+    def _streamEvents(self, r):
+        """Generator yielding (date, event) tuples from a streaming match
+        list response as it downloads (see streamscan). The caller must
+        close the response.
 
-        teams = self.sendRequest(ML.MORPH_TEAMS_COMPS)
+        Raises FSConnectionError if the response is cut off or can't be
+        decoded.
+        """
+        try:
+            for item in iterStreamedEvents(r):
+                yield item
+        except STREAM_ERRORS:
+            raise FSConnectionError
+
+    def _request(self, url, ttl=None):
+        url = PROXY_BASE + url
+        try:
+            _, data = self._cachedGet(url, ttl=ttl)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            raise FSConnectionError
+        except JSONDecodeError:
+            data = None
+
+        if data is not None:
+            return data
+        else:
+            return dict()
 
-        if teams:
-            teams = json.loads(teams[0]["payload"])
-            return [x for x in teams if "teams" in x["url"]]
+    def _catalogueFromMoments(self, moments):
+
+        if moments:
+            items = json.loads(moments[0]["payload"])
+            getStore().set("catalogue", items, CATALOGUE_EXPIRY)
+            return items
+
+    def _filterCatalogue(self, items, teams=True):
+
+        if items:
+            return [x for x in items if ("teams" in x["url"]) == teams]
+
+    def getCatalogueItems(self):
+        """Returns the list of all teams and competitions.
+
+        The list is kept in the persistent store so is only requested once
+        a day.
+        """
+        items = getStore().get("catalogue")
+
+        if items is None:
+            moments = self.sendRequest(ML.MORPH_TEAMS_COMPS)
+            items = self._catalogueFromMoments(moments)
+
+        return items
+
+    def getTeams(self):
+
+        return self._filterCatalogue(self.getCatalogueItems())
 
     def getTournaments(self):
 
-        teams = self.sendRequest(ML.MORPH_TEAMS_COMPS)
+        return self._filterCatalogue(self.getCatalogueItems(), teams=False)
+
+
+def iterDatedEvents(payload):
+    """Generator yielding (date, event) for every match event in a morph
+    match list payload."""
+    if not payload:
+        return
+
+    for comp in payload.get("matchData") or list():
+        for date, dates in comp["tournamentDatesWithEvents"].items():
+            for group in dates:
+                for event in group["events"]:
+                    yield date, event
+
 
-        if teams:
-            teams = json.loads(teams[0]["payload"])
-            return [x for x in teams if "teams" not in x["url"]]
+def iterEvents(payload):
+    """Generator yielding every match event in a morph match list payload."""
+    for _, event in iterDatedEvents(payload):
+        yield event
 
 
 def getAllTeams():
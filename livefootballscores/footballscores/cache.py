@@ -0,0 +1,196 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+# Seconds between polls of the match lists (the widget's refresh_interval)
+DEFAULT_POLL_INTERVAL = 60
+
+# Match lists expire this many seconds before the next poll is due
+POLL_MARGIN = 5
+
+
+def matchListTtls(poll_interval):
+    '''Returns (pattern, seconds) tuples for match lists polled every
+    poll_interval seconds.
+
+    Match lists stay fresh until just before the next poll so any other
+    request for the same list is served from the cache, while each poll
+    goes to the server (revalidating with the ETag).
+    '''
+    ttl = max(poll_interval - POLL_MARGIN, 0)
+
+    return [("full-priority-order", ttl),
+            ("bbc-morph-football-scores-match-list-data", ttl)]
+
+
+# Time (in seconds) that responses are treated as fresh. The first pattern
+# found in the URL is used. Responses are still stored after they expire so
+# that they can be revalidated with the server.
+DEFAULT_TTLS = ([("bbc-morph-football-teams-competitions-list", 24 * 60 * 60)]
+                + matchListTtls(DEFAULT_POLL_INTERVAL))
+
+DEFAULT_MAXSIZE = 128
+
+
+class CacheEntry(object):
+
+    __slots__ = ("data", "etag", "last_modified", "expires")
+
+    def __init__(self, data, etag=None, last_modified=None, expires=0):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def isFresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache(object):
+    '''Thread-safe LRU cache of decoded responses.
+
+    maxsize - maximum number of responses held.
+    ttls - list of (pattern, seconds) tuples setting how long responses
+    for matching URLs are fresh.
+    default_ttl - freshness for URLs not matching any pattern.
+    '''
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttls=None, default_ttl=0):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.maxsize = maxsize
+        self.ttls = list(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.resetStats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttlFor(self, key):
+        for pattern, ttl in self.ttls:
+            if pattern in key:
+                return ttl
+
+        return self.default_ttl
+
+    def get(self, key):
+        '''Returns the entry for the key (fresh or not) or None.
+
+        Only fresh entries count as hits.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+            if entry is not None and entry.isFresh:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+            return entry
+
+    def put(self, key, data, headers=None, ttl=None):
+        if ttl is None:
+            ttl = self.ttlFor(key)
+
+        headers = headers or {}
+        entry = CacheEntry(data,
+                           etag=headers.get("ETag"),
+                           last_modified=headers.get("Last-Modified"),
+                           expires=time.time() + ttl)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return entry
+
+    def revalidated(self, key, ttl=None):
+        '''Marks the entry as fresh again after a 304 response.'''
+        if ttl is None:
+            ttl = self.ttlFor(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                entry.expires = time.time() + ttl
+                self._revalidations += 1
+
+            return entry
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"hits": self._hits,
+                    "misses": self._misses,
+                    "revalidations": self._revalidations,
+                    "evictions": self._evictions,
+                    "size": len(self._entries)}
+
+    def resetStats(self):
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._evictions = 0
+
+
+CACHE = ResponseCache()
+
+
+def getCache():
+    return CACHE
+
+
+def configureCache(maxsize=None, ttls=None, default_ttl=None,
+                   poll_interval=None):
+    '''Changes settings of the shared response cache e.g.:
+
+        configureCache(maxsize=64, ttls=[("full-priority-order", 30)])
+
+    poll_interval - seconds between polls. Sets the TTLs for match lists
+    (see matchListTtls).
+    '''
+    if maxsize is not None:
+        CACHE.maxsize = maxsize
+
+    if ttls is not None:
+        CACHE.ttls = list(ttls)
+
+    if poll_interval is not None:
+        lists = dict(matchListTtls(poll_interval))
+        CACHE.ttls = ([(p, lists.pop(p, t)) for p, t in CACHE.ttls] +
+                      list(lists.items()))
+
+    if default_ttl is not None:
+        CACHE.default_ttl = default_ttl
+
+
+def getCacheStats():
+    return CACHE.stats
@@ -0,0 +1,194 @@
+from functools import lru_cache
+import re
+import threading
+import time
+import unicodedata
+
+from .base import matchcommon
+from .store import CATALOGUE_EXPIRY, getStore
+
+
+# Common names which don't appear in the BBC's list of teams.
+# Users can add their own with addAliases.
+DEFAULT_ALIASES = {
+    "Man Utd": "Manchester United",
+    "Man United": "Manchester United",
+    "Man City": "Manchester City",
+    "Spurs": "Tottenham Hotspur",
+    "Wolves": "Wolverhampton Wanderers",
+    "Brighton": "Brighton & Hove Albion",
+    "Forest": "Nottingham Forest",
+    "Sheff Utd": "Sheffield United",
+    "Sheff Wed": "Sheffield Wednesday",
+    "QPR": "Queens Park Rangers"
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+@lru_cache(maxsize=4096)
+def normalise(name):
+    '''Returns a form of the name that can be used to compare names.
+
+    The name is lower case with accents, punctuation and repeated spaces
+    removed. Hyphens are treated as spaces so slugs are normalised to the
+    same value as names e.g. "Atlético Madrid" and "atletico-madrid" both
+    become "atletico madrid".
+    '''
+    if not name:
+        return ""
+
+    name = name.replace("&", " and ").replace("-", " ").replace("_", " ")
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _PUNCTUATION.sub("", name.lower())
+
+    return " ".join(name.split())
+
+
+def slugify(name):
+    return normalise(name).replace(" ", "-")
+
+
+class CatalogueEntry(object):
+
+    __slots__ = ("name", "slug", "url", "isTeam")
+
+    def __init__(self, name, slug, url, isTeam):
+        self.name = name
+        self.slug = slug
+        self.url = url
+        self.isTeam = isTeam
+
+    def __repr__(self):
+        return "<CatalogueEntry({!r}, {!r})>".format(self.name, self.slug)
+
+
+class Catalogue(object):
+    '''Index of the teams and competitions covered by the BBC.
+
+    Teams and competitions can be looked up by any normalised form of their
+    name, their slug or an alias.
+    '''
+    def __init__(self, items, aliases=None):
+        self.created = time.time()
+        self.teams = {}
+        self.tournaments = {}
+        self._keys = {}
+
+        for item in items:
+            url = item.get("url", "")
+            isTeam = "teams" in url
+            parts = url.split("/")
+
+            try:
+                slug = parts[4] if isTeam else parts[3]
+            except IndexError:
+                slug = slugify(item["name"])
+
+            entry = CatalogueEntry(item["name"], slug, url, isTeam)
+
+            for name in (item["name"], slug, item.get("shortName"),
+                         item.get("abbreviation")):
+                self._addKey(entry, name)
+
+        if aliases is None:
+            aliases = getAliases()
+
+        for alias, name in aliases.items():
+            self.addAlias(alias, name)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _index(self, isTeam):
+        return self.teams if isTeam else self.tournaments
+
+    def _addKey(self, entry, name):
+        key = normalise(name)
+
+        if key:
+            self._index(entry.isTeam).setdefault(key, entry)
+            self._keys.setdefault(id(entry), set()).add(key)
+
+    @property
+    def expired(self):
+        return time.time() - self.created > CATALOGUE_EXPIRY
+
+    def addAlias(self, alias, name):
+        '''Adds an alias for a team or competition that is already in the
+        catalogue. Returns False if the name is unknown.
+        '''
+        entry = self.findTeam(name) or self.findTournament(name)
+
+        if entry is None:
+            return False
+
+        self._addKey(entry, alias)
+        return True
+
+    def findTeam(self, name):
+        return self.teams.get(normalise(name))
+
+    def findTournament(self, name):
+        return self.tournaments.get(normalise(name))
+
+    def names(self, entry):
+        '''Returns the set of normalised names for the entry.'''
+        return frozenset(self._keys.get(id(entry), ()))
+
+
+_ALIASES = {normalise(k): v for k, v in DEFAULT_ALIASES.items()}
+_CATALOGUE = None
+_LOCK = threading.Lock()
+
+
+def addAliases(aliases):
+    '''Adds aliases for team or competition names e.g.:
+
+        addAliases({"The Saints": "St Mirren"})
+    '''
+    with _LOCK:
+        _ALIASES.update({normalise(k): v for k, v in aliases.items()})
+
+        if _CATALOGUE is not None:
+            for alias, name in aliases.items():
+                _CATALOGUE.addAlias(alias, name)
+
+
+def getAliases():
+    return dict(_ALIASES)
+
+
+def resolveAlias(name):
+    '''Returns the name the alias refers to, or the name if it isn't an
+    alias. No requests are made.
+    '''
+    return _ALIASES.get(normalise(name), name)
+
+
+def getCatalogue(fetch=True):
+    '''Returns the shared Catalogue.
+
+    The catalogue is built from the persistent store if possible. If it
+    isn't there, and fetch is True, the list is requested from the BBC.
+    Returns None if no catalogue is available.
+    '''
+    global _CATALOGUE
+
+    with _LOCK:
+        catalogue = _CATALOGUE
+
+    if catalogue is None or catalogue.expired:
+        items = getStore().get("catalogue")
+
+        if items is None and fetch:
+            items = matchcommon().getCatalogueItems()
+
+        if items:
+            catalogue = Catalogue(items)
+
+            with _LOCK:
+                _CATALOGUE = catalogue
+
+    return catalogue
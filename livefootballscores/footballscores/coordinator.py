@@ -0,0 +1,581 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+import threading
+import time
+
+from .base import matchcommon, iterDatedEvents
+from .catalogue import getCatalogue
+from .dateindex import dateWindow
+from .exceptions import FSConnectionError
+from .footballmatch import FootballMatch
+from .league import League
+from .morphlinks import ML
+from .stats import getMetrics
+
+
+class MatchCoordinator(matchcommon):
+    '''Class for refreshing a number of teams and leagues together.
+
+    Teams and leagues added to the coordinator are created without making
+    any requests. Each call to update then fetches the day's scores as few
+    times as possible and passes the relevant events to each team and league.
+    Teams whose page isn't in the persistent store have it checked on the
+    worker pool at the start of the next update. The catalogue of team and
+    competition names is loaded once a day so sources are found by any of
+    their names or aliases (see loadCatalogue).
+
+    Requests are run on a pool of worker threads. A source that fails, or
+    takes longer than source_timeout seconds, is marked as stale without
+    affecting the other sources. update waits for any team page or fixture
+    lookups and then for the sources, so it returns within twice
+    source_timeout.
+
+    If a PollScheduler is provided, update only refreshes sources which are
+    due to be polled and nextUpdate says when the next one is due.
+
+    If a FixtureCalendar is provided, sources are only polled once a day
+    outside of their match windows. The calendar's fixtures are downloaded
+    on the worker pool at the start of each update if they are out of date.
+
+    Sources which aren't detailed are fetched without player actions.
+    When some sources want detailed data (see requestDetail), those with a
+    smaller request of their own fetch it separately so the shared request
+    can stay lightweight.
+
+    With stream_scan, when only teams share the request, the list of all
+    matches is scanned as it downloads and abandoned once every team has
+    been found (see streamscan).
+
+    window sets the number of days, starting with today, covered by each
+    request. Sources keep the matches on the other days by date so, when the
+    date changes, they are updated from them without a request.
+
+    e.g.:
+        coordinator = MatchCoordinator(on_goal=goal_callback)
+        liverpool = coordinator.addTeam("Liverpool")
+        prem = coordinator.addLeague("Premier League")
+        coordinator.update()
+    '''
+    def __init__(self, detailed=True, on_goal=None, on_red=None,
+                 on_status_change=None, on_new_match=None,
+                 events_on_first_run=False, workers=4, source_timeout=20,
+                 scheduler=None, window=1, calendar=None, stream_scan=False):
+        super(MatchCoordinator, self).__init__()
+        self.detailed = detailed
+        self.events_on_first_run = events_on_first_run
+        self.workers = workers
+        self.source_timeout = source_timeout
+        self.scheduler = scheduler
+        self.calendar = calendar
+        self.stream_scan = stream_scan
+        self.window = max(int(window), 1)
+        self.teams = []
+        self.leagues = []
+        self.failures = []
+        self._stale = set()
+        self._busy = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._due = {}
+        self._polled = {}
+        self._upgrade = set()
+        self._unchecked = set()
+        self._kwargs = {"on_goal": on_goal,
+                        "on_red": on_red,
+                        "on_status_change": on_status_change,
+                        "on_new_match": on_new_match}
+        self._new = set()
+        self._catalogueDay = None
+
+    def __repr__(self):
+        return "<MatchCoordinator(teams={}, leagues={})>".format(
+            len(self.teams), len(self.leagues))
+
+    def _sourceKwargs(self, kwargs):
+        kw = {"detailed": self.detailed, "window": self.window}
+        kw.update(self._kwargs)
+        kw.update(kwargs)
+        return kw
+
+    def addTeam(self, team, **kwargs):
+        '''Creates a FootballMatch object for the team and adds it to the
+        coordinator. No data is requested until update is called.
+
+        Keyword arguments are passed to FootballMatch.
+        '''
+        kwargs.setdefault("stream_scan", self.stream_scan)
+        match = FootballMatch(team, data={}, **self._sourceKwargs(kwargs))
+
+        self._lookUpTeamPage(match)
+        self.teams.append(match)
+        self._new.add(id(match))
+        return match
+
+    def addLeague(self, league, **kwargs):
+        '''Creates a League object and adds it to the coordinator. No data is
+        requested until update is called.
+
+        Keyword arguments are passed to League.
+        '''
+        lg = League(league, data=[], **self._sourceKwargs(kwargs))
+        self.leagues.append(lg)
+        return lg
+
+    def _lookUpTeamPage(self, team):
+        found = team._findTeamPage(request=False)
+        if found is None:
+            self._unchecked.add(id(team))
+        else:
+            team.hasTeamPage = found
+
+    def loadCatalogue(self):
+        '''Loads the catalogue of team and competition names, at most once
+        a day, and looks up the teams and leagues already added again.
+
+        Returns the catalogue or None if it isn't available. A catalogue
+        that couldn't be requested is tried again on the next call.
+        '''
+        today = self._today()
+
+        if self._catalogueDay == today:
+            return getCatalogue(fetch=False)
+
+        try:
+            catalogue = getCatalogue()
+        except FSConnectionError:
+            return None
+
+        self._catalogueDay = today
+
+        if catalogue is not None:
+            for team in self.teams:
+                team._teamnames = None
+                self._lookUpTeamPage(team)
+
+            for lg in self.leagues:
+                lg.leagueid = lg._leagueId()
+
+        return catalogue
+
+    def watch(self, source):
+        '''Adds an existing FootballMatch or League object.'''
+        if isinstance(source, League):
+            self.leagues.append(source)
+        elif isinstance(source, FootballMatch):
+            self.teams.append(source)
+        else:
+            raise TypeError("Can only watch FootballMatch or League objects.")
+
+        return source
+
+    def remove(self, source):
+        for sources in (self.teams, self.leagues):
+            for i, s in enumerate(sources):
+                if s is source:
+                    del sources[i]
+                    self._new.discard(id(source))
+                    self._stale.discard(id(source))
+                    self._due.pop(id(source), None)
+                    self._polled.pop(id(source), None)
+                    self._upgrade.discard(id(source))
+                    self._unchecked.discard(id(source))
+                    return True
+
+        return False
+
+    @property
+    def sources(self):
+        return self.teams + self.leagues
+
+    @property
+    def staleSources(self):
+        '''List of sources which could not be updated in the last cycle.'''
+        return [s for s in self.sources if id(s) in self._stale]
+
+    def isStale(self, source):
+        return id(source) in self._stale
+
+    def _isFirstRun(self, source):
+        if id(source) in self._new:
+            self._new.discard(id(source))
+            return not self.events_on_first_run
+
+        return False
+
+    def _today(self):
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _plan(self):
+        '''Splits sources into those that can be served from a single
+        request for all of today's matches and those which need to request
+        their own data.
+        '''
+        today = self._today()
+        individual = []
+        shared = []
+
+        for team in self.teams:
+            if team._matchdate and team._matchdate != today:
+                individual.append(team)
+            elif team.window > self.window:
+                individual.append(team)
+            else:
+                shared.append(team)
+
+        for lg in self.leagues:
+            if lg.window > self.window:
+                individual.append(lg)
+            else:
+                shared.append(lg)
+
+        # Keep the shared request lightweight if only some sources want
+        # detail and they can get it with a request of their own
+        detailed = [s for s in shared if s.wantsDetail]
+
+        if detailed and len(detailed) < len(shared):
+            own = [s for s in detailed
+                   if isinstance(s, League) or s.hasTeamPage]
+            individual += own
+            shared = [s for s in shared if not any(s is o for o in own)]
+
+        # A single league or a team with its own page can be updated with a
+        # smaller request than the list of all matches.
+        if len(shared) == 1:
+            source = shared[0]
+            if isinstance(source, League) or source.hasTeamPage:
+                individual += shared
+                shared = []
+
+        return shared, individual
+
+    def _window(self):
+        return dateWindow(self._today(), self.window)
+
+    def _allFixturesUrl(self, detailed):
+        start, end = self._window()
+        return FootballMatch.scoreslink.format(start_date=start,
+                                               end_date=end,
+                                               source=ML.MORPH_FIXTURES_ALL,
+                                               detailed=str(detailed).lower())
+
+    def _getAllFixtures(self, detailed):
+        return self._request(self._allFixturesUrl(detailed))
+
+    def _streamAllFixtures(self, teams, detailed):
+        '''Scans the list of all matches for the teams as it downloads.
+
+        Returns a dict of lists of (date, event) tuples by team id or None
+        if the request failed.
+        '''
+        r = self._requestStream(self._allFixturesUrl(detailed))
+
+        if r is None:
+            return None
+
+        found = {id(t): [] for t in teams}
+        missing = set(found)
+
+        try:
+            for date, event in self._streamEvents(r):
+                for team in teams:
+                    if team.checkTeamInMatch(event):
+                        found[id(team)].append((date, event))
+                        missing.discard(id(team))
+
+                # With more than one day there could be more matches
+                if not missing and self.window == 1:
+                    getMetrics().incr("stream_scan.early_stop")
+                    break
+        finally:
+            r.close()
+
+        return found
+
+    def _updateSource(self, source, data=None):
+        if isinstance(source, League):
+            name = "update.league." + source.league
+            kwargs = {}
+        else:
+            name = "update.team." + source.myteam
+            kwargs = {"first_run": self._isFirstRun(source)}
+
+        with getMetrics().timer(name):
+            source.update(data=data, **kwargs)
+
+        self._polled[id(source)] = self._today()
+        self._upgrade.discard(id(source))
+
+    def requestDetail(self, source, duration=None):
+        '''Requests detailed data for the source for the next duration
+        seconds. The source is updated on the next call to update even if
+        it isn't due.
+        '''
+        source.requestDetail(duration)
+        self._upgrade.add(id(source))
+
+    def _rollover(self, sources):
+        '''Updates the sources from their index of matches by date if the
+        date has changed and every source has the new day's data. Returns
+        True if they were updated.
+        '''
+        data = [s._dates.rollover(s._currentDate()) for s in sources]
+
+        if any(d is None for d in data):
+            return False
+
+        for source, d in zip(sources, data):
+            self._updateSource(source, d)
+
+        return True
+
+    def _updateShared(self, sources):
+        if self._rollover(sources):
+            return True
+
+        detailed = any(s.wantsDetail for s in sources)
+        start, end = self._window()
+
+        teams = [s for s in sources if isinstance(s, FootballMatch)]
+        leagues = [s for s in sources if isinstance(s, League)]
+
+        # Leagues need every one of their events so can't stop early
+        if self.stream_scan and not leagues:
+            with getMetrics().timer("fetch.shared"):
+                found = self._streamAllFixtures(teams, detailed)
+
+            if found is None:
+                return False
+
+            raw = None
+
+        else:
+            with getMetrics().timer("fetch.shared"):
+                raw = self._getAllFixtures(detailed)
+
+            # Nothing came back from the server so leave the sources as
+            # they are
+            if not raw:
+                return False
+
+            # (date, event) tuples for each source
+            found = {id(s): [] for s in sources}
+
+        for date, event in iterDatedEvents(raw):
+            for team in teams:
+                if team.checkTeamInMatch(event):
+                    found[id(team)].append((date, event))
+
+            for lg in leagues:
+                if event.get("tournamentSlug") == lg.leagueid:
+                    found[id(lg)].append((date, event))
+
+        for team in teams:
+            event = team._indexEvents(found[id(team)], start, end)
+            self._updateSource(team, event or dict())
+
+        for lg in leagues:
+            self._updateSource(lg, lg._indexEvents(found[id(lg)], start, end))
+
+        return True
+
+    def _getExecutor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return self._executor
+
+    def _release(self, sources):
+        with self._lock:
+            for source in sources:
+                self._busy.discard(id(source))
+
+    def _runJob(self, job):
+        sources, func, args = job
+        try:
+            return func(*args)
+        finally:
+            self._release(sources)
+
+    def _runJobs(self, jobs, timeout=None):
+        """Runs the jobs on the worker pool and waits until each one has
+        finished or timeout seconds, source_timeout by default, have passed
+        since they were submitted.
+
+        Returns a list of (job, exception) tuples for jobs which failed.
+        None is used for jobs that timed out, including those which never
+        started because every worker was busy.
+        """
+        executor = self._getExecutor()
+        futures = [executor.submit(self._runJob, job) for job in jobs]
+        if timeout is None:
+            timeout = self.source_timeout
+
+        done, _ = wait(futures, timeout=timeout)
+        failed = []
+
+        for job, future in zip(jobs, futures):
+            if future not in done:
+                # A job which hasn't started is dropped. We can't stop a
+                # running one but we won't wait for it: its sources stay
+                # busy until it finishes.
+                if future.cancel():
+                    self._release(job[0])
+
+                failed.append((job, None))
+
+            elif future.exception() is not None:
+                failed.append((job, future.exception()))
+
+        return failed
+
+    def _isDue(self, source, now):
+        if id(source) in self._upgrade:
+            return True
+
+        # Outside its match windows, a source is only polled once a day so
+        # that e.g. the day's fixtures are shown
+        if (self.calendar is not None and
+                self._polled.get(id(source)) == self._today() and
+                not self.calendar.isLive(source, now)):
+            return False
+
+        return self.scheduler is None or self._due.get(id(source), 0) <= now
+
+    def _checkTeamPage(self, team):
+        try:
+            team.hasTeamPage = bool(team._findTeamPage())
+        finally:
+            # Check again next time if the server couldn't be reached
+            if team._findTeamPage(request=False) is None:
+                self._unchecked.add(id(team))
+
+    def _lookUp(self):
+        '''Looks up the pages of teams which weren't in the store when they
+        were added and then, with a calendar, downloads its fixtures for
+        sources which need them. Both are given source_timeout seconds in
+        total.
+
+        These jobs don't mark their sources as busy, so a source can be
+        updated while they run. Each one is only run once at a time
+        instead: a team is no longer unchecked while its page is looked up
+        and the calendar doesn't return pages it is still downloading.
+        '''
+        deadline = time.time() + self.source_timeout
+        jobs = []
+
+        for team in self.teams:
+            if id(team) in self._unchecked:
+                self._unchecked.discard(id(team))
+                jobs.append(((), self._checkTeamPage, (team,)))
+
+        if jobs:
+            self._runJobs(jobs)
+
+        if self.calendar is None:
+            return
+
+        jobs = [((), self.calendar.fetch, (page, group))
+                for page, group in self.calendar.pending(self.sources)]
+
+        if not jobs:
+            return
+
+        # Sources without fixtures are polled as normal
+        failed = self._runJobs(jobs, max(deadline - time.time(), 0))
+
+        if failed:
+            getMetrics().incr("calendar.failures", len(failed))
+
+    def _schedule(self, sources, failed):
+        now = time.time()
+
+        for source in sources:
+            if id(source) in failed:
+                wait = self.scheduler.retry_interval
+            else:
+                wait = self.scheduler.nextPoll(source, now)
+
+            self._due[id(source)] = now + wait
+
+    def nextUpdate(self):
+        '''Returns the number of seconds until a source is next due to be
+        updated, or None if there is no scheduler.
+        '''
+        if self.scheduler is None:
+            return None
+
+        now = time.time()
+        due = [self._due.get(id(s), now) for s in self.sources]
+
+        if not due:
+            return None
+
+        return max(min(due) - now, 0)
+
+    def update(self, force=False):
+        '''Refreshes the teams and leagues.
+
+        With a scheduler, only sources that are due are refreshed unless
+        force is True. All sources served by the shared request are
+        refreshed if any one of them is due.
+
+        Sources which fail are marked as stale and are listed, with the
+        error, in the failures attribute.
+
+        Returns True if no sources are stale. Raises FSConnectionError
+        if no source could be updated because of connection errors.
+        '''
+        self.loadCatalogue()
+        self._lookUp()
+
+        now = time.time()
+        shared, individual = self._plan()
+
+        if not force:
+            if not any(self._isDue(s, now) for s in shared):
+                shared = []
+            individual = [s for s in individual if self._isDue(s, now)]
+
+        with self._lock:
+            busy = set(self._busy)
+
+        jobs = []
+
+        shared = [s for s in shared if id(s) not in busy]
+        if shared:
+            jobs.append((tuple(shared), self._updateShared, (shared,)))
+
+        for source in individual:
+            if id(source) not in busy:
+                jobs.append(((source,), self._updateSource, (source,)))
+
+        with self._lock:
+            for sources, _, _ in jobs:
+                self._busy.update(id(s) for s in sources)
+
+        failed = self._runJobs(jobs) if jobs else []
+
+        self.failures = [(s, err) for (sources, _, _), err in failed
+                         for s in sources]
+
+        updated = [s for sources, _, _ in jobs for s in sources]
+        failed_ids = set(id(s) for s, _ in self.failures)
+
+        self._stale.difference_update(id(s) for s in updated)
+        self._stale.update(failed_ids)
+        self._stale.update(busy)
+
+        if self.scheduler is not None:
+            self._schedule(updated, failed_ids)
+
+        if jobs and len(failed) == len(jobs):
+            for _, err in failed:
+                if isinstance(err, FSConnectionError):
+                    raise err
+
+        return not self._stale
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
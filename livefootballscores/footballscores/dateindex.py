@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def dateString(value):
+    '''Returns a date (or datetime or string) as "YYYY-MM-DD".'''
+    if isinstance(value, (date, datetime)):
+        return value.strftime(DATE_FORMAT)
+
+    return value
+
+
+def dateWindow(start, days):
+    '''Returns the start and end dates for a window of days starting on
+    start (a "YYYY-MM-DD" string).'''
+    end = datetime.strptime(start, DATE_FORMAT) + timedelta(days=days - 1)
+    return start, end.strftime(DATE_FORMAT)
+
+
+class DateIndex(object):
+    '''Events for a source keyed by date.
+
+    Keeps the dates covered by the last request so that, when the date
+    changes, the new day's data can be taken from the index rather than
+    requested again.
+
+    many - set to True to keep a list of events for each date (e.g. for a
+    league) rather than a single event.
+    '''
+    __slots__ = ("many", "events", "start", "end", "day")
+
+    def __init__(self, many=False):
+        self.many = many
+        self.events = {}
+        self.start = None
+        self.end = None
+        self.day = None
+
+    def set(self, dated, start, end, day):
+        '''Replaces the index.
+
+        dated - iterable of (date, event) tuples.
+        start, end - the dates covered by the request.
+        day - the date the index was built for.
+        '''
+        events = {}
+
+        for when, event in dated:
+            if self.many:
+                events.setdefault(when, []).append(event)
+            else:
+                events.setdefault(when, event)
+
+        self.events = events
+        self.start = start
+        self.end = end
+        self.day = day
+
+    def covers(self, day):
+        return self.start is not None and self.start <= day <= self.end
+
+    def get(self, day):
+        if self.many:
+            return list(self.events.get(day, []))
+
+        return self.events.get(day)
+
+    def rollover(self, day):
+        '''Returns the data for day if the date has changed since the index
+        was built and the index covers the new day. Otherwise returns None.
+
+        Only the first call on a new day returns data so that later updates
+        request fresh data.
+        '''
+        if self.day is None or self.day == day or not self.covers(day):
+            return None
+
+        self.day = day
+        data = self.get(day)
+
+        if data is None:
+            return {}
+
+        return data
+
+    @property
+    def dates(self):
+        return sorted(self.events)
+
+    def after(self, day):
+        '''Returns the dates from day onwards which have events.'''
+        return [d for d in self.dates if d >= day]
@@ -0,0 +1,75 @@
+from collections import OrderedDict
+import threading
+
+from .stats import getMetrics
+
+
+class EventBus(object):
+    '''Collects MatchEvents from any number of sources so they can be
+    handled together, e.g. once per refresh, rather than as each source
+    updates.
+
+    Events are kept once per match, event type and side so five goals for
+    the home side in one refresh are handed on as one event. The latest
+    event replaces an earlier one but keeps its place in the batch.
+
+    post can be passed as the callback for any of the on_goal, on_red,
+    on_status_change and on_new_match options and is safe to call from any
+    thread.
+
+    handler - called with the list of events by flush.
+    dispatch - called as dispatch(handler, events) to run the handler e.g.
+    an event loop's call_soon_threadsafe. By default the handler is called
+    straight away.
+
+    e.g.:
+        bus = EventBus(show_events, dispatch=loop.call_soon_threadsafe)
+        coordinator = MatchCoordinator(on_goal=bus.post, on_red=bus.post)
+        coordinator.update()
+        bus.flush()
+    '''
+    def __init__(self, handler=None, dispatch=None):
+        self.handler = handler
+        self.dispatch = dispatch
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __repr__(self):
+        return "<EventBus(pending={})>".format(len(self))
+
+    def _key(self, event):
+        return (id(event.match), event.eventType, event.home)
+
+    def post(self, event):
+        key = self._key(event)
+
+        with self._lock:
+            if key in self._pending:
+                getMetrics().incr("bus.coalesced")
+
+            self._pending[key] = event
+
+    def drain(self):
+        '''Returns a list of the pending events, in the order they were
+        first posted, and clears them.'''
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+
+        return events
+
+    def flush(self):
+        '''Passes the pending events to the handler as one list. Returns the
+        number of events.'''
+        events = self.drain()
+
+        if events and self.handler is not None:
+            if self.dispatch is None:
+                self.handler(events)
+            else:
+                self.dispatch(self.handler, events)
+
+        return len(events)
@@ -1,2 +1,8 @@
 class FSConnectionError(Exception):
     pass
+
+
+class FSCircuitOpenError(FSConnectionError):
+    """Raised when requests aren't being sent because of repeated
+    failures."""
+    pass
@@ -0,0 +1,335 @@
+from bisect import bisect_right
+from datetime import datetime
+import heapq
+import itertools
+import threading
+import time
+
+from .base import matchcommon, iterDatedEvents
+from .dateindex import dateWindow
+from .exceptions import FSConnectionError
+from .footballmatch import FootballMatch
+from .league import League
+from .morphlinks import ML
+from .utils import secondsToMidnight
+
+
+def kickOff(event):
+    '''Returns the kick-off time of a match event as a timestamp, or None if
+    it can't be read.'''
+    try:
+        start = event["startTime"].replace("Z", "+00:00")
+        return datetime.fromisoformat(start).timestamp()
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return None
+
+
+class FixtureCalendar(matchcommon):
+    '''Upcoming fixtures for a number of teams and leagues.
+
+    Once a day, refresh downloads the next few days' fixtures for every
+    source. Each match gives the source a window, from pre_kickoff seconds
+    before kick-off until match_length seconds after, during which it needs
+    to be polled. Outside its windows a source can be left alone.
+
+    Windows waiting to open and open windows are kept in heaps ordered by
+    the time they open and close so nextKickOff, liveSources and nextWake
+    only need to look at the top of the heaps.
+
+    Sources without fixtures in the calendar (e.g. because the request
+    failed) are always treated as live. A request which fails isn't tried
+    again for retry_interval seconds.
+
+    Each request can be run on its own thread: pending returns the requests
+    which are needed and fetch makes one of them (see MatchCoordinator).
+
+    e.g.:
+        calendar = FixtureCalendar()
+        calendar.refresh([liverpool, prem])
+        if calendar.isLive(liverpool):
+            liverpool.update()
+    '''
+    FINISHED = ("post-event",)
+
+    def __init__(self, sources=None, days=7, pre_kickoff=15 * 60,
+                 match_length=150 * 60, retry_interval=5 * 60):
+        super(FixtureCalendar, self).__init__()
+        self.days = days
+        self.pre_kickoff = pre_kickoff
+        self.match_length = match_length
+        self.retry_interval = retry_interval
+        self.sources = list(sources or [])
+        self._day = None
+        self._fetched = set()
+        # Pages being requested and when failed pages can be tried again
+        self._fetching = set()
+        self._retry = {}
+        self._known = set()
+        self._kickoffs = {}
+        # (opens, kick-off, seq, source id)
+        self._upcoming = []
+        # (closes, seq, source id)
+        self._open = []
+        # Number of open windows for each source id
+        self._live = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<FixtureCalendar(sources={}, upcoming={})>".format(
+            len(self.sources), len(self._upcoming))
+
+    def _today(self):
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _page(self, source):
+        '''Returns the part of the morph page for the source or None if the
+        source's matches have to be found in the list of all matches.'''
+        if isinstance(source, League):
+            return "tournament/" + source.leagueid
+
+        if source.hasTeamPage:
+            return source.myteampage
+
+        entry = source._catalogueEntry()
+
+        if entry is not None:
+            return "team/" + entry.slug
+
+        return None
+
+    def _groups(self, sources):
+        '''Returns a list of (page, sources) tuples for the requests needed
+        for sources.'''
+        groups = []
+        scan = []
+
+        for source in sources:
+            page = self._page(source)
+
+            if page is None:
+                scan.append(source)
+            else:
+                groups.append((page, [source]))
+
+        if scan:
+            groups.append((ML.MORPH_FIXTURES_ALL, scan))
+
+        return groups
+
+    def _load(self, source, events):
+        '''Adds the windows for the source's (date, event) tuples.'''
+        sid = id(source)
+        kickoffs = []
+
+        for _, event in events:
+            if event.get("eventStatus") in self.FINISHED:
+                continue
+
+            ko = kickOff(event)
+
+            if ko is None:
+                # We can't tell when the source is live so it always is
+                self._known.discard(sid)
+                self._kickoffs.pop(sid, None)
+                return
+
+            kickoffs.append(ko)
+            heapq.heappush(self._upcoming, (ko - self.pre_kickoff, ko,
+                                            next(self._seq), sid))
+
+        self._kickoffs[sid] = sorted(kickoffs)
+        self._known.add(sid)
+
+    def _reset(self):
+        self._known = set()
+        self._fetched = set()
+        self._retry = {}
+        self._kickoffs = {}
+        self._upcoming = []
+        self._open = []
+        self._live = {}
+
+    def pending(self, sources=None, force=False, now=None):
+        '''Returns a list of (page, sources) tuples for the requests needed
+        to download the fixtures for sources which don't have them yet. All
+        sources are downloaded again when the date changes or if force is
+        True. Each request should be passed to fetch.
+
+        Pages which are already being requested, or which failed less than
+        retry_interval seconds ago, are left out.
+
+        sources - replaces the list of sources if provided.
+        '''
+        if sources is not None:
+            self.sources = list(sources)
+
+        if now is None:
+            now = time.time()
+
+        today = self._today()
+
+        with self._lock:
+            if force or self._day != today:
+                self._reset()
+                self._day = today
+
+            todo = [s for s in self.sources if id(s) not in self._fetched]
+
+        groups = []
+
+        for page, group in self._groups(todo):
+            with self._lock:
+                if page in self._fetching or self._retry.get(page, 0) > now:
+                    continue
+
+                self._fetching.add(page)
+
+            groups.append((page, group))
+
+        return groups
+
+    def fetch(self, page, sources):
+        '''Downloads the fixtures on page (from pending) for sources.
+
+        Raises FSConnectionError if the server can't be reached. The page
+        isn't requested again for retry_interval seconds.
+        '''
+        start, end = dateWindow(self._day, self.days)
+        url = FootballMatch.scoreslink.format(start_date=start,
+                                              end_date=end,
+                                              source=page,
+                                              detailed="false")
+
+        try:
+            raw = self._request(url)
+        except Exception:
+            with self._lock:
+                self._retry[page] = time.time() + self.retry_interval
+            raise
+        finally:
+            with self._lock:
+                self._fetching.discard(page)
+
+        events = list(iterDatedEvents(raw))
+
+        with self._lock:
+            self._fetched.update(id(s) for s in sources)
+
+            if not raw:
+                return
+
+            if page != ML.MORPH_FIXTURES_ALL:
+                self._load(sources[0], events)
+                return
+
+            for source in sources:
+                self._load(source, [(d, e) for d, e in events
+                                    if source.checkTeamInMatch(e)])
+
+    def refresh(self, sources=None, force=False):
+        '''Downloads the fixtures for sources which don't have them yet (see
+        pending) one request at a time.
+
+        Returns True if anything was requested. If any request fails, the
+        others are still made and FSConnectionError is raised at the end.
+        '''
+        groups = self.pending(sources, force)
+        error = None
+
+        for page, group in groups:
+            try:
+                self.fetch(page, group)
+            except FSConnectionError as e:
+                error = e
+
+        if error is not None:
+            raise error
+
+        return bool(groups)
+
+    def _advance(self, now):
+        # Open the windows which have started and close those which have
+        # finished
+        while self._upcoming and self._upcoming[0][0] <= now:
+            _, ko, seq, sid = heapq.heappop(self._upcoming)
+            closes = ko + self.match_length
+
+            if closes > now:
+                heapq.heappush(self._open, (closes, seq, sid))
+                self._live[sid] = self._live.get(sid, 0) + 1
+
+        while self._open and self._open[0][0] <= now:
+            _, _, sid = heapq.heappop(self._open)
+            self._live[sid] -= 1
+
+            if not self._live[sid]:
+                del self._live[sid]
+
+    def isLive(self, source, now=None):
+        '''Returns True if the source has an open window or the calendar
+        doesn't know when its matches are.'''
+        with self._lock:
+            self._advance(time.time() if now is None else now)
+            sid = id(source)
+            return sid not in self._known or sid in self._live
+
+    def liveSources(self, now=None):
+        '''Returns a list of the sources which need polling now.'''
+        with self._lock:
+            self._advance(time.time() if now is None else now)
+            return [s for s in self.sources
+                    if id(s) not in self._known or id(s) in self._live]
+
+    def nextKickOff(self, now=None):
+        '''Returns a (timestamp, source) tuple for the next match to kick
+        off, or None.'''
+        with self._lock:
+            self._advance(time.time() if now is None else now)
+            sources = {id(s): s for s in self.sources}
+
+            # Drop windows for sources which have been removed
+            while self._upcoming and self._upcoming[0][3] not in sources:
+                heapq.heappop(self._upcoming)
+
+            if not self._upcoming:
+                return None
+
+            _, ko, _, sid = self._upcoming[0]
+            return ko, sources[sid]
+
+    def nextWake(self, now=None):
+        '''Returns the number of seconds until a window opens or closes or
+        the fixtures need downloading again.'''
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            self._advance(now)
+            # Give the BBC a minute to publish the new day's fixtures
+            times = [now + secondsToMidnight() + 60]
+
+            if self._upcoming:
+                times.append(self._upcoming[0][0])
+
+            if self._open:
+                times.append(self._open[0][0])
+
+        return max(min(times) - now, 0)
+
+    def untilWindow(self, source, now=None):
+        '''Returns the number of seconds until the source's next window
+        opens (0 if it is live).'''
+        if now is None:
+            now = time.time()
+
+        if self.isLive(source, now):
+            return 0
+
+        kickoffs = self._kickoffs.get(id(source), [])
+        i = bisect_right(kickoffs, now - self.match_length)
+
+        if i == len(kickoffs):
+            return secondsToMidnight() + 60
+
+        return max(kickoffs[i] - self.pre_kickoff - now, 0)
@@ -1,16 +1,21 @@
 from datetime import datetime
 from itertools import groupby
 import json
-import requests
+import time
 
-from .base import matchcommon
+from .base import matchcommon, iterDatedEvents
+from .catalogue import getCatalogue, normalise, resolveAlias, slugify
+from .dateindex import DateIndex, dateString, dateWindow
 from .exceptions import FSConnectionError
+from .formatter import compileTemplate
 from .matchdict import MatchDict
-from .matchdict import MatchDictKeys as MDKey
 from .matchevent import MatchEvent
-from .playeraction import PlayerAction
-from .utils import UTC
+from .snapshot import MatchSnapshot
+from .stats import getMetrics
+from .timeline import Timeline
+from .utils import UTC, secondsToMidnight
 from .morphlinks import ML
+from .store import TEAM_PAGE_EXPIRY, getStore
 
 # dateutil is not part of the standard library so let's see if we can import
 # and set a flag showing success or otherwise
@@ -25,8 +30,6 @@ except ImportError:
 # We need a UTC timezone to do some datetime manipulations
 TZ_UTZ = UTC()
 
-API_BASE = "http://push.api.bbci.co.uk"
-
 
 class FootballMatch(matchcommon):
     '''Class for getting details of individual football matches.
@@ -39,6 +42,8 @@ class FootballMatch(matchcommon):
     detailprefix = ("http://www.bbc.co.uk/sport/football/live/"
                     "partial/{id}")
 
+    teamprefix = "https://www.bbc.co.uk/sport/football/teams/"
+
     match_format = {"%H": "HomeTeam",
                     "%A": "AwayTeam",
                     "%h": "HomeScore",
@@ -52,6 +57,13 @@ class FootballMatch(matchcommon):
                     "%g": "AwayScorerText",
                     "%C": "Competition"}
 
+    # Properties which need player actions i.e. a detailed request
+    DETAIL_PROPERTIES = ("HomeRedCards", "AwayRedCards", "HomeScorerText",
+                         "AwayScorerText")
+
+    # Seconds to request detailed data for after the score changes
+    DETAIL_AFTER_CHANGE = 3 * 60
+
     ACTION_GOAL = "goal"
     ACTION_RED_CARD = "red-card"
     ACTION_YELLOW_RED_CARD = "yellow-red-card"
@@ -64,7 +76,8 @@ class FootballMatch(matchcommon):
 
     def __init__(self, team, detailed=True, data=None, on_goal=None,
                  on_red=None, on_status_change=None, on_new_match=None,
-                 matchdate=None, events_on_first_run=False):
+                 matchdate=None, events_on_first_run=False, keep_raw=False,
+                 window=1, timeline_size=64, stream_scan=False):
         '''Creates an instance of the Match object.
         Must be created by passing the name of one team.
 
@@ -73,12 +86,44 @@ class FootballMatch(matchcommon):
         can handle request on its own.
 
         detailed - Do we want additional data (e.g. goal scorers, bookings)?
+        If False, detailed data is still requested for a few minutes after
+        the score changes or after calling requestDetail. Red cards are only
+        seen in detailed data so on_red only fires while it is requested.
+
+        keep_raw - Keep the JSON for the match (available as raw). Off by
+        default to save memory.
+
+        The match is held in snapshot, a read only MatchSnapshot. With
+        keep_raw, match gives the BBC's JSON for the match as a MatchDict,
+        with attribute access e.g. match.homeTeam.name.full.
+
+        window - Number of days of fixtures to request, starting with today
+        (or matchdate). The team's matches on the other days are kept so
+        that the next day's match, and NextMatch, don't need another
+        request.
+
+        timeline_size - Number of goals, cards and period changes to keep in
+        the timeline.
+
+        stream_scan - If the team has no team page, find its match by
+        scanning the list of all matches as it downloads (see streamscan)
+        rather than decoding the whole list.
         '''
         super(FootballMatch, self).__init__()
         self.detailed = detailed
         self.myteam = team
-        self.match = MatchDict()
+        self._teamnames = None
+        self.keep_raw = keep_raw
+        self.snapshot = None
+        self._matchdict = None
+        self.revision = 0
+        self._rendered = {}
+        self.timeline = Timeline(timeline_size)
+        self._detailUntil = 0
+        self.stream_scan = stream_scan
         self._matchdate = self._check_match_date(matchdate)
+        self.window = max(int(window), 1)
+        self._dates = DateIndex()
 
         self._on_red = on_red
         self._on_goal = on_goal
@@ -87,6 +132,8 @@ class FootballMatch(matchcommon):
 
         self._clearFlags()
 
+        self.hasTeamPage = False
+
         if data is None:
             self.hasTeamPage = self._findTeamPage()
 
@@ -101,7 +148,7 @@ class FootballMatch(matchcommon):
 
     def __nonzero__(self):
 
-        return bool(self.match)
+        return bool(self.snapshot)
 
     def __bool__(self):
 
@@ -114,7 +161,7 @@ class FootballMatch(matchcommon):
     def __eq__(self, other):
         if isinstance(other, self.__class__):
             try:
-                return self.match.eventKey == other.match.eventKey
+                return self.snapshot.eventKey == other.snapshot.eventKey
             except AttributeError:
                 return self.myteam == other.myteam
         else:
@@ -137,7 +184,7 @@ class FootballMatch(matchcommon):
 
             def wrapped(self):
 
-                if self.match:
+                if self.snapshot:
                     return func(self)
 
                 else:
@@ -178,23 +225,12 @@ class FootballMatch(matchcommon):
 
     def _dump(self, filename):
 
-        c = {k: v for k, v in self.match.iteritems() if k != "_callbacks"}
+        if self.raw is None:
+            raise ValueError("The match's JSON is only kept if the match is "
+                             "created with keep_raw=True.")
 
         with open(filename, "w") as f:
-            json.dump(c, f, indent=4)
-
-    def _request(self, url):
-        url = API_BASE + url
-        try:
-            r = requests.get(url)
-        except (requests.exceptions.ConnectionError,
-                requests.exceptions.Timeout):
-            raise FSConnectionError
-
-        if r.status_code == 200:
-            return r.json()
-        else:
-            return dict()
+            json.dump(self.raw, f, indent=4)
 
     def _check_match_date(self, matchdate):
 
@@ -209,196 +245,273 @@ class FootballMatch(matchcommon):
             raise ValueError("Invalid match date. "
                              "Match date format must by YYYY-MM-DD.")
 
+    def _cacheTtl(self):
+        # A finished match won't change again so a cached response can be
+        # used until the end of the day.
+        if self.isFinished:
+            return secondsToMidnight()
+
+        return None
+
     def _canUpdate(self):
 
         return self.hasTeamPage
 
     def _scanLeagues(self):
 
+        if self.stream_scan:
+            return self._streamScan()
+
         raw = self._getScoresFixtures(source=ML.MORPH_FIXTURES_ALL)
 
-        comps = raw.get("matchData", None)
+        return self._findTeamInFixtures(raw)
+
+    def _streamScan(self):
+        r = self._requestStream(
+            self._scoresFixturesUrl(source=ML.MORPH_FIXTURES_ALL))
+
+        if r is None:
+            return None
+
+        found = []
+
+        try:
+            for date, event in self._streamEvents(r):
+                if self.checkTeamInMatch(event):
+                    found.append((date, event))
+
+                    # Only one day was requested so we have the match
+                    if self.window == 1:
+                        getMetrics().incr("stream_scan.early_stop")
+                        break
+        finally:
+            r.close()
+
+        return self._indexEvents(found)
+
+    def _findTeamInFixtures(self, raw):
+
+        return self._indexEvents((d, m) for d, m in iterDatedEvents(raw)
+                                 if self.checkTeamInMatch(m))
+
+    def _currentDate(self):
+        return self._matchdate or datetime.now().strftime("%Y-%m-%d")
+
+    def _indexEvents(self, dated, start=None, end=None):
+        '''Replaces the index of the team's matches by date and returns the
+        match for the current date (or None).
+
+        start, end - dates covered by the request. Defaults to the window.
+        '''
+        day = self._currentDate()
+
+        if start is None:
+            start, end = dateWindow(day, self.window)
+
+        self._dates.set(dated, start, end, day)
 
-        if not comps:
-            return Nonce
+        return self._dates.get(day)
 
-        for comp in comps:
-            matches = list(comp["tournamentDatesWithEvents"].values())[0][0]
-            matches = matches["events"]
-            for m in matches:
-                if self.checkTeamInMatch(m):
-                    return m
+    def _catalogueEntry(self):
+        catalogue = getCatalogue(fetch=False)
+
+        if catalogue is not None:
+            return catalogue.findTeam(resolveAlias(self.myteam))
 
         return None
 
+    def _findTeamNames(self):
+        names = set([normalise(self.myteam),
+                     normalise(resolveAlias(self.myteam))])
+
+        entry = self._catalogueEntry()
+        if entry is not None:
+            names.update(getCatalogue(fetch=False).names(entry))
+
+        names.discard("")
+
+        return frozenset(names)
+
     def checkTeamInMatch(self, m):
-        home = [m["homeTeam"]["name"][x].lower()
-                    for x in ["first", "full", "abbreviation", "last"]
-                    if m["homeTeam"]["name"][x]]
+        # Built once, on first use, as most matches created by a League
+        # never need it.
+        if self._teamnames is None:
+            self._teamnames = self._findTeamNames()
 
-        away = [m["awayTeam"]["name"][x].lower()
-                    for x in ["first", "full", "abbreviation", "last"]
-                    if m["awayTeam"]["name"][x]]
+        for side in ("homeTeam", "awayTeam"):
+            name = m[side]["name"]
+            for x in ("first", "full", "abbreviation", "last"):
+                if name.get(x) and normalise(name[x]) in self._teamnames:
+                    return True
 
-        return self.myteam.lower() in (home + away)
+        return False
+
+    def _teamPage(self):
+        entry = self._catalogueEntry()
+
+        if entry is not None:
+            team = entry.slug
+        else:
+            team = slugify(resolveAlias(self.myteam))
 
+        teampage = self.teamprefix + team
+        return team, teampage
 
-    def _findTeamPage(self):
-        team = "-".join(self.myteam.lower().split(" "))
-        teampage = "https://www.bbc.co.uk/sport/football/teams/" + team
-        validteam = self.checkPage(teampage)
+    def _setTeamPage(self, team, validteam):
         if validteam:
             self.myteampage = "team/{}".format(team)
             return True
         else:
             return False
 
+    def _storedTeamPage(self, team):
+        return getStore().get("teampage:" + team)
+
+    def _storeTeamPage(self, team, status):
+        # Only remember a definite answer. Errors (and no answer at all) are
+        # checked again next time.
+        if status in (200, 404):
+            getStore().set("teampage:" + team, status == 200,
+                           TEAM_PAGE_EXPIRY)
+
+        return status == 200
+
+    def _findTeamPage(self, request=True):
+        '''Returns True if the team has its own page of fixtures.
+
+        request - set to False to only use the answer in the store. None is
+        returned if it isn't there.
+        '''
+        team, teampage = self._teamPage()
+        validteam = self._storedTeamPage(team)
+
+        if validteam is None:
+            if not request:
+                return None
+
+            validteam = self._storeTeamPage(team, self._pageStatus(teampage))
+
+        return self._setTeamPage(team, validteam)
+
     def _getScoresFixtures(self, start_date=None, end_date=None,
+                           source=None, detailed=None, ttl=None):
+
+        return self._request(self._scoresFixturesUrl(start_date=start_date,
+                                                     end_date=end_date,
+                                                     source=source,
+                                                     detailed=detailed),
+                             ttl=ttl)
+
+    def _scoresFixturesUrl(self, start_date=None, end_date=None,
                            source=None, detailed=None):
         if start_date is None:
-            if self._matchdate:
-                start_date = self._matchdate
-            else:
-                start_date = datetime.now().strftime("%Y-%m-%d")
+            start_date = self._currentDate()
 
         if end_date is None:
-            if self._matchdate:
-                end_date = self._matchdate
-            else:
-                end_date = datetime.now().strftime("%Y-%m-%d")
+            end_date = dateWindow(start_date, self.window)[1]
 
         if source is None and self.hasTeamPage:
             source = self.myteampage
 
         if detailed is None:
-            detailed = self.detailed
-
-        pl = self.scoreslink.format(start_date=start_date,
-                                    end_date=end_date,
-                                    source=source,
-                                    detailed=str(detailed).lower())
+            detailed = self.wantsDetail
 
-        return self._request(pl)
+        return self.scoreslink.format(start_date=start_date,
+                                      end_date=end_date,
+                                      source=source,
+                                      detailed=str(detailed).lower())
 
     def _findMatch(self, payload):
-        match = payload["matchData"]
+        # The team page only has the team's matches so every event is kept
+        return self._indexEvents(iterDatedEvents(payload))
 
-        if match:
-            return list(match[0]["tournamentDatesWithEvents"].values())[0][0]["events"][0]  # noqa: E501
-        else:
-            return None
-
-    def _setCallbacks(self):
-        self.match.add_callback(MDKey.HOME_TEAM, self._checkHomeTeamEvent)
-        self.match.add_callback(MDKey.AWAY_TEAM, self._checkAwayTeamEvent)
-        self.match.add_callback(MDKey.PROGRESS, self._checkStatus)
-
-    def _getEvents(self, event, event_type):
-        events = []
-
-        player_actions = event.get("playerActions", list())
-
-        for acts in player_actions:
-            # player = acts["name"]["abbreviation"]
-            for act in acts["actions"]:
-                if act["type"] == event_type:
-                    pa = PlayerAction(acts, act)
-                    events.append(pa)
-
-        return sorted(events)
-
-    def _lastEvent(self, event_type, just_home=False, just_away=False):
-        events = []
+    def _getEvents(self, team, event_type):
+        return list(team.index.get(event_type))
 
+    def _teams(self, just_home=False, just_away=False):
         if just_home and just_away:
             just_home = just_away = False
 
+        teams = []
+
         if not just_away:
-            events += self._getEvents(self.match.homeTeam, event_type)
+            teams.append(self.snapshot.homeTeam)
 
         if not just_home:
-            events += self._getEvents(self.match.awayTeam, event_type)
+            teams.append(self.snapshot.awayTeam)
+
+        return teams
 
-        events = sorted(events)
+    def _latest(self, events):
+        events = [e for e in events if e is not None]
 
         if events:
-            return events[-1]
+            return sorted(events)[-1]
         else:
             return None
 
-    def _lastReds(self, just_home=False, just_away=False):
-
-        reds = []
-        red = self._lastEvent(self.ACTION_RED_CARD,
-                              just_home=just_home,
-                              just_away=just_away)
-        yellow = self._lastEvent(self.ACTION_YELLOW_RED_CARD,
-                                 just_home=just_home,
-                                 just_away=just_away)
-
-        if red:
-            reds.append(red)
-
-        if yellow:
-            reds.append(yellow)
+    def _lastEvent(self, event_type, just_home=False, just_away=False):
+        return self._latest(t.index.last(event_type)
+                            for t in self._teams(just_home, just_away))
 
-        if reds:
-            return sorted(reds)[-1]
-        else:
-            return None
+    def _lastReds(self, just_home=False, just_away=False):
+        return self._latest(t.index.lastRed
+                            for t in self._teams(just_home, just_away))
 
-    def _getReds(self, event):
-        reds = []
-        reds += self._getEvents(event, self.ACTION_RED_CARD)
-        reds += self._getEvents(event, self.ACTION_YELLOW_RED_CARD)
-        return sorted(reds)
+    def _getReds(self, team):
+        return list(team.index.reds)
 
-    def _getGoals(self, event):
-        return self._getEvents(event, self.ACTION_GOAL)
+    def _getGoals(self, team):
+        return self._getEvents(team, self.ACTION_GOAL)
 
     def _checkGoal(self, old, new):
-        return ((old.scores.score != new.scores.score)
-                and (new.scores.score > 0))
+        return ((old.score != new.score)
+                and bool(new.score) and (new.score > 0))
 
-    def _checkRed(self, old, new):
+    def _checkRed(self, old, new, since):
+        if old.actions == new.actions:
+            return False
 
-        old_reds = self._getReds(old)
-        new_reds = self._getReds(new)
+        # The first detailed data for the match has every red card so far.
+        # Only those after since, the time in the match of the last update,
+        # are new.
+        if not old.hasActions:
+            return any((r._actiontime or 0, r._actionaddedtime or 0) > since
+                       for r in new.index.reds)
 
-        return old_reds != new_reds
+        return old.index.reds != new.index.reds
 
-    def _checkHomeTeamEvent(self, event):
-        self._checkTeamEvent(event, home=True)
+    def _checkChanges(self, old, new, changed):
+        # Only compare the parts of the snapshots which actually changed
 
-    def _checkAwayTeamEvent(self, event):
-        self._checkTeamEvent(event, home=False)
+        if "homeTeam.score" in changed:
+            self._homegoal = self._checkGoal(old.homeTeam, new.homeTeam)
 
-    def _checkTeamEvent(self, event, home=True):
+        if "awayTeam.score" in changed:
+            self._awaygoal = self._checkGoal(old.awayTeam, new.awayTeam)
 
-        if home:
-            old = self._old.homeTeam
-        else:
-            old = self._old.awayTeam
+        since = (old.minutesElapsed or 0, old.addedTime or 0)
 
-        new = MatchDict(event)
+        if "homeTeam.actions" in changed:
+            self._homered = self._checkRed(old.homeTeam, new.homeTeam, since)
 
-        goal = self._checkGoal(old, new)
-        red = self._checkRed(old, new)
+        if "awayTeam.actions" in changed:
+            self._awayred = self._checkRed(old.awayTeam, new.awayTeam, since)
 
-        if goal:
-            if home:
-                self._homegoal = True
-            else:
-                self._awaygoal = True
+        if "period" in changed:
+            self._statuschange = True
 
-        if red:
-            if home:
-                self._homered = True
-            else:
-                self._awayred = True
+    def _updateTimeline(self, old, new, changed):
+        if old is None or old.eventKey != new.eventKey:
+            self.timeline.newMatch()
+            changed = None
+
+        for home, side in ((True, "homeTeam"), (False, "awayTeam")):
+            if changed is None or side + ".actions" in changed:
+                self.timeline.addActions(home, getattr(new, side).actions)
 
-    def _checkStatus(self, status):
-        self._statuschange = True
+        if changed is not None and "period" in changed:
+            self.timeline.addPeriod(new.period)
 
     def _clearFlags(self):
         self._homegoal = False
@@ -410,6 +523,8 @@ class FootballMatch(matchcommon):
 
     def _fireEvent(self, func, payload):
 
+        getMetrics().incr("events." + payload.eventType)
+
         try:
             func(payload)
         except TypeError:
@@ -428,12 +543,12 @@ class FootballMatch(matchcommon):
             self._fireEvent(func, payload)
 
         if self._homered:
-            func = self.on_goal
+            func = self.on_red
             payload = MatchEvent(MatchEvent.TYPE_RED_CARD, self, True)
             self._fireEvent(func, payload)
 
         if self._awayred:
-            func = self.on_goal
+            func = self.on_red
             payload = MatchEvent(MatchEvent.TYPE_RED_CARD, self, False)
             self._fireEvent(func, payload)
 
@@ -499,9 +614,47 @@ class FootballMatch(matchcommon):
 
         return out
 
+    def _formatFields(self):
+        return tuple((k[1], v) for k, v in self.match_format.items())
+
+    def needsDetail(self, text):
+        '''Returns True if formatting text needs detailed data (e.g. goal
+        scorers).'''
+        return any(prop in self.DETAIL_PROPERTIES
+                   for _, prop in compileTemplate(text,
+                                                  self._formatFields()).names)
+
+    def requestDetail(self, duration=None):
+        '''Requests detailed data for the next duration seconds (default
+        DETAIL_AFTER_CHANGE) even if the match isn't detailed.'''
+        if duration is None:
+            duration = self.DETAIL_AFTER_CHANGE
+
+        self._detailUntil = max(self._detailUntil, time.time() + duration)
+
+    @property
+    def wantsDetail(self):
+        return self.detailed or time.time() < self._detailUntil
+
     def formatText(self, text):
-        values = {k[1]: getattr(self, v) for k, v in self.match_format.items()}
-        return text.format(**values)
+        '''Formats text e.g. "{H} {h}-{a} {A}". See match_format for the
+        available fields.
+
+        The result is cached until the match changes.
+        '''
+        revision = self.revision
+        cached = self._rendered.get(text)
+
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+
+        rendered = compileTemplate(text, self._formatFields()).render(self)
+
+        if len(self._rendered) > 16:
+            self._rendered.clear()
+
+        self._rendered[text] = (revision, rendered)
+        return rendered
 
     def formatMatch(self, fmt):
 
@@ -530,43 +683,69 @@ class FootballMatch(matchcommon):
 
     def update(self, data=None, first_run=False):
 
+        match = None
+
+        # When the date changes, the new day's match comes from the index
+        if data is None:
+            data = self._dates.rollover(self._currentDate())
+
         if data is None and not self._canUpdate():
             data = self._scanLeagues()
 
         elif data is None:
-            rawdata = self._getScoresFixtures()
-            if rawdata:
-                match = self._findMatch(rawdata)
-            else:
-                match = None
+            rawdata = self._getScoresFixtures(ttl=self._cacheTtl())
+
+            # An error response doesn't mean the match has gone so the
+            # match is kept until the server answers properly
+            if not rawdata:
+                raise FSConnectionError
+
+            match = self._findMatch(rawdata)
 
         if data:
             match = data
 
         if match:
 
-            if not self.match:
-                self.match = MatchDict(match, add_callbacks=True)
-                self._setCallbacks()
-                self._old = self.match
-                self._clearFlags()
-                self._matchfound = True
-                if not first_run:
-                    self._fireEvents()
+            old = self.snapshot
+            self._clearFlags()
+
+            new = MatchSnapshot(match, previous=old, keep_raw=self.keep_raw)
 
+            # Nothing has changed so the old snapshot, and everything worked
+            # out from it, is kept
+            if new == old and (not self.keep_raw or match == old.raw):
+                return True
+
+            if old is None:
+                self._matchfound = True
+                changed = None
             else:
-                self._clearFlags()
-                self.match.update(match)
-                if not first_run:
-                    self._fireEvents()
-                self._old = self.match
+                changed = old.diff(new)
+                self._checkChanges(old, new, changed)
+
+                # Get the scorer on the next update
+                if self._homegoal or self._awaygoal:
+                    self.requestDetail()
+
+            self._updateTimeline(old, new, changed)
+
+            # Swap in the new snapshot in one go
+            self.snapshot = new
+
+            if new != old:
+                self.revision += 1
+
+            if not first_run:
+                self._fireEvents()
 
             return True
 
         # Need this to clear the match if no data (e.g. next day)
-        elif match is None and self.match:
+        elif match is None and self.snapshot:
             self._clearFlags()
-            self.match = MatchDict()
+            self.snapshot = None
+            self.revision += 1
             return True
 
         return False
@@ -623,13 +802,32 @@ class FootballMatch(matchcommon):
         if callable(func):
             self._on_new_match = func
 
+    @property
+    def match(self):
+        '''Returns the BBC's JSON for the match as a MatchDict. The MatchDict
+        is a copy: changing it doesn't change the match. Empty unless the
+        match was created with keep_raw=True.
+
+        Built when first asked for after each change so the properties of
+        FootballMatch should be preferred.
+        '''
+        event = self.raw
+
+        if event is None:
+            return MatchDict()
+
+        if self._matchdict is None or self._matchdict[0] is not event:
+            self._matchdict = (event, MatchDict(event))
+
+        return self._matchdict[1]
+
     @property
     @_no_match(str())
     def HomeTeam(self):
         """Returns string of the home team's name
 
         """
-        return self.match.homeTeam.name.full
+        return self.snapshot.homeTeam.fullName
 
     @property
     @_no_match(str())
@@ -637,7 +835,7 @@ class FootballMatch(matchcommon):
         """Returns string of the away team's name
 
         """
-        return self.match.awayTeam.name.full
+        return self.snapshot.awayTeam.fullName
 
     @property
     @_no_match(int())
@@ -646,7 +844,7 @@ class FootballMatch(matchcommon):
         """Returns the number of goals scored by the home team
 
         """
-        return self.match.homeTeam.scores.score
+        return self.snapshot.homeTeam.score
 
     @property
     @_no_match(int())
@@ -655,7 +853,7 @@ class FootballMatch(matchcommon):
         """Returns the number of goals scored by the away team
 
         """
-        return self.match.awayTeam.scores.score
+        return self.snapshot.awayTeam.score
 
     @property
     @_no_match(str())
@@ -665,7 +863,7 @@ class FootballMatch(matchcommon):
         e.g. "Premier League", "FA Cup" etc
 
         """
-        return self.match.tournamentName.full
+        return self.snapshot.tournamentName
 
     @property
     @_no_match(str())
@@ -675,13 +873,13 @@ class FootballMatch(matchcommon):
         e.g. "L", "HT", "FT"
 
         """
-        return self.match.eventProgress.period
+        return self.snapshot.period
 
     @property
     @_no_match(str())
     def LongStatus(self):
 
-        return self.match.eventStatusNote
+        return self.snapshot.statusNote
 
     @property
     @_no_match(str())
@@ -713,28 +911,28 @@ class FootballMatch(matchcommon):
     @_no_match(int())
     @_override_none(0)
     def ElapsedTime(self):
-        return self.match.minutesElapsed
+        return self.snapshot.minutesElapsed
 
     @property
     @_no_match(int())
     @_override_none(0)
     def AddedTime(self):
-        return self.match.minutesIntoAddedTime
+        return self.snapshot.addedTime
 
     @property
     @_no_match(str())
     def Venue(self):
-        return self.match.venue.name.full
+        return self.snapshot.venue
 
     @property
     @_no_match(False)
     def isFixture(self):
-        return self.match.eventStatus == "pre-event"
+        return self.snapshot.eventStatus == "pre-event"
 
     @property
     @_no_match(False)
     def isLive(self):
-        return (self.match.eventStatus == "mid-event" and
+        return (self.snapshot.eventStatus == "mid-event" and
                 not self.Status == self.STATUS_HALF_TIME)
 
     @property
@@ -745,17 +943,17 @@ class FootballMatch(matchcommon):
     @property
     @_no_match(False)
     def isFinished(self):
-        return self.match.eventStatus == "post-event"
+        return self.snapshot.eventStatus == "post-event"
 
     @property
     @_no_match(False)
     def isInAddedTime(self):
-        return self.match.minutesIntoAddedTime > 0
+        return (self.snapshot.addedTime or 0) > 0
 
     @property
     @_no_match(False)
     def isPostponed(self):
-        return self.match.eventStatus == "postponed"
+        return self.snapshot.eventStatus == "postponed"
 
     @property
     @_no_match(list())
@@ -763,7 +961,7 @@ class FootballMatch(matchcommon):
         """Returns list of goalscorers for home team
 
         """
-        return self._getGoals(self.match.homeTeam)
+        return self._getGoals(self.snapshot.homeTeam)
 
     @property
     @_no_match(str())
@@ -776,7 +974,7 @@ class FootballMatch(matchcommon):
         """Returns list of goalscorers for away team
 
         """
-        return self._getGoals(self.match.awayTeam)
+        return self._getGoals(self.snapshot.awayTeam)
 
     @property
     @_no_match(str())
@@ -804,7 +1002,7 @@ class FootballMatch(matchcommon):
         """Returns list of players sent off for home team
 
         """
-        return self._getReds(self.match.homeTeam)
+        return self._getReds(self.snapshot.homeTeam)
 
     @property
     @_no_match(list())
@@ -812,7 +1010,7 @@ class FootballMatch(matchcommon):
         """Returns list of players sent off for away team
 
         """
-        return self._getReds(self.match.awayTeam)
+        return self._getReds(self.snapshot.awayTeam)
 
     @property
     @_no_match(str())
@@ -837,7 +1035,7 @@ class FootballMatch(matchcommon):
         Should handle accented characters.
 
         """
-        if self.match:
+        if self.snapshot:
 
             return u"%s %s-%s %s (%s)" % (
                                           self.HomeTeam,
@@ -863,13 +1061,13 @@ class FootballMatch(matchcommon):
     @_no_match(str())
     def StartTimeUK(self):
 
-        return self.match.startTimeInUKHHMM
+        return self.snapshot.startTimeUK
 
     @property
     @_no_match(None)
     def StartTimeDatetime(self):
 
-        st = self.match.startTime
+        st = self.snapshot.startTime
 
         if HAS_DATEUTIL:
             try:
@@ -885,7 +1083,15 @@ class FootballMatch(matchcommon):
     @_no_match(None)
     def StartTime(self):
 
-        return self.match.startTime
+        return self.snapshot.startTime
+
+    @property
+    @_no_match(None)
+    def raw(self):
+        '''Returns the JSON for the match. Only available if the match was
+        created with keep_raw=True.
+        '''
+        return self.snapshot.raw
 
     @property
     @_no_match(None)
@@ -900,3 +1106,34 @@ class FootballMatch(matchcommon):
 
         else:
             return None
+
+    @property
+    def MatchDates(self):
+        '''Returns a sorted list of the dates ("YYYY-MM-DD") in the fetched
+        window on which the team has a match.'''
+        return self._dates.dates
+
+    def matchOn(self, date):
+        '''Returns a new FootballMatch for the team's match on date (a
+        "YYYY-MM-DD" string or a date) from the fetched window, or None.
+        No request is made.
+        '''
+        event = self._dates.get(dateString(date))
+
+        if not event:
+            return None
+
+        return FootballMatch(self.myteam, data=event, detailed=self.detailed,
+                             keep_raw=self.keep_raw)
+
+    @property
+    def NextMatch(self):
+        '''Returns a FootballMatch for the team's next match that hasn't
+        started from the fetched window, or None.'''
+        for date in self._dates.after(self._currentDate()):
+            match = self.matchOn(date)
+
+            if match and match.isFixture:
+                return match
+
+        return None
@@ -0,0 +1,46 @@
+from functools import lru_cache
+from string import Formatter
+
+
+class MatchTemplate(object):
+    '''A format string (e.g. "{H} {h}-{a} {A}") which has been parsed to
+    find the fields it uses.
+
+    fields - dict of field names to the name of the FootballMatch property
+    providing the value.
+    '''
+    __slots__ = ("text", "names")
+
+    def __init__(self, text, fields):
+        self.text = text
+        names = {}
+
+        for _, field, _, _ in Formatter().parse(text):
+            if not field:
+                continue
+
+            # Only the first part of e.g. "{H.upper}" or "{h[0]}" is a field
+            key = field.split(".")[0].split("[")[0]
+
+            if key in fields:
+                names[key] = fields[key]
+
+        self.names = tuple(names.items())
+
+    def __repr__(self):
+        return "<MatchTemplate({!r})>".format(self.text)
+
+    def render(self, match):
+        '''Formats the template with values from the match. Only the
+        properties referenced by the template are read.
+        '''
+        return self.text.format(**{k: getattr(match, v)
+                                   for k, v in self.names})
+
+
+@lru_cache(maxsize=64)
+def compileTemplate(text, fields):
+    '''Returns a MatchTemplate for the text. fields must be hashable (e.g. a
+    tuple of (field, property) pairs).
+    '''
+    return MatchTemplate(text, dict(fields))
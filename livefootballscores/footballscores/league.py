@@ -1,10 +1,12 @@
 from datetime import datetime
-import requests
+import time
 
-from .base import matchcommon
+from .base import matchcommon, iterDatedEvents
+from .catalogue import getCatalogue, resolveAlias, slugify
+from .dateindex import DateIndex, dateString, dateWindow
+from .exceptions import FSConnectionError
 from .footballmatch import FootballMatch
-
-API_BASE = "http://push.api.bbci.co.uk"
+from .utils import secondsToMidnight
 
 
 class League(matchcommon):
@@ -16,16 +18,28 @@ class League(matchcommon):
                   "version/2.4.0")
 
     def __init__(self, league, detailed=False, on_goal=None,
-                 on_red=None, on_status_change=None, on_new_match=None):
+                 on_red=None, on_status_change=None, on_new_match=None,
+                 data=None, keep_raw=False, window=1):
+        '''window - Number of days of fixtures to request, starting with
+        today. Matches on the other days are kept by date (see matchesOn)
+        and the next day's matches are taken from them when the date
+        changes.
+        '''
         super(League, self).__init__()
         self.league = league
         self.matches = []
+        self._index = {}
+        self._events = {}
         self.detailed = detailed
+        self.keep_raw = keep_raw
+        self.window = max(int(window), 1)
+        self._detailUntil = 0
+        self._dates = DateIndex(many=True)
         self.on_goal = on_goal
         self.on_red = on_red
         self.on_status_change = on_status_change
         self.on_new_match = on_new_match
-        self._setup()
+        self._setup(data)
 
     def __iter__(self):
         self.index = 0
@@ -53,109 +67,189 @@ class League(matchcommon):
 
         return self.__nonzero__()
 
-    def _setup(self):
-        lg = "-".join(self.league.lower().split(" "))
-        self.leagueid = lg
-        if self.leagueid:
-            self.matches = self.getMatches()
+    def _leagueId(self):
+        name = resolveAlias(self.league)
+        catalogue = getCatalogue(fetch=False)
 
-    def _request(self, url):
-        url = API_BASE + url
-        r = requests.get(url)
-        if r.status_code == 200:
-            return r.json()
-        else:
-            return dict()
+        if catalogue is not None:
+            entry = catalogue.findTournament(name)
+            if entry is not None:
+                return entry.slug
+
+        return slugify(name)
+
+    def _setup(self, data=None):
+        self.leagueid = self._leagueId()
+        if self.leagueid:
+            self._update(data)
 
     def findleague(self, league):
-        leagues = self.getTournaments()
-        if leagues:
-            for lg in leagues:
-                if lg["name"].lower() == league.lower():
-                    return lg["url"].split("/")[3]
+        catalogue = getCatalogue()
+
+        if catalogue is not None:
+            entry = catalogue.findTournament(league)
+            if entry is not None:
+                return entry.slug
 
         return None
 
     def _getScoresFixtures(self, start_date=None, end_date=None,
+                           source=None, detailed=None, ttl=None):
+
+        return self._request(self._scoresFixturesUrl(start_date=start_date,
+                                                     end_date=end_date,
+                                                     source=source,
+                                                     detailed=detailed),
+                             ttl=ttl)
+
+    def _scoresFixturesUrl(self, start_date=None, end_date=None,
                            source=None, detailed=None):
         if start_date is None:
-            start_date = datetime.now().strftime("%Y-%m-%d")
+            start_date = self._currentDate()
 
         if end_date is None:
-            end_date = datetime.now().strftime("%Y-%m-%d")
+            end_date = dateWindow(start_date, self.window)[1]
 
         if source is None and self.leagueid:
             source = self.leagueid
 
         if detailed is None:
-            detailed = self.detailed
+            detailed = self.wantsDetail
 
-        pl = self.leaguelink.format(start_date=start_date,
-                                    end_date=end_date,
-                                    tournament=source,
-                                    detailed=str(detailed).lower())
+        return self.leaguelink.format(start_date=start_date,
+                                      end_date=end_date,
+                                      tournament=source,
+                                      detailed=str(detailed).lower())
 
-        return self._request(pl)
+    def requestDetail(self, duration=None):
+        '''Requests detailed data for the league for the next duration
+        seconds.'''
+        if duration is None:
+            duration = FootballMatch.DETAIL_AFTER_CHANGE
+
+        self._detailUntil = max(self._detailUntil, time.time() + duration)
+
+    @property
+    def wantsDetail(self):
+        '''True if the league is detailed or detail has been requested for
+        the league or any of its matches (e.g. after a goal).'''
+        return (self.detailed or time.time() < self._detailUntil or
+                any(m.wantsDetail for m in self.matches))
+
+    def _cacheTtl(self):
+        if self.matches and all(m.isFinished for m in self.matches):
+            return secondsToMidnight()
+
+        return None
 
     def _getRawData(self):
-        rawdata = self._getScoresFixtures()
+        rawdata = self._getScoresFixtures(ttl=self._cacheTtl())
+
+        # Keep the matches rather than clearing them on an error response
         if not rawdata:
-            return []
+            raise FSConnectionError
+
+        return self._parseRawData(rawdata)
 
-        if not rawdata.get("matchData"):
+    def _currentDate(self):
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _parseRawData(self, rawdata):
+        if not rawdata:
             return []
 
-        data = rawdata["matchData"][0]["tournamentDatesWithEvents"]
+        return self._indexEvents(iterDatedEvents(rawdata))
 
-        mdata = []
-        for event in list(data.values())[0]:
-            mdata += event["events"]
+    def _indexEvents(self, dated, start=None, end=None):
+        '''Replaces the index of matches by date and returns the list of
+        today's match events.
 
-        return mdata
+        start, end - dates covered by the request. Defaults to the window.
+        '''
+        day = self._currentDate()
 
-    def getMatches(self):
+        if start is None:
+            start, end = dateWindow(day, self.window)
 
-        matches = []
+        self._dates.set(dated, start, end, day)
 
-        data = self._getRawData()
+        return self._dates.get(day)
 
-        for m in data:
-            home = m["homeTeam"]["name"]["abbreviation"]
-            fmatch = FootballMatch(home,
-                                   data=m,
-                                   detailed=self.detailed,
-                                   on_goal=self.on_goal,
-                                   on_red=self.on_red,
-                                   on_status_change=self.on_status_change,
-                                   on_new_match=self.on_new_match)
-            matches.append(fmatch)
+    def _eventKey(self, m):
+        return m.get("eventKey") or m["homeTeam"]["name"]["abbreviation"]
 
-        return matches
+    def _createMatch(self, m):
+        home = m["homeTeam"]["name"]["abbreviation"]
+        return FootballMatch(home,
+                             data=m,
+                             detailed=self.detailed,
+                             on_goal=self.on_goal,
+                             on_red=self.on_red,
+                             on_status_change=self.on_status_change,
+                             on_new_match=self.on_new_match,
+                             keep_raw=self.keep_raw)
 
-    def _update(self):
-        data = self._getRawData()
+    def getMatches(self, data=None):
+        """Returns a list of new FootballMatch objects for the league's
+        matches. This does not change the matches held by the league.
+        """
+        if data is None:
+            data = self._getRawData()
 
-        for m in data:
-            home = m["homeTeam"]["name"]["abbreviation"]
-            for team in self.matches:
-                if team.myteam == home:
-                    team.update(data=m)
-                    break
+        return [self._createMatch(m) for m in data]
 
-    def update(self):
+    def _diff(self, data):
+        """Compares the events against the index of current matches.
 
-        if not self.leagueid:
-            self._setup()
+        Returns a dict of events by eventKey and lists of the keys of
+        matches which have been added, removed or changed.
+        """
+        events = {self._eventKey(m): m for m in data}
+
+        added = [k for k in events if k not in self._index]
+        removed = [k for k in self._index if k not in events]
+        changed = [k for k in events
+                   if k in self._events and events[k] != self._events[k]]
+
+        return events, added, removed, changed
+
+    def _update(self, data=None):
+        # When the date changes, the new day's matches come from the index
+        if data is None:
+            data = self._dates.rollover(self._currentDate())
+
+        if data is None:
+            data = self._getRawData()
+
+        events, added, removed, changed = self._diff(data)
 
-        matches = self.getMatches()
+        for key in removed:
+            del self._index[key]
 
-        current = [x for x in self.matches if x in matches]
-        current += [x for x in matches if x not in self.matches]
+        for key in changed:
+            self._index[key].update(data=events[key])
 
-        self.matches = current
+        for key in added:
+            self._index[key] = self._createMatch(events[key])
 
-        if self.matches:
-            self._update()
+        self._events = events
+        self.matches = [self._index[k] for k in events]
+
+        return added, removed, changed
+
+    def update(self, data=None):
+        """Updates the matches in the league.
+
+        data - list of match events for this league, e.g. from a
+        MatchCoordinator. If not provided, the league will request its own
+        data.
+
+        Returns True if any matches were added, removed or changed.
+        """
+        if not self.leagueid:
+            self._setup()
+
+        return any(self._update(data))
 
     @property
     def LeagueName(self):
@@ -163,3 +257,17 @@ class League(matchcommon):
             return self.league
 
         return self.matches[0].Competition
+
+    @property
+    def MatchDates(self):
+        '''Returns a sorted list of the dates ("YYYY-MM-DD") in the fetched
+        window which have matches.'''
+        return self._dates.dates
+
+    def matchesOn(self, date):
+        """Returns a list of new FootballMatch objects for the league's
+        matches on date (a "YYYY-MM-DD" string or a date) from the fetched
+        window. No request is made.
+        """
+        return [self._createMatch(m)
+                for m in self._dates.get(dateString(date))]
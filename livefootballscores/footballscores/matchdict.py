@@ -1,3 +1,6 @@
+import inspect
+
+
 class MatchDictKeys(object):
     AWAY_TEAM = 'awayTeam'
     COMMENT = 'comment'
@@ -24,15 +27,124 @@ class MatchDictKeys(object):
     VENUE = 'venue'
 
 
+# Placeholder for a key which is missing on one side of a MatchDelta
+MISSING = object()
+
+
+class MatchDelta(object):
+    """A single change between two versions of a match.
+
+    path is a tuple of the keys leading to the value that changed e.g.
+    ("homeTeam", "scores", "score"). old or new are MISSING if the key was
+    added or removed.
+    """
+    __slots__ = ("path", "old", "new")
+
+    def __init__(self, path, old, new):
+        self.path = path
+        self.old = old
+        self.new = new
+
+    def __repr__(self):
+        return "<MatchDelta({}: {!r} -> {!r})>".format("/".join(self.path),
+                                                      self.old, self.new)
+
+    def value(self, path):
+        """Returns a tuple of the old and new values for path if this change
+        affects it. Returns None if path is not affected.
+        """
+        n = len(self.path)
+
+        if path[:n] == self.path:
+            return _lookup(self.old, path[n:]), _lookup(self.new, path[n:])
+
+        if self.path[:len(path)] == path:
+            return MISSING, MISSING
+
+        return None
+
+
+def _lookup(value, path):
+    for key in path:
+        if not isinstance(value, dict):
+            return MISSING
+        value = value.get(key, MISSING)
+
+    return value
+
+
+def diff(old, new, path=(), keys=None):
+    """Returns a list of MatchDelta objects for the differences between two
+    dicts. Nested dicts are compared key by key so only the values that
+    changed are listed.
+
+    keys - only compare these keys at the top level.
+    """
+    changes = []
+
+    if keys is None:
+        keys = list(new)
+        keys += [k for k in old if k not in new]
+
+    for key in keys:
+        if key == "_callbacks":
+            continue
+
+        ov = old.get(key, MISSING)
+        nv = new.get(key, MISSING)
+
+        if ov is nv:
+            continue
+
+        if isinstance(ov, dict) and isinstance(nv, dict):
+            changes += diff(ov, nv, path + (key,))
+
+        elif ov != nv:
+            changes.append(MatchDelta(path + (key,), ov, nv))
+
+    return changes
+
+
+def _takesChanges(callback):
+    """Returns True if the callback accepts the list of changes as well as
+    the new value. Older callbacks only take the value."""
+    try:
+        params = inspect.signature(callback).parameters.values()
+    except (TypeError, ValueError):
+        return True
+
+    positional = 0
+
+    for param in params:
+        if param.kind == param.VAR_POSITIONAL:
+            return True
+
+        if param.kind in (param.POSITIONAL_ONLY,
+                          param.POSITIONAL_OR_KEYWORD):
+            positional += 1
+
+    return positional > 1
+
+
+def _wrap(value):
+    if type(value) == dict:
+        return MatchDict(value)
+
+    return value
+
+
 class MatchDict(dict):
     """Class definition to turn JSON response into class object where match
        information is available as class attributes.
 
-       Callbacks are available for top level changes.
+       Callbacks are available for top level changes. Callbacks receive the
+       new value and a list of MatchDelta objects for the changes within it.
+       Callbacks which only take one argument just receive the new value.
     """
     def __init__(self, *args, **kwargs):
         cb = kwargs.pop('add_callbacks', False)
-        self.update(*args, **kwargs)
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, _wrap(value))
         self.__dict__ = self
         if cb:
             self._callbacks = {}
@@ -42,42 +154,81 @@ class MatchDict(dict):
             return None
 
     def __setitem__(self, item, value):
-        try:
-            if self[item] and value != self[item]:
-                for cb in [x for x in self._callbacks[item]
-                           if item in self._callbacks]:
-                    cb(value)
-
-        except KeyError:
-            pass
-
-        if type(value) == dict:
-            value = MatchDict(value)
-
-        super(MatchDict, self).__setitem__(item, value)
+        self.update({item: value})
 
     def add_callback(self, key, callback):
+        entry = (callback, _takesChanges(callback))
+
         if key in self._callbacks:
-            self._callbacks[key].append(callback)
+            self._callbacks[key].append(entry)
 
         else:
-            self._callbacks[key] = [callback]
+            self._callbacks[key] = [entry]
 
     def remove_callbacks(self, key):
         self._callbacks.pop(key)
 
     def remove_callback(self, key, callback):
         if key in self._callbacks:
-            while callback in self._callbacks[key]:
-                self._callbacks[key].remove(callback)
+            self._callbacks[key] = [e for e in self._callbacks[key]
+                                    if e[0] != callback]
+
+    def _apply(self, change):
+        target = self
+
+        for key in change.path[:-1]:
+            target = dict.__getitem__(target, key)
+
+        if change.new is MISSING:
+            dict.pop(target, change.path[-1], None)
+        else:
+            dict.__setitem__(target, change.path[-1], _wrap(change.new))
 
     def update(self, *args, **kwargs):
+        """Applies only the values that have changed.
+
+        Returns the list of MatchDelta objects that were applied. Callbacks
+        are run after all of the changes have been made.
+        """
         if args:
             if len(args) > 1:
                 raise TypeError("update expected at most 1 arguments, "
                                 "got %d" % len(args))
             other = dict(args[0])
-            for key in other:
-                self[key] = other[key]
-        for key in kwargs:
-            self[key] = kwargs[key]
+        else:
+            other = {}
+
+        other.update(kwargs)
+
+        # Most updates change nothing and comparing the values is much
+        # quicker than working out the differences
+        if all(k in self and dict.__getitem__(self, k) == v
+               for k, v in other.items()):
+            return []
+
+        changes = diff(self, other, keys=list(other))
+
+        if not changes:
+            return changes
+
+        # Note which top level values existed before we change anything
+        existed = set(k for k in {c.path[0] for c in changes} if self.get(k))
+
+        for change in changes:
+            self._apply(change)
+
+        callbacks = self._callbacks
+        if callbacks:
+            grouped = {}
+            for change in changes:
+                grouped.setdefault(change.path[0], []).append(change)
+
+            for key, group in grouped.items():
+                if key in existed:
+                    for cb, takesChanges in callbacks.get(key, []):
+                        if takesChanges:
+                            cb(self.get(key), group)
+                        else:
+                            cb(self.get(key))
+
+        return changes
@@ -9,6 +9,10 @@ actions = {ACTION_GOAL: "GOAL",
 
 class PlayerAction(object):
 
+    __slots__ = ("_fullname", "_abbreviatedname", "_firstname", "_lastname",
+                 "_actiontype", "_actiondisplaytime", "_actiontime",
+                 "_actionaddedtime", "_actionowngoal", "_actionpenalty")
+
     def __init__(self, player, action):
 
         if not type(player) == dict:
@@ -30,6 +34,17 @@ class PlayerAction(object):
         self._actionowngoal = action.get("ownGoal", False)
         self._actionpenalty = action.get("penalty", False)
 
+    @classmethod
+    def fromRecord(cls, record):
+        '''Creates a PlayerAction from a (name, action) tuple stored in a
+        TeamSnapshot.
+        '''
+        pa = cls.__new__(cls)
+        ((pa._fullname, pa._abbreviatedname, pa._firstname, pa._lastname),
+         (pa._actiontype, pa._actiondisplaytime, pa._actiontime,
+          pa._actionaddedtime, pa._actionowngoal, pa._actionpenalty)) = record
+        return pa
+
     def __lt__(self, other):
         normal = self._actiontime < other._actiontime
         added = ((self._actiontime == other._actiontime) and
@@ -103,3 +118,36 @@ class PlayerAction(object):
     @property
     def isOwnGoal(self):
         return self._actionowngoal
+
+
+class ActionIndex(object):
+    '''The player actions for one team, grouped by type and sorted by time.
+
+    The index is built once from the records in a TeamSnapshot and shared
+    by later snapshots as long as the actions don't change.
+    '''
+    __slots__ = ("_bytype", "_last", "reds")
+
+    def __init__(self, records):
+        bytype = {}
+
+        for record in records:
+            pa = PlayerAction.fromRecord(record)
+            bytype.setdefault(pa._actiontype, []).append(pa)
+
+        self._bytype = {k: tuple(sorted(v)) for k, v in bytype.items()}
+        self._last = {k: v[-1] for k, v in self._bytype.items()}
+        self.reds = tuple(sorted(self.get(ACTION_RED_CARD) +
+                                 self.get(ACTION_YELLOW_RED_CARD)))
+
+    def get(self, action_type):
+        '''Returns a tuple of the actions of the given type.'''
+        return self._bytype.get(action_type, ())
+
+    def last(self, action_type):
+        '''Returns the most recent action of the given type or None.'''
+        return self._last.get(action_type)
+
+    @property
+    def lastRed(self):
+        return self.reds[-1] if self.reds else None
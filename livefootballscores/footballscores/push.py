@@ -0,0 +1,360 @@
+import codecs
+import json
+import logging
+import socket
+import threading
+import time
+
+import requests
+
+from .base import matchcommon
+from .exceptions import FSConnectionError
+from .footballmatch import FootballMatch
+from .league import League
+from .morphlinks import ML
+from .retry import getBreaker, getRetryPolicy
+from .stats import getMetrics
+from .utils import secondsToMidnight
+
+logger = logging.getLogger(__name__)
+
+# Give up on a stream that is sending more than this without a complete
+# moment
+MAX_BUFFER = 4 * 1024 * 1024
+
+
+def topicKey(topic):
+    '''Returns the part of a topic that identifies it so that e.g.
+    "morph://data/..." and "/data/..." are treated as the same topic.
+    '''
+    if topic.startswith("morph:"):
+        topic = topic[len("morph:"):]
+
+    return "/" + topic.lstrip("/")
+
+
+def _shutdown(response):
+    # Closing a response doesn't wake a thread blocked reading it but
+    # shutting the socket down does
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class MomentParser(object):
+    '''Incrementally decodes moments from a stream of text.
+
+    The stream can contain whole push responses ({"moments": [...]}),
+    single moments or a JSON array of moments. Text is buffered until a
+    complete object has arrived.
+    '''
+    SEPARATORS = " \t\r\n,[]"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")("replace")
+        self._buffer = ""
+
+    def feed(self, chunk):
+        '''Adds a chunk of the stream and returns a list of any moments that
+        are now complete.
+        '''
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk)
+
+        self._buffer += chunk
+        moments = []
+
+        while True:
+            buf = self._buffer.lstrip(self.SEPARATORS)
+
+            if not buf:
+                self._buffer = ""
+                break
+
+            try:
+                obj, end = self._decoder.raw_decode(buf)
+            except ValueError:
+                self._buffer = buf
+
+                if len(buf) > MAX_BUFFER:
+                    self._buffer = ""
+                    raise ValueError("Unable to decode push stream.")
+
+                break
+
+            self._buffer = buf[end:]
+
+            if isinstance(obj, dict):
+                if "moments" in obj:
+                    moments.extend(obj["moments"] or [])
+                elif "topic" in obj:
+                    moments.append(obj)
+
+        return moments
+
+
+class PushClient(matchcommon):
+    '''Streams updates for a number of teams and leagues from the BBC's push
+    API.
+
+    A single connection is subscribed to the topics for every source. Each
+    moment received is passed to the sources subscribed to its topic so
+    updates arrive as soon as the BBC publishes them rather than on the next
+    poll.
+
+    The connection is reopened, with a backoff, if it drops, if nothing is
+    received for idle_timeout seconds, when the subscriptions change and at
+    midnight (when the topics change). Moments which are the same as the
+    last one seen for their topic are ignored, so reconnecting doesn't
+    repeat updates. A moment which can't be applied is logged and skipped.
+
+    e.g.:
+        client = PushClient()
+        client.subscribe(FootballMatch("Liverpool"))
+        client.start()
+    '''
+    # Seconds a stream must stay open to count as a good connection
+    MIN_STREAM = 10
+
+    def __init__(self, sources=None, idle_timeout=90,
+                 events_on_first_run=False):
+        super(PushClient, self).__init__()
+        self.idle_timeout = idle_timeout
+        self.events_on_first_run = events_on_first_run
+        self.sources = []
+        self.moments = 0
+        self.reconnects = 0
+        self._last = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._response = None
+        self._closing = None
+
+        for source in sources or []:
+            self.subscribe(source)
+
+    def __repr__(self):
+        return "<PushClient(sources={})>".format(len(self.sources))
+
+    def topicFor(self, source):
+        '''Returns the push topic for a FootballMatch or League.'''
+        if isinstance(source, FootballMatch) and not source.hasTeamPage:
+            url = source._scoresFixturesUrl(source=ML.MORPH_FIXTURES_ALL)
+        else:
+            url = source._scoresFixturesUrl()
+
+        # The push API uses the same paths as the proxy
+        if url.startswith("/proxy"):
+            url = url[len("/proxy"):]
+
+        return url
+
+    def subscribe(self, source):
+        if not isinstance(source, (FootballMatch, League)):
+            raise TypeError("Can only subscribe FootballMatch or League "
+                            "objects.")
+
+        with self._lock:
+            if not any(s is source for s in self.sources):
+                self.sources.append(source)
+
+        self._reconnect()
+
+    def unsubscribe(self, source):
+        with self._lock:
+            self.sources = [s for s in self.sources if s is not source]
+            self._seen.discard(id(source))
+
+        self._reconnect()
+
+    def _routes(self):
+        routes = {}
+
+        with self._lock:
+            sources = list(self.sources)
+
+        for source in sources:
+            routes.setdefault(topicKey(self.topicFor(source)),
+                              []).append(source)
+
+        return routes
+
+    def _reconnect(self):
+        # Closing the response ends the current stream and run opens a new
+        # one with the new topics
+        response = self._response
+        if response is not None:
+            self._closing = response
+            _shutdown(response)
+            response.close()
+
+    def _apply(self, source, payload):
+        # Sources which haven't got a match yet don't fire events on the
+        # first moment, in the same way as MatchCoordinator
+        first_run = (not self.events_on_first_run and
+                     id(source) not in self._seen and not source)
+        self._seen.add(id(source))
+
+        if isinstance(source, League):
+            return source.update(data=source._parseRawData(payload))
+
+        if source.hasTeamPage:
+            event = (source._findMatch(payload)
+                     if payload and payload.get("matchData") else None)
+        else:
+            event = source._findTeamInFixtures(payload)
+
+        return source.update(data=event or {}, first_run=first_run)
+
+    def dispatch(self, moment, routes=None):
+        '''Passes a moment to the sources subscribed to its topic. Returns
+        the number of sources updated.
+        '''
+        topic = topicKey(moment.get("topic", ""))
+        payload = moment.get("payload")
+
+        if routes is None:
+            routes = self._routes()
+
+        sources = routes.get(topic)
+
+        if not sources:
+            return 0
+
+        # Resending the current state (e.g. after reconnecting) is ignored
+        digest = hash(payload if isinstance(payload, str)
+                      else json.dumps(payload, sort_keys=True))
+
+        if self._last.get(topic) == digest:
+            return 0
+
+        if isinstance(payload, str):
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                return 0
+
+        for source in sources:
+            self._apply(source, payload)
+
+        # Only once it has been applied so a failed moment is tried again
+        # if it is resent
+        self._last[topic] = digest
+        self.moments += 1
+
+        return len(sources)
+
+    def _listen(self):
+        """Opens a stream and reads it until it ends. Returns True if the
+        stream was healthy i.e. a new one can be opened straight away.
+        """
+        routes = self._routes()
+
+        if not routes:
+            self._stop.wait(self.idle_timeout)
+            return True
+
+        expires = time.time() + secondsToMidnight()
+        opened = time.time()
+        received = False
+
+        self._response = r = self.requestPushStream(sorted(routes),
+                                                    timeout=self.idle_timeout)
+
+        try:
+            if r.status_code != 200:
+                raise FSConnectionError
+
+            parser = MomentParser()
+
+            for chunk in r.iter_content(chunk_size=None):
+                for moment in parser.feed(chunk):
+                    received = True
+
+                    try:
+                        self.dispatch(moment, routes)
+                    except Exception:
+                        getMetrics().incr("push.dispatch_errors")
+                        logger.exception("Unable to apply moment for %s",
+                                         moment.get("topic"))
+
+                if self._stop.is_set() or time.time() > expires:
+                    break
+
+        except (requests.exceptions.RequestException, ValueError):
+            # The stream dropped, went quiet or sent something we couldn't
+            # read.
+            pass
+
+        except AttributeError:
+            # urllib3 raises this when _reconnect closes the response from
+            # another thread
+            if self._closing is not r:
+                raise
+
+        finally:
+            self._response = None
+            r.close()
+
+        # A server that keeps closing the stream straight away is treated
+        # as a failure so we back off.
+        return received or time.time() - opened >= self.MIN_STREAM
+
+    def run(self):
+        '''Listens to the stream until stop is called.'''
+        attempt = 0
+
+        while not self._stop.is_set():
+            try:
+                healthy = self._listen()
+
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    FSConnectionError):
+                healthy = False
+
+            except Exception:
+                # Keep listening, with a backoff, rather than let the thread
+                # die without a trace
+                logger.exception("Push stream failed")
+                healthy = False
+
+            if self._stop.is_set():
+                break
+
+            self.reconnects += 1
+
+            if healthy:
+                attempt = 0
+                continue
+
+            delay = max(getRetryPolicy().delay(attempt, base_delay=1,
+                                               max_delay=60),
+                        getBreaker().retryAfter)
+            attempt += 1
+            self._stop.wait(delay)
+
+    def start(self):
+        '''Runs the client in a background thread.'''
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run,
+                                            name="PushClient")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._reconnect()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,417 @@
+"""Record responses from the BBC and replay them from a local server.
+
+Recording saves every response received through the shared connection pool
+to a gzipped file with one JSON record per line:
+
+    startRecording("saturday.jsonl.gz")
+    ...
+    stopRecording()
+
+The archive can then be served on a simulated clock, which starts at the
+time of the first record, so that matches play out as they did at the time:
+
+    server = ReplayServer("saturday.jsonl.gz", speed=10, latency=0.05)
+    server.start()
+    replayThrough(server)   # send the package's requests to the server
+
+or from the command line:
+
+    python -m livefootballscores.footballscores.replay serve \\
+        saturday.jsonl.gz --speed 10
+
+Streamed responses are recorded as far as they were read and are replayed
+as chunked responses.
+"""
+import argparse
+import bisect
+import gzip
+import json
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from .session import getPool
+
+PROG = "python -m livefootballscores.footballscores.replay"
+
+# Only the headers needed to replay caching behaviour are kept
+HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+# Size of the chunks streamed responses are replayed in
+CHUNK_SIZE = 16 * 1024
+
+
+def requestKey(method, url):
+    '''Returns the key used to match a request to recorded responses.
+
+    The host is kept as the first part of the path so that requests to
+    different hosts don't clash. The push API's counter ("c") changes with
+    every request so it is dropped.
+    '''
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k != "c")
+    key = "/" + parts.netloc + parts.path
+
+    if query:
+        key += "?" + urlencode(query)
+
+    return method.upper(), key
+
+
+class Recorder(object):
+    '''Writes responses to a gzipped JSON lines archive.
+
+    flush_every - number of records to write before flushing the file.
+    '''
+    def __init__(self, path, flush_every=20):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+
+    def record(self, method, url, status, headers, body, elapsed=0,
+               streamed=False):
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+
+        rec = {"t": round(time.time(), 3),
+               "m": method.upper(),
+               "u": url,
+               "s": status,
+               "h": {k: headers[k] for k in HEADERS if k in headers},
+               "b": body,
+               "e": round(elapsed, 3)}
+
+        if streamed:
+            rec["c"] = 1
+
+        line = json.dumps(rec, separators=(",", ":"))
+
+        with self._lock:
+            if self._file is None:
+                return
+
+            self._file.write(line + "\n")
+            self.count += 1
+
+            if self.count % self.flush_every == 0:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayArchive(object):
+    '''Recorded responses indexed by request.'''
+    def __init__(self, path):
+        self.path = path
+        self._responses = {}
+        self._times = {}
+        self.start = None
+        self.end = None
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if recording was
+                    # interrupted
+                    continue
+
+                self._add(rec)
+
+        for key, responses in self._responses.items():
+            responses.sort(key=lambda r: r["t"])
+            self._times[key] = [r["t"] for r in responses]
+
+    def _add(self, rec):
+        key = requestKey(rec["m"], rec["u"])
+        self._responses.setdefault(key, []).append(rec)
+
+        self.start = rec["t"] if self.start is None else min(self.start,
+                                                              rec["t"])
+        self.end = rec["t"] if self.end is None else max(self.end, rec["t"])
+
+    def __len__(self):
+        return sum(len(r) for r in self._responses.values())
+
+    @property
+    def requests(self):
+        return sorted(self._responses)
+
+    def lookup(self, method, key, when):
+        '''Returns the last response recorded for the request at or before
+        when. The first response is used if there isn't one.
+        '''
+        # Answer HEAD requests using a recorded GET
+        if (method, key) not in self._responses and method == "HEAD":
+            method = "GET"
+
+        responses = self._responses.get((method, key))
+
+        if not responses:
+            return None
+
+        i = bisect.bisect_right(self._times[(method, key)], when)
+
+        return responses[max(i - 1, 0)]
+
+
+class SimulatedClock(object):
+    '''A clock which starts at start and runs speed times faster than real
+    time.'''
+    def __init__(self, start, speed=1.0):
+        self.speed = speed
+        self.seek(start)
+
+    def seek(self, when):
+        self._start = when
+        self._real = time.time()
+
+    def now(self):
+        return self._start + (time.time() - self._real) * self.speed
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self):
+        server = self.server.replay
+        server.requests += 1
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.error_rate and random.random() < server.error_rate:
+            server.errors += 1
+            return self._send(503, {}, b"")
+
+        # The path starts with the original host (see rewrite)
+        method, key = requestKey(self.command, "http:/" + self.path)
+        rec = server.archive.lookup(method, key, server.clock.now())
+
+        if rec is None:
+            server.misses += 1
+            return self._send(404, {}, b"")
+
+        headers = rec.get("h", {})
+        etag = headers.get("ETag")
+
+        if etag and self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers, b"")
+
+        self._send(rec["s"], headers, rec.get("b", "").encode("utf-8"),
+                   chunked=rec.get("c"))
+
+    def _send(self, status, headers, body, chunked=False):
+        self.send_response(status)
+
+        for k, v in headers.items():
+            self.send_header(k, v)
+
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+
+        self.end_headers()
+
+        if self.command == "HEAD":
+            return
+
+        if not chunked:
+            self.wfile.write(body)
+            return
+
+        for i in range(0, len(body), CHUNK_SIZE):
+            chunk = body[i:i + CHUNK_SIZE]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+
+        self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = _reply
+    do_HEAD = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer(object):
+    '''Local HTTP server which replays a recorded archive.
+
+    speed - how much faster than real time the simulated clock runs.
+    start - seconds after the start of the archive to start the clock.
+    latency - seconds to wait before answering each request.
+    error_rate - fraction of requests answered with a 503 error.
+    '''
+    def __init__(self, archive, host="127.0.0.1", port=0, speed=1.0,
+                 start=0, latency=0, error_rate=0):
+        if not isinstance(archive, ReplayArchive):
+            archive = ReplayArchive(archive)
+
+        self.archive = archive
+        self.clock = SimulatedClock((archive.start or time.time()) + start,
+                                    speed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.misses = 0
+        self._httpd = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.replay = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def rewrite(self, url):
+        '''Returns the URL on this server for a BBC URL.'''
+        parts = urlsplit(url)
+        url = "{}/{}{}".format(self.url, parts.netloc, parts.path)
+
+        if parts.query:
+            url += "?" + parts.query
+
+        return url
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="ReplayServer")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def startRecording(path):
+    '''Records every response received by the shared pool to path.'''
+    stopRecording()
+    getPool().recorder = Recorder(path)
+    return getPool().recorder
+
+
+def stopRecording():
+    recorder, getPool().recorder = getPool().recorder, None
+
+    if recorder is not None:
+        recorder.close()
+
+
+def replayThrough(server):
+    '''Sends the package's requests to a ReplayServer (or any function that
+    rewrites URLs). Pass None to go back to the BBC.'''
+    if server is None:
+        getPool().rewrite = None
+    elif isinstance(server, ReplayServer):
+        getPool().rewrite = server.rewrite
+    else:
+        getPool().rewrite = server
+
+
+def _record(args):
+    from .coordinator import MatchCoordinator
+
+    coordinator = MatchCoordinator()
+
+    for team in args.team:
+        coordinator.addTeam(team)
+
+    for league in args.league:
+        coordinator.addLeague(league)
+
+    recorder = startRecording(args.archive)
+    stop = time.time() + args.duration
+
+    try:
+        while time.time() < stop:
+            try:
+                coordinator.update(force=True)
+            except Exception as e:
+                print("Update failed: {!r}".format(e))
+
+            print("{} responses recorded".format(recorder.count))
+            time.sleep(min(args.interval, max(stop - time.time(), 0)))
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        stopRecording()
+        coordinator.close()
+
+
+def _serve(args):
+    server = ReplayServer(args.archive, host=args.host, port=args.port,
+                          speed=args.speed, start=args.start,
+                          latency=args.latency, error_rate=args.error_rate)
+    print("Replaying {} responses on {}".format(len(server.archive),
+                                                server.url))
+
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+def _info(args):
+    archive = ReplayArchive(args.archive)
+    print("{} responses over {:.0f} seconds".format(
+        len(archive), (archive.end or 0) - (archive.start or 0)))
+
+    for method, key in archive.requests:
+        print("{} {}".format(method, key))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=PROG,
+                                     description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    record = commands.add_parser("record", help="Record responses")
+    record.add_argument("archive")
+    record.add_argument("--team", action="append", default=[])
+    record.add_argument("--league", action="append", default=[])
+    record.add_argument("--interval", type=float, default=60)
+    record.add_argument("--duration", type=float, default=3600)
+    record.set_defaults(func=_record)
+
+    serve = commands.add_parser("serve", help="Replay an archive")
+    serve.add_argument("archive")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--speed", type=float, default=1.0)
+    serve.add_argument("--start", type=float, default=0,
+                       help="Seconds into the archive to start")
+    serve.add_argument("--latency", type=float, default=0)
+    serve.add_argument("--error-rate", type=float, default=0)
+    serve.set_defaults(func=_serve)
+
+    info = commands.add_parser("info", help="List recorded requests")
+    info.add_argument("archive")
+    info.set_defaults(func=_info)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
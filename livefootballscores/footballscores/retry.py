@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+
+
+class RetryPolicy(object):
+    '''Decides whether, and after how long, a failed request is retried.
+
+    Delays grow exponentially from base_delay up to max_delay with "full
+    jitter" (a random delay between 0 and the limit) so that clients don't
+    retry in step. Every retry is taken from a shared budget which refills
+    at budget retries per budget_period seconds, so an outage can't cause
+    a flood of retries.
+
+    max_retries - dict of failure type to the number of retries allowed.
+    '''
+    TIMEOUT = "timeout"
+    CONNECTION = "connection"
+    DECODE = "decode"
+    EMPTY = "empty"
+
+    DEFAULT_RETRIES = {TIMEOUT: 1,
+                       CONNECTION: 2,
+                       DECODE: 2,
+                       EMPTY: 4}
+
+    def __init__(self, base_delay=0.5, max_delay=30, max_retries=None,
+                 budget=10, budget_period=60):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = dict(self.DEFAULT_RETRIES)
+        self.max_retries.update(max_retries or {})
+        self.budget = budget
+        self.budget_period = budget_period
+        self._lock = threading.Lock()
+        self._tokens = float(budget)
+        self._updated = time.time()
+
+    def delay(self, attempt, base_delay=None, max_delay=None):
+        '''Returns a random delay for the given (zero-based) attempt.'''
+        base_delay = self.base_delay if base_delay is None else base_delay
+        max_delay = self.max_delay if max_delay is None else max_delay
+        return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+    def _spend(self):
+        with self._lock:
+            now = time.time()
+            refill = (now - self._updated) * self.budget / self.budget_period
+            self._tokens = min(self.budget, self._tokens + refill)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+
+            return False
+
+    def shouldRetry(self, kind, attempt):
+        '''Returns True if a request that failed with the given kind of
+        failure should be tried again. Uses up some of the retry budget.
+        '''
+        if attempt >= self.max_retries.get(kind, 0):
+            return False
+
+        return self._spend()
+
+
+class CircuitBreaker(object):
+    '''Stops requests being sent when the server is clearly unavailable.
+
+    After failure_threshold failures in a row the breaker opens and
+    requests fail immediately. After reset_timeout seconds a single probe
+    request is let through: if it succeeds the breaker closes, otherwise it
+    opens again for twice as long (up to max_reset_timeout). A probe which
+    hasn't reported back within the timeout is given up on and another one
+    is allowed.
+    '''
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30,
+                 max_reset_timeout=300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened = 0
+            self._timeout = self.reset_timeout
+            self._probing = False
+            self._probed = 0
+            self._trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if (self._state == self.OPEN and
+                    time.time() - self._opened >= self._timeout):
+                return self.HALF_OPEN
+
+            return self._state
+
+    @property
+    def isOpen(self):
+        return self.state != self.CLOSED
+
+    @property
+    def retryAfter(self):
+        '''Seconds until a probe request will be allowed.'''
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0
+
+            return max(self._opened + self._timeout - time.time(), 0)
+
+    def allow(self):
+        '''Returns True if a request may be sent.'''
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if time.time() - self._opened < self._timeout:
+                    return False
+
+                self._state = self.HALF_OPEN
+
+            # Half open: only one probe at a time
+            now = time.time()
+            if self._probing and now - self._probed < self._timeout:
+                return False
+
+            self._probing = True
+            self._probed = now
+            return True
+
+    def recordSuccess(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._timeout = self.reset_timeout
+            self._probing = False
+
+    def recordFailure(self):
+        with self._lock:
+            self._failures += 1
+
+            if self._state == self.HALF_OPEN:
+                self._timeout = min(self._timeout * 2, self.max_reset_timeout)
+                self._open()
+
+            elif (self._state == self.CLOSED and
+                  self._failures >= self.failure_threshold):
+                self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened = time.time()
+        self._probing = False
+        self._trips += 1
+
+    @property
+    def stats(self):
+        state = self.state
+
+        with self._lock:
+            return {"state": state,
+                    "failures": self._failures,
+                    "trips": self._trips,
+                    "retry_after": (0 if self._state == self.CLOSED else
+                                    max(self._opened + self._timeout -
+                                        time.time(), 0))}
+
+
+POLICY = RetryPolicy()
+BREAKER = CircuitBreaker()
+
+
+def getRetryPolicy():
+    return POLICY
+
+
+def getBreaker():
+    return BREAKER
+
+
+def getBreakerState():
+    return BREAKER.stats
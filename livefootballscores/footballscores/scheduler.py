@@ -0,0 +1,95 @@
+import time
+
+from .league import League
+from .utils import secondsToMidnight
+
+
+class PollScheduler(object):
+    '''Works out how long to wait before polling a source again based on the
+    state of its match(es).
+
+    live_interval - seconds between polls while a match is in play.
+    fixture_interval - longest wait between polls before kick-off.
+    pre_kickoff - seconds before kick-off at which live polling starts.
+    halftime_length - expected length of half time.
+
+    calendar - a FixtureCalendar. Sources which aren't in play wait until
+    their next match window opens.
+
+    Finished, postponed and missing matches aren't polled again until the
+    date changes.
+    '''
+    def __init__(self, live_interval=60, fixture_interval=30 * 60,
+                 pre_kickoff=5 * 60, halftime_length=15 * 60, calendar=None):
+        self.live_interval = live_interval
+        self.calendar = calendar
+        self.fixture_interval = fixture_interval
+        self.pre_kickoff = pre_kickoff
+        self.halftime_length = halftime_length
+        self._halftime = {}
+
+    @property
+    def retry_interval(self):
+        return self.live_interval
+
+    def _untilTomorrow(self):
+        # Give the BBC a minute to publish the new day's matches
+        return secondsToMidnight() + 60
+
+    def _matchInterval(self, match, now):
+        if not match or match.isFinished or match.isPostponed:
+            self._halftime.pop(id(match), None)
+            return self._untilTomorrow()
+
+        if match.isHalfTime:
+            started = self._halftime.setdefault(id(match), now)
+            remaining = started + self.halftime_length - now
+            return max(remaining, self.live_interval)
+
+        self._halftime.pop(id(match), None)
+
+        if match.isFixture:
+            ko = match.TimeToKickOff
+
+            if ko is None:
+                return self.live_interval
+
+            wait = ko.total_seconds() - self.pre_kickoff
+
+            if wait <= 0:
+                return self.live_interval
+
+            return min(wait, self.fixture_interval)
+
+        return self.live_interval
+
+    def nextPoll(self, source, now=None):
+        '''Returns the number of seconds until the source should be
+        polled again.
+        '''
+        if now is None:
+            now = time.time()
+
+        if isinstance(source, League):
+            if not source.matches:
+                interval = self._untilTomorrow()
+            else:
+                interval = min(self._matchInterval(m, now)
+                               for m in source.matches)
+
+            matches = source.matches
+        else:
+            interval = self._matchInterval(source, now)
+            matches = [source]
+
+        # A match that's running late is still polled after its window
+        if self.calendar is not None and not any(self._inPlay(m)
+                                                 for m in matches):
+            interval = max(interval, min(self.calendar.untilWindow(source,
+                                                                   now),
+                                         self._untilTomorrow()))
+
+        return interval
+
+    def _inPlay(self, match):
+        return bool(match) and (match.isLive or match.isHalfTime)
@@ -0,0 +1,278 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .stats import endpointName, getMetrics
+
+try:
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+except ImportError:
+    from requests.packages.urllib3.connectionpool import (  # noqa: F401
+        HTTPConnectionPool, HTTPSConnectionPool)
+
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 10
+
+
+class _CountingAdapter(HTTPAdapter):
+    '''HTTPAdapter whose connection pools report every new socket they open
+    so that the pool can tell reused connections from fresh handshakes.
+    '''
+    def __init__(self, on_connect, **kwargs):
+        self._on_connect = on_connect
+        super(_CountingAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_CountingAdapter, self).init_poolmanager(*args, **kwargs)
+
+        on_connect = self._on_connect
+
+        # Connections which were dropped are reconnected without a new
+        # connection object so count the connects themselves
+        def counting(pool_class):
+            base = pool_class.ConnectionCls
+
+            class CountingConnection(base):
+                def connect(self):
+                    on_connect()
+                    return base.connect(self)
+
+            return type("Counting" + pool_class.__name__, (pool_class,),
+                        {"ConnectionCls": CountingConnection})
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": counting(HTTPConnectionPool),
+            "https": counting(HTTPSConnectionPool)
+        }
+
+
+class _RecordedBody(object):
+    '''Stands in for the raw body of a streamed response, keeping a copy of
+    what is read. done is called with the body once it has all been read or
+    the response is closed.
+    '''
+    def __init__(self, raw, done):
+        set_ = object.__setattr__
+        set_(self, "_raw", raw)
+        set_(self, "_chunks", [])
+        set_(self, "_done", done)
+        set_(self, "_lock", threading.Lock())
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    def _finish(self):
+        with self._lock:
+            done = self._done
+            object.__setattr__(self, "_done", None)
+
+        if done is not None:
+            done(b"".join(self._chunks))
+
+    def read(self, *args, **kwargs):
+        data = self._raw.read(*args, **kwargs)
+
+        if data:
+            self._chunks.append(data)
+        else:
+            self._finish()
+
+        return data
+
+    def stream(self, *args, **kwargs):
+        for chunk in self._raw.stream(*args, **kwargs):
+            self._chunks.append(chunk)
+            yield chunk
+
+        self._finish()
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def release_conn(self):
+        self._finish()
+        self._raw.release_conn()
+
+
+class HTTPPool(object):
+    '''Thread-safe, keep-alive connection pool shared by every match, league
+    and helper in the package.
+
+    All threads share a single adapter (and therefore a single set of
+    connection pools). Each thread gets its own lightweight Session as
+    requests.Session is not guaranteed to be thread-safe.
+
+    connect_timeout - seconds to wait for a connection to be established.
+    read_timeout - seconds to wait between bytes from the server.
+    pool_size - number of connections kept open per host.
+    keep_alive - set to False to close connections after each request.
+
+    recorder - object with a record method which is given every response
+    e.g. replay.Recorder. Streams are recorded, with streamed=True, as far
+    as they were read once they finish or are closed.
+    rewrite - function which is given each URL and returns the URL to
+    request e.g. to send requests to a replay.ReplayServer.
+    '''
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = 0
+        self._requests = 0
+        self._opened = 0
+        self._adapter = None
+        self.recorder = None
+        self.rewrite = None
+        self.configure(connect_timeout=connect_timeout,
+                       read_timeout=read_timeout,
+                       pool_size=pool_size,
+                       keep_alive=keep_alive)
+
+    def configure(self, connect_timeout=None, read_timeout=None,
+                  pool_size=None, keep_alive=None):
+        '''Changes pool settings. Any settings not provided are unchanged.
+
+        Existing connections are closed and sessions are rebuilt lazily
+        in each thread on their next request.
+        '''
+        with self._lock:
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+
+            if read_timeout is not None:
+                self.read_timeout = read_timeout
+
+            if pool_size is not None:
+                self.pool_size = pool_size
+
+            if keep_alive is not None:
+                self.keep_alive = keep_alive
+
+            old = self._adapter
+            self._adapter = _CountingAdapter(self._connectionOpened,
+                                             pool_connections=self.pool_size,
+                                             pool_maxsize=self.pool_size)
+            self._generation += 1
+
+        if old is not None:
+            old.close()
+
+    def _connectionOpened(self):
+        with self._lock:
+            self._opened += 1
+
+    def _session(self):
+        local = self._local
+
+        if getattr(local, "generation", None) != self._generation:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+
+            local.session = session
+            local.generation = self._generation
+
+        return local.session
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+
+        with self._lock:
+            self._requests += 1
+
+        if self.rewrite is not None:
+            url = self.rewrite(url)
+
+        endpoint = endpointName(url)
+        metrics = getMetrics()
+        metrics.incr("requests." + endpoint)
+
+        try:
+            r = self._session().request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            metrics.incr("errors." + endpoint)
+            raise
+
+        metrics.observe("request." + endpoint, r.elapsed.total_seconds())
+
+        if not kwargs.get("stream"):
+            metrics.incr("bytes." + endpoint, len(r.content))
+
+        recorder = self.recorder
+        if recorder is not None and kwargs.get("stream"):
+            r.raw = self._recordStream(recorder, method, r)
+
+        elif recorder is not None:
+            recorder.record(method, r.url, r.status_code, r.headers,
+                            r.content, r.elapsed.total_seconds())
+
+        return r
+
+    def _recordStream(self, recorder, method, r):
+        elapsed = r.elapsed.total_seconds()
+
+        def done(body):
+            recorder.record(method, r.url, r.status_code, r.headers, body,
+                            elapsed, streamed=True)
+
+        return _RecordedBody(r.raw, done)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    @property
+    def stats(self):
+        '''Returns a dict showing how many requests were made and how many
+        of them needed a new connection.
+        '''
+        with self._lock:
+            return {"requests": self._requests,
+                    "opened": self._opened,
+                    "reused": max(self._requests - self._opened, 0)}
+
+    def resetStats(self):
+        with self._lock:
+            self._requests = 0
+            self._opened = 0
+
+    def close(self):
+        with self._lock:
+            self._adapter.close()
+            self._generation += 1
+
+
+POOL = HTTPPool()
+
+
+def getPool():
+    return POOL
+
+
+def configurePool(**kwargs):
+    '''Changes settings of the shared connection pool e.g.:
+
+        configurePool(connect_timeout=2, read_timeout=5, pool_size=4)
+    '''
+    POOL.configure(**kwargs)
+
+
+def getPoolStats():
+    return POOL.stats
@@ -0,0 +1,191 @@
+from .matchdict import MatchDictKeys as MDKey
+from .playeraction import ActionIndex
+
+
+def _get(data, *keys):
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+
+    return data
+
+
+def _actionRecords(player_actions):
+    '''Flattens the BBC's list of players and their actions into a tuple of
+    (player name, action) tuples.
+    '''
+    records = []
+
+    for player in player_actions or ():
+        if not isinstance(player, dict):
+            continue
+
+        nm = player.get("name") or {}
+        name = (nm.get("full", u""), nm.get("abbreviation", u""),
+                nm.get("first", u""), nm.get("last", u""))
+
+        for act in player.get("actions") or ():
+            if isinstance(act, dict):
+                records.append((name, (act.get("type"),
+                                       act.get("displayTime"),
+                                       act.get("timeElapsed", 0),
+                                       act.get("addedTime", 0),
+                                       act.get("ownGoal", False),
+                                       act.get("penalty", False))))
+
+    return tuple(records)
+
+
+class _Frozen(object):
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is read only".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is read only".format(type(self).__name__))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return all(getattr(self, s) == getattr(other, s)
+                   for s in self.__slots__ if not s.startswith("_") and
+                   s != "raw")
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+
+class TeamSnapshot(_Frozen):
+    '''The details of one side in a match.
+
+    actions is a tuple of (name, action) tuples as stored by
+    _actionRecords. hasActions is False if the payload didn't include any
+    player actions (i.e. it wasn't a detailed request). index is an
+    ActionIndex of the actions.
+    '''
+    __slots__ = ("fullName", "abbreviation", "firstName", "lastName",
+                 "score", "actions", "hasActions", "_index")
+
+    def __init__(self, team, previous=None):
+        team = team if isinstance(team, dict) else {}
+        nm = team.get("name") or {}
+        set_ = object.__setattr__
+
+        set_(self, "fullName", nm.get("full", u""))
+        set_(self, "abbreviation", nm.get("abbreviation", u""))
+        set_(self, "firstName", nm.get("first", u""))
+        set_(self, "lastName", nm.get("last", u""))
+        set_(self, "score", _get(team, "scores", "score"))
+
+        set_(self, "_index", None)
+
+        if "playerActions" in team:
+            actions = _actionRecords(team["playerActions"])
+            set_(self, "hasActions", True)
+
+            # Reuse the previous index if nothing has changed
+            if previous is not None and previous.actions == actions:
+                set_(self, "actions", previous.actions)
+                set_(self, "_index", previous._index)
+            else:
+                set_(self, "actions", actions)
+
+        # Don't lose scorers just because a lightweight update arrived
+        elif previous is not None:
+            set_(self, "actions", previous.actions)
+            set_(self, "hasActions", previous.hasActions)
+            set_(self, "_index", previous._index)
+
+        else:
+            set_(self, "actions", ())
+            set_(self, "hasActions", False)
+
+    @property
+    def index(self):
+        # Built on first use as most matches never show their scorers
+        if self._index is None:
+            object.__setattr__(self, "_index", ActionIndex(self.actions))
+
+        return self._index
+
+
+class MatchSnapshot(_Frozen):
+    '''Read only summary of a match, parsed once from the BBC's JSON.
+
+    Only the fields needed by FootballMatch are kept. Snapshots are never
+    changed: a new one is created for each update so readers in other
+    threads always see a consistent match.
+
+    previous - the last snapshot for the same match. Player actions are
+    carried over from it if the new payload doesn't include them.
+    keep_raw - keep a reference to the original JSON in raw.
+    '''
+    __slots__ = ("eventKey", "homeTeam", "awayTeam", "tournamentName",
+                 "tournamentSlug", "period", "eventStatus", "statusNote",
+                 "minutesElapsed", "addedTime", "venue", "startTime",
+                 "startTimeUK", "raw")
+
+    def __init__(self, event, previous=None, keep_raw=False):
+        if previous is not None and (previous.eventKey !=
+                                     event.get(MDKey.EVENT_KEY)):
+            previous = None
+
+        set_ = object.__setattr__
+        set_(self, "eventKey", event.get(MDKey.EVENT_KEY))
+        set_(self, "homeTeam",
+             TeamSnapshot(event.get(MDKey.HOME_TEAM),
+                          previous and previous.homeTeam))
+        set_(self, "awayTeam",
+             TeamSnapshot(event.get(MDKey.AWAY_TEAM),
+                          previous and previous.awayTeam))
+        set_(self, "tournamentName",
+             _get(event, MDKey.TOURNAMENT_NAME, "full"))
+        set_(self, "tournamentSlug", event.get(MDKey.TOURNAMENT))
+        set_(self, "period", _get(event, MDKey.PROGRESS, "period"))
+        set_(self, "eventStatus", event.get(MDKey.EVENT_STATUS))
+        set_(self, "statusNote", event.get(MDKey.EVENT_STATUS_NOTE))
+        set_(self, "minutesElapsed", event.get(MDKey.MINS_ELAPSED))
+        set_(self, "addedTime", event.get(MDKey.MINS_EXTRA_TIME))
+        set_(self, "venue", _get(event, MDKey.VENUE, "name", "full"))
+        set_(self, "startTime", event.get(MDKey.START_TIME))
+        set_(self, "startTimeUK", event.get(MDKey.START_TIME_UKHHMM))
+        set_(self, "raw", event if keep_raw else None)
+
+    def __repr__(self):
+        return "<MatchSnapshot({!r}: {} {}-{} {})>".format(
+            self.eventKey, self.homeTeam.fullName, self.homeTeam.score,
+            self.awayTeam.score, self.awayTeam.fullName)
+
+    def diff(self, other):
+        '''Returns a set of the names of the fields which are different in
+        the other snapshot. Changes to a team are named e.g. "homeTeam.score".
+        '''
+        changed = set()
+
+        if other is None:
+            return set(s for s in self.__slots__ if s != "raw")
+
+        for slot in self.__slots__:
+            if slot == "raw":
+                continue
+
+            mine = getattr(self, slot)
+            theirs = getattr(other, slot)
+
+            if isinstance(mine, TeamSnapshot):
+                changed.update("{}.{}".format(slot, s)
+                               for s in TeamSnapshot.__slots__
+                               if not s.startswith("_") and
+                               getattr(mine, s) != getattr(theirs, s))
+
+            elif mine != theirs:
+                changed.add(slot)
+
+        return changed
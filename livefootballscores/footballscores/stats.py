@@ -0,0 +1,164 @@
+import bisect
+from contextlib import contextmanager
+import re
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+
+# Upper bounds (in seconds) of the histogram buckets
+DEFAULT_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+                  5, 10)
+
+_MORPH = re.compile(r"bbc-morph-([a-z0-9-]+)")
+
+
+def endpointName(url):
+    '''Returns a short name for the endpoint a URL belongs to e.g.
+    "morph:football-scores-match-list-data" or "push:...".
+    '''
+    parts = urlsplit(url)
+    match = _MORPH.search(unquote(parts.path + "?" + parts.query))
+
+    if parts.path.endswith("/p"):
+        return "push:" + (match.group(1) if match else "unknown")
+
+    if match:
+        return "morph:" + match.group(1)
+
+    if "/teams/" in parts.path:
+        return "teampage"
+
+    return parts.netloc or "unknown"
+
+
+class Histogram(object):
+    '''Counts values (e.g. latencies) in buckets.'''
+
+    __slots__ = ("bounds", "buckets", "count", "total", "min", "max")
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, pct):
+        '''Returns the upper bound of the bucket holding the percentile.'''
+        if not self.count:
+            return None
+
+        target = self.count * pct / 100.0
+        seen = 0
+
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+
+        return self.max
+
+    def asDict(self):
+        return {"count": self.count,
+                "total": self.total,
+                "mean": self.total / self.count if self.count else None,
+                "min": self.min,
+                "max": self.max,
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "buckets": dict(zip([str(b) for b in self.bounds] + ["inf"],
+                                    self.buckets))}
+
+
+class Metrics(object):
+    '''Thread-safe counters and timings shared by the whole package.
+
+    e.g.:
+        metrics.incr("requests")
+        with metrics.timer("update"):
+            ...
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._timings = {}
+            self._started = time.time()
+
+    def incr(self, name, value=1):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            hist = self._timings.get(name)
+
+            if hist is None:
+                hist = self._timings[name] = Histogram()
+
+            hist.add(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(name, time.time() - start)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def asDict(self):
+        with self._lock:
+            return {"since": self._started,
+                    "counters": dict(self._counters),
+                    "timings": {k: v.asDict()
+                                for k, v in self._timings.items()}}
+
+
+METRICS = Metrics()
+
+
+def getMetrics():
+    return METRICS
+
+
+def getStats():
+    '''Returns a dict of the package's counters and timings along with the
+    connection pool, cache and circuit breaker statistics.
+    '''
+    from .cache import getCacheStats
+    from .retry import getBreakerState
+    from .session import getPoolStats
+
+    stats = METRICS.asDict()
+    stats["pool"] = getPoolStats()
+    stats["cache"] = getCacheStats()
+    stats["breaker"] = getBreakerState()
+
+    return stats
+
+
+def resetStats():
+    METRICS.reset()
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+# fcntl is only available on Unix. Without it the store still works but
+# writes from different processes aren't serialised.
+try:
+    import fcntl
+    HAS_FCNTL = True
+
+except ImportError:
+    HAS_FCNTL = False
+
+
+TEAM_PAGE_EXPIRY = 7 * 24 * 60 * 60
+CATALOGUE_EXPIRY = 24 * 60 * 60
+
+
+def cacheDirectory():
+    '''Returns the directory used for the persistent store, following the
+    XDG base directory specification.
+    '''
+    base = os.environ.get("XDG_CACHE_HOME")
+
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+
+    return os.path.join(base, "livefootballscores")
+
+
+class PersistentStore(object):
+    '''Small JSON key-value store on disk where each value has an expiry time.
+
+    The file is re-read when it has been changed by another process and is
+    replaced atomically on each write, so the store can be shared by
+    several processes (e.g. after qtile restarts).
+    '''
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(cacheDirectory(), "store.json")
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        self._mtime = None
+
+    def _lockfile(self):
+        return self.path + ".lock"
+
+    def _read(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            # Nothing on disk (e.g. it can't be written) so keep the values
+            # held in memory
+            self._mtime = None
+            return
+
+        if mtime == self._mtime:
+            return
+
+        try:
+            with open(self.path) as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+
+        self._mtime = mtime
+
+    def _write(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+
+        now = time.time()
+        data = {k: v for k, v in self._data.items() if v[0] > now}
+
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".store")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+
+        os.replace(tmp, self.path)
+
+        self._data = data
+        self._mtime = os.stat(self.path).st_mtime
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._read()
+            item = self._data.get(key)
+
+        if item is None or item[0] <= time.time():
+            return default
+
+        return item[1]
+
+    def set(self, key, value, expiry):
+        '''Stores a JSON serialisable value for expiry seconds.
+
+        Failing to write to disk is not an error: the store is only a cache.
+        '''
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self._lockfile(), "w") as lock:
+                    if HAS_FCNTL:
+                        fcntl.flock(lock, fcntl.LOCK_EX)
+
+                    # Pick up any changes from other processes first
+                    self._read()
+                    self._data[key] = [time.time() + expiry, value]
+                    self._write()
+
+            except OSError:
+                self._data[key] = [time.time() + expiry, value]
+
+    def delete(self, key):
+        self.set(key, None, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data = {}
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+STORE = None
+
+
+def getStore():
+    global STORE
+
+    if STORE is None:
+        STORE = PersistentStore()
+
+    return STORE
+
+
+def setStorePath(path):
+    '''Moves the persistent store. Set path to None to use the default.'''
+    global STORE
+    STORE = PersistentStore(path)
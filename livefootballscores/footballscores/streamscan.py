@@ -0,0 +1,159 @@
+"""Incremental scanning of morph match list responses.
+
+The list of all matches (ML.MORPH_FIXTURES_ALL) can be large on a busy day
+but a team only needs the one or two events it plays in. Scanning the
+response as it arrives means the whole response is never held in memory
+and the request can be abandoned as soon as those events have been found.
+
+ijson is used if it is installed. Otherwise the text is searched for the
+lists of events and each event is decoded on its own as soon as it is
+complete, so only one event is held at a time.
+"""
+import codecs
+import json
+import re
+
+from requests.exceptions import RequestException
+from urllib3.exceptions import HTTPError
+
+from .stats import getMetrics
+
+# Errors raised part way through a response which was cut off or isn't
+# valid JSON. ijson reads from urllib3 directly so can raise its errors.
+STREAM_ERRORS = (ValueError, RequestException, HTTPError)
+
+try:
+    import ijson
+    HAS_IJSON = True
+    STREAM_ERRORS += (ijson.JSONError,)
+except ImportError:
+    HAS_IJSON = False
+
+CHUNK_SIZE = 16 * 1024
+
+# Give up on a response with an event bigger than this
+MAX_BUFFER = 4 * 1024 * 1024
+
+# The list of events for each date in tournamentDatesWithEvents
+_DATE = re.compile(r'"(\d{4}-\d{2}-\d{2})"\s*:\s*\[')
+_EVENTS = re.compile(r'"events"\s*:\s*\[')
+
+_IJSON_EVENT = re.compile(r"^matchData\.item\.tournamentDatesWithEvents\."
+                          r"([^.]+)\.item\.events\.item$")
+
+
+class EventScanner(object):
+    '''Finds match events in a match list response fed in chunks of text.'''
+    def __init__(self):
+        self.decoded = 0
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._date = None
+        self._inEvents = False
+
+    def feed(self, text):
+        '''Adds text and returns a list of (date, event) tuples for the
+        events which are now complete.'''
+        buf = self._buffer + text
+        pos = 0
+        found = []
+
+        while True:
+            if not self._inEvents:
+                match = _EVENTS.search(buf, pos)
+
+                if match is None:
+                    self._lastDate(buf, pos, len(buf))
+                    # Keep enough to match a key split between chunks
+                    pos = max(pos, len(buf) - 32)
+                    break
+
+                self._lastDate(buf, pos, match.start())
+                self._inEvents = True
+                pos = match.end()
+
+            # Skip to the next event or the end of the list
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos == len(buf):
+                break
+
+            if buf[pos] == "]":
+                self._inEvents = False
+                pos += 1
+                continue
+
+            try:
+                event, pos = self._decoder.raw_decode(buf, pos)
+            except ValueError:
+                # The event hasn't finished arriving
+                if len(buf) - pos > MAX_BUFFER:
+                    self._buffer = ""
+                    raise ValueError("Unable to decode match list.")
+                break
+
+            self.decoded += 1
+            found.append((self._date, event))
+
+        self._buffer = buf[pos:]
+        return found
+
+    def _lastDate(self, buf, start, end):
+        for match in _DATE.finditer(buf, start, end):
+            self._date = match.group(1)
+
+
+def _scanText(response, chunk_size):
+    scanner = EventScanner()
+    utf8 = codecs.getincrementaldecoder("utf-8")("replace")
+
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            for item in scanner.feed(utf8.decode(chunk)):
+                yield item
+    finally:
+        getMetrics().incr("stream_scan.decoded", scanner.decoded)
+
+
+def _scanIjson(response):
+    response.raw.decode_content = True
+    builder = None
+    decoded = 0
+
+    try:
+        for prefix, event, value in ijson.parse(response.raw):
+            if builder is None:
+                if event != "start_map":
+                    continue
+
+                match = _IJSON_EVENT.match(prefix)
+
+                if match is None:
+                    continue
+
+                builder = ijson.ObjectBuilder()
+                date, start = match.group(1), prefix
+
+            builder.event(event, value)
+
+            if event == "end_map" and prefix == start:
+                decoded += 1
+                yield date, builder.value
+                builder = None
+    finally:
+        getMetrics().incr("stream_scan.decoded", decoded)
+
+
+def iterStreamedEvents(response, chunk_size=CHUNK_SIZE):
+    '''Generator yielding (date, event) for the events in a streaming
+    match list response as they arrive. Stop iterating, and close the
+    response, to abandon the rest of the response.
+
+    Raises one of STREAM_ERRORS if the response is cut off or can't be
+    decoded.
+    '''
+    if HAS_IJSON:
+        return _scanIjson(response)
+
+    return _scanText(response, chunk_size)
@@ -0,0 +1,229 @@
+from collections import deque
+from itertools import islice
+import time
+
+from .playeraction import (ACTION_GOAL, ACTION_RED_CARD,
+                           ACTION_YELLOW_RED_CARD, PlayerAction)
+
+# How far apart the times of a player's action can be and still be treated
+# as a correction
+CORRECTION_MINUTES = 5
+
+
+class TimelineEvent(object):
+    '''A goal, card or change of period in a match.
+
+    seq - sequence number. Increases by one for each event on a timeline.
+    home - True for the home side, False for the away side and None for
+    events which belong to the match (i.e. period changes).
+    action - PlayerAction for goals and cards.
+    period - the new period for period changes.
+    corrects - seq of the event this one replaces if it is a correction to
+    an action (e.g. its time or the player's name), otherwise None.
+    '''
+    TYPE_GOAL = "goal"
+    TYPE_OWN_GOAL = "own-goal"
+    TYPE_PENALTY = "penalty"
+    TYPE_RED_CARD = "red-card"
+    TYPE_SECOND_YELLOW = "second-yellow"
+    TYPE_PERIOD = "period"
+
+    __slots__ = ("seq", "eventType", "home", "action", "period", "time",
+                 "corrects")
+
+    def __init__(self, seq, event_type, home=None, action=None, period=None,
+                 corrects=None):
+        self.seq = seq
+        self.eventType = event_type
+        self.home = home
+        self.action = action
+        self.period = period
+        self.corrects = corrects
+        self.time = time.time()
+
+    def __repr__(self):
+        if self.action is not None:
+            return "<TimelineEvent({}, {}, {!r})>".format(self.seq,
+                                                          self.eventType,
+                                                          self.action)
+
+        return "<TimelineEvent({}, {}, {})>".format(self.seq, self.eventType,
+                                                    self.period)
+
+
+def _actionType(action):
+    '''Returns the timeline event type for a (name, action) record or None
+    if the action isn't kept on the timeline.'''
+    action_type, _, _, _, own_goal, penalty = action
+
+    if action_type == ACTION_GOAL:
+        if own_goal:
+            return TimelineEvent.TYPE_OWN_GOAL
+        if penalty:
+            return TimelineEvent.TYPE_PENALTY
+        return TimelineEvent.TYPE_GOAL
+
+    if action_type == ACTION_RED_CARD:
+        return TimelineEvent.TYPE_RED_CARD
+
+    if action_type == ACTION_YELLOW_RED_CARD:
+        return TimelineEvent.TYPE_SECOND_YELLOW
+
+    return None
+
+
+def _actionKey(record):
+    '''Returns the identity of a (name, action) record. The display time
+    and the own goal and penalty flags can be corrected so aren't part of
+    it.'''
+    name, (action_type, _, elapsed, added, _, _) = record
+    return action_type, elapsed or 0, added or 0, name[0]
+
+
+def _isCorrection(key, old):
+    '''Returns True if the action with key looks like a corrected version
+    of the one with key old, i.e. the same type with either the same time
+    (the name was fixed) or the same player a few minutes apart.'''
+    if key[0] != old[0]:
+        return False
+
+    if key[1:3] == old[1:3]:
+        return True
+
+    return key[3] == old[3] and abs(key[1] - old[1]) <= CORRECTION_MINUTES
+
+
+class Timeline(object):
+    '''List of the events in a match in the order they arrived, holding
+    the last maxlen events.
+
+    Events are only ever appended. One which arrives late (e.g. a goal only
+    appears once detailed data is requested) comes after those already held
+    and its action has the time in the match. A correction to an action
+    (e.g. its time or the player's name) is appended as a new event whose
+    corrects attribute is the seq of the event it replaces.
+
+    Sequence numbers are given out as events arrive and carry on across
+    matches so a consumer can keep the last one it saw and ask for the
+    events since then:
+
+        events = match.timeline.since(last)
+        if events:
+            last = events[-1].seq
+    '''
+    def __init__(self, maxlen=64):
+        self.maxlen = maxlen
+        self._events = deque(maxlen=maxlen)
+        # Action key: (record, latest event) for each side
+        self._seen = {True: {}, False: {}}
+        self.seq = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def __repr__(self):
+        return "<Timeline(events={}, seq={})>".format(len(self), self.seq)
+
+    def append(self, event_type, home=None, action=None, period=None,
+               corrects=None):
+        '''Adds an event to the end of the timeline.'''
+        self.seq += 1
+        event = TimelineEvent(self.seq, event_type, home, action, period,
+                              corrects)
+        self._events.append(event)
+        return event
+
+    def newMatch(self):
+        '''Forgets which actions have been seen so that the next match's
+        actions are all added.'''
+        self._seen = {True: {}, False: {}}
+
+    def _correct(self, event, record):
+        '''Appends a correction to event. Actions which aren't kept on the
+        timeline have no event to correct.'''
+        if event is None:
+            return None
+
+        return self.append(_actionType(record[1]), home=event.home,
+                           action=PlayerAction.fromRecord(record),
+                           corrects=event.seq)
+
+    def addActions(self, home, records):
+        '''Adds the goals and cards in a team's (name, action) records which
+        haven't been seen before, and corrections to those which have
+        changed. Returns the events added.
+        '''
+        seen = self._seen[home]
+        current = dict((_actionKey(r), r) for r in records)
+        new = [k for k in current if k not in seen]
+        events = []
+
+        for key in current:
+            if key in seen and seen[key][0] != current[key]:
+                record = current[key]
+                event = self._correct(seen[key][1], record)
+                seen[key] = (record, event)
+
+                if event is not None:
+                    events.append(event)
+
+        if not new:
+            return events
+
+        gone = [k for k in seen if k not in current]
+
+        # Add them in the order they happened
+        for key in sorted(new, key=lambda k: k[1:3]):
+            record = current[key]
+            old = next((k for k in gone if _isCorrection(key, k)), None)
+
+            if old is not None:
+                gone.remove(old)
+                event = self._correct(seen.pop(old)[1], record)
+                seen[key] = (record, event)
+
+                if event is not None:
+                    events.append(event)
+
+                continue
+
+            event_type = _actionType(record[1])
+            event = None
+
+            if event_type is not None:
+                event = self.append(event_type, home=home,
+                                    action=PlayerAction.fromRecord(record))
+                events.append(event)
+
+            seen[key] = (record, event)
+
+        return events
+
+    def addPeriod(self, period):
+        '''Adds a change of period.'''
+        return self.append(TimelineEvent.TYPE_PERIOD, period=period)
+
+    @property
+    def first(self):
+        '''Lowest sequence number of the events still held, or None.'''
+        return self._events[0].seq if self._events else None
+
+    def since(self, seq):
+        '''Returns a list of the events which arrived after seq, oldest
+        first. Events which have dropped out of the buffer are not
+        included.
+        '''
+        # Sequence numbers are consecutive so these are the last ones
+        return self.latest(self.seq - seq)
+
+    def latest(self, count):
+        '''Returns a list of the last count events, oldest first.'''
+        if count <= 0:
+            return []
+
+        events = list(islice(reversed(self._events), count))
+        events.reverse()
+        return events
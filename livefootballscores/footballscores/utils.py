@@ -1,4 +1,4 @@
-from datetime import tzinfo, timedelta
+from datetime import datetime, tzinfo, timedelta
 
 ZERO = timedelta(0)
 
@@ -13,3 +13,10 @@ class UTC(tzinfo):
 
     def dst(self, dt):
         return ZERO
+
+
+def secondsToMidnight():
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1),
+                                datetime.min.time())
+    return (midnight - now).total_seconds()
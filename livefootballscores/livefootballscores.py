@@ -1,9 +1,15 @@
+from collections import OrderedDict
+import time
+
 from libqtile.widget import base
 from libqtile import bar, pangocffi
 from libqtile.log_utils import logger
 from libqtile.popup import Popup
 
-from .footballscores import FootballMatch, League, FSConnectionError
+from .footballscores import (MatchCoordinator, PollScheduler, FixtureCalendar,
+                             EventBus, FSConnectionError, configureCache)
+from .footballscores.retry import getBreaker, getRetryPolicy
+from .footballscores.stats import getMetrics, getStats
 
 
 # Massively overkill to use a class here...
@@ -66,7 +72,40 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         ("popup_text", "{H:>20.20} {h}-{a} {A:<20.20} {T:<5}",
             "Format to use for popup window."),
         ("refresh_interval", 60, "Time to update data"),
+        ("adaptive_refresh", True,
+            "Only poll matches when they are likely to have changed e.g. "
+            "slowly before kick-off and not at all after full time. "
+            "Live matches are still polled every refresh_interval."),
+        ("max_refresh_interval", 1800,
+            "Longest time to wait between checks when adaptive_refresh is "
+            "True"),
+        ("refresh_workers", 4,
+            "Number of sources that can be updated at the same time"),
+        ("source_timeout", 20,
+            "Time to wait for a source before marking it as stale"),
+        ("lightweight_polling", False,
+            "Only request goal scorers and red cards for the match on "
+            "screen when the text needs them, for the popup and for a few "
+            "minutes after a goal. Red cards are only noticed while they "
+            "are being requested so red card indicators can be missed."),
+        ("detail_duration", 300,
+            "Seconds to keep requesting goal scorers and red cards after "
+            "they were last needed"),
+        ("stream_scan", False,
+            "Find teams without a team page by scanning the list of all "
+            "matches as it downloads rather than decoding all of it. Uses "
+            "ijson if it is installed."),
+        ("fixture_calendar", True,
+            "Download upcoming fixtures once a day and only poll a team or "
+            "league around the times its matches are played"),
+        ("fetch_days", 1,
+            "Number of days of fixtures to request at once, starting with "
+            "today. Larger values mean no request is needed for the new "
+            "day's matches at midnight but each request is bigger."),
         ("info_timeout", 5, "Time before reverting to default text"),
+        ("layout_cache_size", 32,
+            "Number of text layouts to keep so unchanged text isn't laid "
+            "out again on every bar redraw"),
         ("startup_delay", 30, "Time before sending first web request"),
         ("goal_indicator", "009999",
             "Colour of line to show team that scores"),
@@ -79,6 +118,10 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         ("status_live", "008800", "Colour when match is live"),
         ("status_halftime", "aaaa00", "Colour when half time"),
         ("status_fulltime", "666666", "Colour when match has ended"),
+        ("status_offline", "bb00bb",
+            "Colour when requests are paused after repeated failures"),
+        ("show_connection_state", True,
+            "Use the status bar to show when requests are paused"),
         (
             "popup_font",
             "monospace",
@@ -110,9 +153,14 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         self.reset_flags()
 
         self.sources = ([], [], [])
+        self.coordinator = None
         self.matches = []
         self.match_index = 0
 
+        # Match events are collected during a refresh and handled together
+        # on the event loop
+        self.bus = EventBus()
+
         # Define our screens
         self.screens = [self.status_text] + self.info_text
         self.screen_index = 0
@@ -122,9 +170,13 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         self.default_timer = None
         self.refresh_timer = None
         self.queue_timer = None
+        self.setup_attempts = 0
 
         self.popup = None
 
+        # Text layouts keyed by (text, font, fontsize, colour)
+        self.layouts = OrderedDict()
+
         # self.add_callbacks({"Button1": self.loop_match_info,
         #                     "Button3": self.toggle_info,
         #                     "Button4": self.scroll_up,
@@ -146,9 +198,14 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         timers = [self.queue_timer, self.default_timer, self.refresh_timer]
         _ = [timer.cancel() for timer in timers if timer]
 
+        if self.coordinator is not None:
+            self.coordinator.close()
+
+        self.bus.drain()
         self.flags = {}
         self.matches = []
         self.sources = ([], [], [])
+        self.coordinator = None
 
         self.timeout_add(1, self.setup)
 
@@ -159,6 +216,8 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
 
     def _configure(self, qtile, bar):
         base._Widget._configure(self, qtile, bar)
+        # Any layouts belong to the old drawer
+        self.clear_layouts()
         self.matches = []
         self.timeout_add(self.startup_delay, self.setup)
 
@@ -166,45 +225,79 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         self.qtile.run_in_executor(self._setup)
 
     def _setup(self):
-        kwargs = {"detailed": True,
-                  "on_goal": self.match_event,
-                  "on_red": self.match_event,
-                  "on_status_change": self.match_event,
-                  "on_new_match": self.match_event}
+        # Creating the sources doesn't send any requests. The coordinator
+        # fetches data for all of them together when it's updated.
+        if self.coordinator is None:
+            # Match lists stay in the cache until the next refresh
+            configureCache(poll_interval=self.refresh_interval)
+
+            scheduler = None
+            calendar = None
+            if self.fixture_calendar:
+                calendar = FixtureCalendar()
+
+            if self.adaptive_refresh:
+                scheduler = PollScheduler(live_interval=self.refresh_interval,
+                                          calendar=calendar)
+
+            self.coordinator = MatchCoordinator(
+                detailed=not self.lightweight_polling,
+                on_goal=self.bus.post,
+                on_red=self.bus.post,
+                on_status_change=self.bus.post,
+                on_new_match=self.bus.post,
+                workers=self.refresh_workers,
+                source_timeout=self.source_timeout,
+                scheduler=scheduler,
+                window=self.fetch_days,
+                calendar=calendar,
+                stream_scan=self.stream_scan
+            )
+
+            # Team and league names are looked up in the catalogue of the
+            # BBC's names. The coordinator reloads it each day.
+            self.coordinator.loadCatalogue()
+
+            self.sources[0].append(self.coordinator.addTeam(self.team))
+
+            for team in self.teams:
+                self.sources[1].append(self.coordinator.addTeam(team))
+
+            for league in self.leagues:
+                self.sources[2].append(self.coordinator.addLeague(league))
 
         try:
-            # Create foorball match object
-            if not self.sources[0]:
-                myteam = FootballMatch(self.team, **kwargs)
-                self.sources[0].append(myteam)
-
-            if not self.sources[1] and self.teams:
-                self.sources[1].clear()
-                for team in self.teams:
-                    self.sources[1].append(FootballMatch(team, **kwargs))
+            self.coordinator.update(force=True)
+            self.log_failures()
+            self.setup_attempts = 0
 
-            if not self.sources[2] and self.leagues:
-                self.sources[2].clear()
-                for league in self.leagues:
-                    self.sources[2].append(League(league, **kwargs))
-
-            self.get_matches()
-            self.set_refresh_timer()
-            self.queue_update()
+            self.qtile.call_soon_threadsafe(self._refreshed,
+                                            self.bus.drain(), True)
 
         except FSConnectionError:
 
             logger.warning("Unable to get football scores data.")
 
-            # Check if we managed to create all teams and leagues objects
-            if len(self.sources[1]) != len(self.teams):
-                self.sources[1].clear()
+            # Can't connect, so let's try again later. Back off so we're not
+            # hammering the server during an outage.
+            backoff = getRetryPolicy().delay(self.setup_attempts,
+                                             base_delay=5,
+                                             max_delay=300)
+            delay = max(5 + backoff, getBreaker().retryAfter)
+            self.setup_attempts += 1
+
+            self.qtile.call_soon_threadsafe(self._setup_failed, delay)
 
-            if len(self.sources[2]) != len(self.leagues):
-                self.sources[2].clear()
+    def _setup_failed(self, delay):
+        self.timeout_add(delay, self.setup)
+        self.queue_update()
 
-            # Can't connect, so let's try again later
-            self.timeout_add(5, self.setup)
+    def log_failures(self):
+        for source, err in self.coordinator.failures:
+            if err is None:
+                logger.warning("Timed out updating %s.", source)
+            else:
+                logger.warning("Unable to update %s: %r", source, err)
 
     def get_matches(self):
         self.matches = []
@@ -235,44 +328,107 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
             del self.flags[old]
 
     def set_refresh_timer(self):
-        self.refresh_timer = self.timeout_add(self.refresh_interval,
-                                              self.refresh)
+        if self.refresh_timer:
+            self.refresh_timer.cancel()
+
+        interval = self.refresh_interval
+        if self.adaptive_refresh:
+            next_update = self.coordinator.nextUpdate()
+            if next_update is not None:
+                interval = min(max(next_update, 1), self.max_refresh_interval)
+
+        self.refresh_timer = self.timeout_add(interval, self.refresh)
 
-    def refresh(self):
-        self.qtile.run_in_executor(self._refresh)
+    def refresh(self, force=False):
+        self.qtile.run_in_executor(self._refresh, force)
 
-    def _refresh(self):
+    def _refresh(self, force=False):
+        # Runs in the executor so only fetches data. Everything which
+        # touches the bar or timers is done by _refreshed on the event loop.
         success = False
-        self.reset_flags()
+        metrics = getMetrics()
+        metrics.incr("widget.refreshes")
         try:
-            if self.sources[0]:
-                _ = [x.update() for x in self.sources[0]]
+            with metrics.timer("widget.refresh"):
+                self.coordinator.update(force=force)
+            self.log_failures()
 
-            if self.sources[1]:
-                _ = [x.update() for x in self.sources[1]]
+            success = True
 
-            if self.sources[2]:
-                _ = [x.update() for x in self.sources[2]]
+        except FSConnectionError:
+            metrics.incr("widget.refresh_failures")
+            logger.warning("Unable to refresh football scores data.")
 
-            self.get_matches()
+        self.qtile.call_soon_threadsafe(self._refreshed, self.bus.drain(),
+                                        success)
 
-            self.queue_update()
+        return success
 
-            success = True
+    def _refreshed(self, events, success):
+        self.reset_flags()
 
-        except FSConnectionError:
-            logger.warning("Unable to refresh football scores data.")
-            if self.queue_timer:
-                self.queue_timer.cancel()
+        if success:
+            self.get_matches()
+            self.match_events(events)
+            self.request_detail([self.get_match()],
+                                self.screens[self.screen_index],
+                                refresh=False)
+            self.queue_update()
+
+        elif self.queue_timer:
+            self.queue_timer.cancel()
 
         self.set_refresh_timer()
 
-        return success
+    def source_for(self, match):
+        '''Returns the team or league providing the match.'''
+        for team in self.sources[0] + self.sources[1]:
+            if team is match:
+                return team
 
-    def match_event(self, event):
+        for league in self.sources[2]:
+            if any(m is match for m in league.matches):
+                return league
+
+        return None
+
+    def request_detail(self, matches, text, refresh=True):
+        """Asks for goal scorers etc. for the matches if text needs them.
 
+        If a source hasn't already got detailed data, it is refreshed
+        straight away (unless refresh is False).
+        """
+        if not self.lightweight_polling or self.coordinator is None:
+            return
+
+        upgraded = False
+
+        for match in matches:
+            if not match or not match.needsDetail(text):
+                continue
+
+            source = self.source_for(match)
+            if source is None:
+                continue
+
+            if source.wantsDetail:
+                source.requestDetail(self.detail_duration)
+            else:
+                self.coordinator.requestDetail(source, self.detail_duration)
+                upgraded = True
+
+        if upgraded and refresh:
+            self.refresh()
+
+    def match_events(self, events):
+        '''Sets the flags for a batch of events from one refresh.'''
         self.set_flags()
 
+        for event in events:
+            self.match_event(event)
+
+    def match_event(self, event):
+
         team = event.match.HomeTeam
 
         try:
@@ -287,19 +443,24 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
             self.flags[team] = MatchFlags()
             flags = self.flags[team]
 
+        # Both sides can score in one refresh so only set the flag for the
+        # side in this event
         if event.isGoal:
-            flags.homegoal = event.home
-            flags.awaygoal = not event.home
+            if event.home:
+                flags.homegoal = True
+            else:
+                flags.awaygoal = True
 
         elif event.isRed:
-            flags.homered = event.home
-            flags.awayred = not event.home
+            if event.home:
+                flags.homered = True
+            else:
+                flags.awayred = True
 
         elif event.isStatusChange:
             flags.statuschange = True
 
-        if flags.changes:
-            self.queue_update()
+        return flags.changes
 
     def queue_update(self):
         if self.queue_timer:
@@ -317,37 +478,26 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         except IndexError:
             return None
 
-    def calculate_length(self):
-
+    def get_text(self):
         m = self.get_match()
 
         if m:
             screen = self.screens[self.screen_index]
-            text = m.formatText(screen)
-        else:
-            text = ""
-
-        width, _ = self.drawer.max_layout_size(
-            [text],
-            self.font,
-            self.fontsize
-        )
+            return m.formatText(screen)
 
-        return width + 2 * self.margin
-
-    def draw(self):
-        # Remove background
-        self.drawer.clear(self.background or self.bar.background)
+        return ""
 
-        m = self.get_match()
+    def get_layout(self, text):
+        """Returns a (layout, width) pair for the text. Layouts are cached
+        so the same text isn't laid out and measured again on each redraw.
+        """
+        key = (text, self.font, self.fontsize, self.font_colour)
+        cached = self.layouts.get(key)
 
-        if m:
-            screen = self.screens[self.screen_index]
-            text = m.formatText(screen)
-        else:
-            text = ""
+        if cached is not None:
+            self.layouts.move_to_end(key)
+            return cached
 
-        # Create a text box
         layout = self.drawer.textlayout(text,
                                         self.font_colour,
                                         self.font,
@@ -355,6 +505,40 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
                                         None,
                                         wrap=False)
 
+        cached = self.layouts[key] = (layout, layout.width)
+
+        while len(self.layouts) > max(self.layout_cache_size, 1):
+            _, (old, _) = self.layouts.popitem(last=False)
+            old.finalize()
+
+        return cached
+
+    def clear_layouts(self):
+        for layout, _ in self.layouts.values():
+            layout.finalize()
+
+        self.layouts.clear()
+
+    def finalize(self):
+        self.clear_layouts()
+        base._Widget.finalize(self)
+
+    def calculate_length(self):
+        _, width = self.get_layout(self.get_text())
+
+        return width + 2 * self.margin
+
+    def draw(self):
+        start = time.time()
+
+        # Remove background
+        self.drawer.clear(self.background or self.bar.background)
+
+        m = self.get_match()
+
+        # Create a text box (or reuse the one used to calculate the length)
+        layout, _ = self.get_layout(self.get_text())
+
         # We want to centre this vertically
         y_offset = (self.bar.height - layout.height) / 2
 
@@ -383,10 +567,15 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
                 if self.underline_status:
                     self.draw_underline(m)
 
+        elif self.connection_paused:
+            self.draw_underline(m)
+
         # # Redraw the bar
         # self.bar.draw()
         self.drawer.draw(offsetx=self.offset, width=self.length)
 
+        getMetrics().observe("widget.draw", time.time() - start)
+
     def draw_goal(self, home):
         offset = 0 if home else (self.width - 2)
 
@@ -411,11 +600,17 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
                              self.height/2,
                              2)
 
+    @property
+    def connection_paused(self):
+        return self.show_connection_state and getBreaker().isOpen
+
     def draw_underline(self, m):
         offset = 2
         width = self.width - 2
 
-        if m.isFixture:
+        if self.connection_paused:
+            fill = self.status_offline
+        elif m.isFixture:
             fill = self.status_fixture
         elif m.isLive:
             fill = self.status_live
@@ -455,6 +650,8 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
     def loop_match_info(self):
         self.set_default_timer()
         self.screen_index = (self.screen_index + 1) % len(self.screens)
+        self.request_detail([self.get_match()],
+                            self.screens[self.screen_index])
         self.bar.draw()
 
     def scroll_up(self):
@@ -502,6 +699,10 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         for i, m in enumerate(self.matches):
             matches[i] = str(m)
 
+        stale = []
+        if self.coordinator is not None:
+            stale = [repr(s) for s in self.coordinator.staleSources]
+
         return {"name": self.name,
                 "sources": {
                     "team": str_team,
@@ -513,11 +714,26 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
                     "teams": obj_teams,
                     "leagues": obj_leagues
                 },
-                "matches": matches
+                "matches": matches,
+                "stale": stale
                 }
 
+    def cmd_connection_state(self):
+        """Returns the state of the circuit breaker that pauses requests
+        after repeated failures."""
+        return getBreaker().stats
+
+    def cmd_stats(self):
+        """Returns request, update and draw statistics. Useful for seeing
+        what the widget is doing if it stops updating."""
+        stats = getStats()
+        stats["layouts"] = len(self.layouts)
+        stats["stale"] = ([repr(s) for s in self.coordinator.staleSources]
+                          if self.coordinator is not None else [])
+        return stats
+
     def cmd_refresh(self):
-        return self.refresh()
+        return self.refresh(force=True)
 
     def _format_matches(self):
         lines = []
@@ -568,6 +784,7 @@ class LiveFootballScoresWidget(base._Widget, base.MarginMixin):
         self.toggle_info()
 
     def show_matches(self):
+        self.request_detail(self.matches, self.popup_text)
         lines = []
 
         if not self.matches:
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "livefootballscores"))
+# Ahead of the widget's directory so the widget is imported from its package
+sys.path.insert(0, os.path.dirname(HERE))
+
+from footballscores import base, cache, catalogue, retry, store  # noqa: E402
+from footballscores.footballmatch import FootballMatch  # noqa: E402
+from footballscores.stats import resetStats  # noqa: E402
+
+from fakes import FakeServer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    '''Gives each test an empty store, cache, catalogue and circuit breaker
+    and retries without waiting.'''
+    store.setStorePath(str(tmp_path / "store.json"))
+    cache.getCache().clear()
+    cache.getCache().resetStats()
+    monkeypatch.setattr(catalogue, "_CATALOGUE", None)
+    monkeypatch.setattr(retry, "POLICY", retry.RetryPolicy(base_delay=0))
+    retry.getBreaker().reset()
+    resetStats()
+    yield
+    store.setStorePath(None)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    '''A FakeServer which every request is sent to.'''
+    fake = FakeServer().start()
+    monkeypatch.setattr(base, "PROXY_BASE", fake.url)
+    monkeypatch.setattr(base, "API_BASE", fake.url + "/p")
+    monkeypatch.setattr(FootballMatch, "teamprefix", fake.url + "/teams/")
+    yield fake
+    fake.stop()
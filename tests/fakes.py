@@ -0,0 +1,236 @@
+"""Builders for morph payloads and a local stand-in for the BBC servers."""
+from datetime import datetime
+import json
+import re
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def makeAction(player, action_type, minute, added=0, penalty=False,
+               own_goal=False, display=None):
+    if display is None:
+        display = "{}'".format(minute)
+        if added:
+            display += "+{}'".format(added)
+
+    return {"name": {"full": player, "abbreviation": player[:8],
+                     "first": player.split()[0], "last": player.split()[-1]},
+            "actions": [{"type": action_type, "displayTime": display,
+                         "timeElapsed": minute, "addedTime": added,
+                         "ownGoal": own_goal, "penalty": penalty}]}
+
+
+def makeTeam(name, score=None, actions=None, abbreviation=None):
+    team = {"name": {"full": name, "first": name, "last": name,
+                     "abbreviation": abbreviation or name[:3].upper()},
+            "scores": {"score": score}}
+
+    if actions is not None:
+        team["playerActions"] = actions
+
+    return team
+
+
+def makeEvent(key, home, away, slug="premier-league", status="mid-event",
+              period="FIRSTHALF", minutes=10, date=None):
+    if date is None:
+        date = datetime.now().strftime("%Y-%m-%d")
+
+    return {"eventKey": key,
+            "homeTeam": home,
+            "awayTeam": away,
+            "tournamentSlug": slug,
+            "tournamentName": {"full": slug.replace("-", " ").title()},
+            "eventStatus": status,
+            "eventStatusNote": "",
+            "eventProgress": {"period": period},
+            "minutesElapsed": minutes,
+            "minutesIntoAddedTime": 0,
+            "venue": {"name": {"full": "Stadium"}},
+            "startTime": date + "T15:00:00+01:00",
+            "startTimeInUKHHMM": "15:00"}
+
+
+def makePayload(events):
+    '''Groups events by tournament and date like the match list API.'''
+    comps = {}
+
+    for event in events:
+        dates = comps.setdefault(event["tournamentSlug"], {})
+        dates.setdefault(event["startTime"][:10], []).append(event)
+
+    return {"matchData": [
+        {"tournamentMeta": {"slug": slug},
+         "tournamentDatesWithEvents": {d: [{"events": evs}]
+                                       for d, evs in sorted(dates.items())}}
+        for slug, dates in comps.items()]}
+
+
+_SOURCE = re.compile(r"/(team|tournament)/([^/]+)/")
+_WINDOW = re.compile(r"/endDate/([^/]+)/startDate/([^/]+)/")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def sendJSON(self, obj, status=200, headers=None):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+
+        self.end_headers()
+
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.fake.handle(self)
+
+    def do_HEAD(self):
+        self.server.fake.handle(self)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up part way through a response e.g. when a scan
+        # stops early
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super(_Server, self).handle_error(request, client_address)
+
+
+class FakeServer(object):
+    '''Serves match lists for the events in self.events on the requested
+    dates, team page checks for the slugs in self.teampages and the
+    catalogue from the push API.
+
+    routes - list of (method, regex, func) checked first. func is called
+    with the request handler.
+    '''
+    def __init__(self):
+        self.events = []
+        self.teampages = set()
+        self.catalogue = []
+        self.routes = []
+        self.log = []
+        self.closed = threading.Event()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        self.closed.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def requests(self, method="GET"):
+        return [p for m, p in self.log if m == method]
+
+    def handle(self, handler):
+        self.log.append((handler.command, handler.path))
+
+        for method, pattern, func in self.routes:
+            if method == handler.command and re.search(pattern, handler.path):
+                return func(handler)
+
+        if handler.command == "HEAD":
+            slug = handler.path.rstrip("/").split("/")[-1]
+            status = 200 if slug in self.teampages else 404
+            return handler.sendJSON({}, status)
+
+        if handler.path.startswith("/p?"):
+            moments = [{"payload": json.dumps(self.catalogue)}]
+            return handler.sendJSON({"moments": moments})
+
+        events = self.events
+        match = _SOURCE.search(handler.path)
+
+        if match and match.group(2) != "full-priority-order":
+            kind, slug = match.groups()
+
+            if kind == "tournament":
+                events = [e for e in events if e["tournamentSlug"] == slug]
+            else:
+                events = [e for e in events
+                          if slug in (e["homeTeam"]["name"]["full"].lower(),
+                                      e["awayTeam"]["name"]["full"].lower())]
+
+        window = _WINDOW.search(handler.path)
+
+        if window:
+            end, start = window.groups()
+            events = [e for e in events if start <= e["startTime"][:10] <= end]
+
+        handler.sendJSON(makePayload(events))
+
+
+def makeMoment(topic, payload):
+    return {"topic": topic, "payload": json.dumps(payload)}
+
+
+def sendChunked(handler, chunks, hold=0):
+    '''Sends a chunked response with each of chunks (bytes) as one chunk,
+    then waits hold seconds before ending it.'''
+    handler.send_response(200)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Transfer-Encoding", "chunked")
+    handler.end_headers()
+
+    try:
+        for chunk in chunks:
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            handler.wfile.flush()
+
+        if hold:
+            handler.server.fake.closed.wait(hold)
+
+        handler.wfile.write(b"0\r\n\r\n")
+    except OSError:
+        # The client went away
+        pass
+
+
+class PushStreams(object):
+    '''Route for the push API which sends each connection the next list of
+    chunks in streams. The last list is used for any further connections.
+
+    hold - seconds to keep each stream open after its chunks are sent.
+    '''
+    def __init__(self, streams, hold=0):
+        self.streams = list(streams)
+        self.hold = hold
+        self.connections = 0
+
+    def __call__(self, handler):
+        index = min(self.connections, len(self.streams) - 1)
+        self.connections += 1
+        sendChunked(handler, self.streams[index], self.hold)
+
+
+def waitFor(predicate, timeout=5):
+    '''Waits until predicate() is true. Returns its final value.'''
+    deadline = time.time() + timeout
+
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+
+    return predicate()
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from footballscores import aio
+from footballscores.cache import getCache
+
+from fakes import makeEvent, makeTeam
+
+
+def test_transport_used_from_several_loops(server, monkeypatch):
+    monkeypatch.setattr(aio, "PROXY_BASE", server.url)
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0))]
+    transport = aio.AsyncTransport(concurrency=1)
+    url = "/tournament/premier-league/"
+
+    async def fetchAll():
+        results = await asyncio.gather(*[transport.request(url)
+                                         for _ in range(3)])
+        await transport.close()
+        return results
+
+    for _ in range(2):
+        results = asyncio.run(fetchAll())
+        assert all(r["matchData"] for r in results)
+
+
+def test_async_match_in_separate_runs(server, monkeypatch):
+    monkeypatch.setattr(aio, "PROXY_BASE", server.url)
+    server.teampages.add("arsenal")
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0))]
+
+    match = asyncio.run(aio.AsyncFootballMatch.create("Arsenal"))
+    assert match.HomeScore == 1
+
+    # The next poll would otherwise come from the response cache
+    getCache().clear()
+    server.events[0]["homeTeam"]["scores"]["score"] = 2
+    asyncio.run(aio.updateAll([match]))
+    assert match.HomeScore == 2
+
+
+def test_requests_use_the_response_cache(server, monkeypatch):
+    monkeypatch.setattr(aio, "PROXY_BASE", server.url)
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0))]
+    transport = aio.AsyncTransport()
+    url = "/tournament/premier-league/"
+
+    async def fetchTwice():
+        first = await transport.request(url, ttl=60)
+        second = await transport.request(url, ttl=60)
+        await transport.close()
+        return first, second
+
+    first, second = asyncio.run(fetchTwice())
+
+    assert first == second
+    assert len(server.requests()) == 1
+
+
+def test_create_fires_events_like_the_sync_match(server, monkeypatch):
+    monkeypatch.setattr(aio, "PROXY_BASE", server.url)
+    data = makeEvent("1", makeTeam("Arsenal", 1), makeTeam("Chelsea", 0))
+    fired = []
+
+    # Like FootballMatch, events_on_first_run is passed on as first_run
+    # so the first update fires events unless it is set
+    match = asyncio.run(aio.AsyncFootballMatch.create(
+        "Arsenal", data=data, on_new_match=fired.append))
+    sync = aio.FootballMatch("Arsenal", data=data, on_new_match=fired.append)
+
+    assert match and sync
+    assert len(fired) == 2
+
+    asyncio.run(aio.AsyncFootballMatch.create(
+        "Arsenal", data=data, events_on_first_run=True,
+        on_new_match=fired.append))
+    aio.FootballMatch("Arsenal", data=data, events_on_first_run=True,
+                      on_new_match=fired.append)
+
+    assert len(fired) == 2
+
+
+def test_bad_url_is_not_swallowed():
+    transport = aio.AsyncTransport()
+
+    async def fetch():
+        try:
+            return await transport.fetch("GET", "not a url")
+        finally:
+            await transport.close()
+
+    with pytest.raises(Exception) as info:
+        asyncio.run(fetch())
+
+    assert not isinstance(info.value, NameError)
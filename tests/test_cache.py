@@ -0,0 +1,66 @@
+import pytest
+
+from footballscores import cache, configureCache
+from footballscores.base import matchcommon
+from footballscores.footballmatch import FootballMatch
+
+from fakes import makeEvent, makeTeam
+
+MATCH_LIST = FootballMatch.scoreslink.format(start_date="2026-10-18",
+                                             end_date="2026-10-18",
+                                             source="team/arsenal",
+                                             detailed="true")
+
+
+@pytest.fixture
+def ttls(monkeypatch):
+    monkeypatch.setattr(cache.CACHE, "ttls", list(cache.CACHE.ttls))
+
+
+def test_match_lists_fresh_until_next_poll():
+    ttl = cache.getCache().ttlFor(MATCH_LIST)
+
+    assert cache.DEFAULT_POLL_INTERVAL - 10 < ttl < cache.DEFAULT_POLL_INTERVAL
+
+
+def test_poll_interval_sets_match_list_ttls(ttls):
+    configureCache(poll_interval=30)
+
+    assert cache.getCache().ttlFor(MATCH_LIST) == 30 - cache.POLL_MARGIN
+    assert cache.getCache().ttlFor(
+        "/bbc-morph-football-teams-competitions-list") == 24 * 60 * 60
+
+
+def test_short_poll_interval_never_cached(ttls):
+    configureCache(poll_interval=2)
+
+    assert cache.getCache().ttlFor(MATCH_LIST) == 0
+
+
+def test_requests_between_polls_served_from_cache(server):
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0))]
+    common = matchcommon()
+
+    first = common._request(MATCH_LIST)
+    second = common._request(MATCH_LIST)
+
+    assert first == second
+    assert len(server.requests()) == 1
+
+
+def test_stale_response_revalidated(server):
+    def notModified(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            handler.send_response(304)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+        else:
+            handler.sendJSON({"matchData": []}, headers={"ETag": '"v1"'})
+
+    server.routes.append(("GET", "match-list-data", notModified))
+    common = matchcommon()
+
+    common._request(MATCH_LIST, ttl=0)
+    assert common._request(MATCH_LIST, ttl=0) == {"matchData": []}
+    assert cache.getCacheStats()["revalidations"] == 1
@@ -0,0 +1,264 @@
+from datetime import datetime
+import threading
+import time
+
+import pytest
+
+from footballscores import (FixtureCalendar, MatchCoordinator,
+                            PollScheduler)
+from footballscores.cache import getCache
+from footballscores.dateindex import dateWindow
+from footballscores.exceptions import FSConnectionError
+from footballscores.stats import getMetrics
+from footballscores.store import getStore
+
+from fakes import makeEvent, makeTeam, waitFor
+
+
+def test_add_team_uses_stored_team_page(server):
+    getStore().set("teampage:arsenal", True, 60)
+
+    coordinator = MatchCoordinator()
+    arsenal = coordinator.addTeam("Arsenal")
+
+    assert arsenal.hasTeamPage
+    assert arsenal.myteampage == "team/arsenal"
+    assert server.log == []
+
+
+def test_team_page_checked_on_first_update(server):
+    server.teampages.add("liverpool")
+    server.events = [makeEvent("1", makeTeam("Liverpool", 1),
+                               makeTeam("Everton", 0))]
+
+    coordinator = MatchCoordinator()
+    liverpool = coordinator.addTeam("Liverpool")
+    assert not liverpool.hasTeamPage
+
+    coordinator.update()
+
+    assert liverpool.hasTeamPage
+    assert liverpool.HomeScore == 1
+    assert server.requests("HEAD") == ["/teams/liverpool"]
+    # A single team with its own page doesn't need the list of all matches
+    assert all("/team/liverpool/" in p for p in server.requests()
+               if not p.startswith("/p?"))
+
+    coordinator.update(force=True)
+    assert server.requests("HEAD") == ["/teams/liverpool"]
+
+
+def test_team_without_page_is_remembered(server):
+    server.events = [makeEvent("1", makeTeam("Everton", 0),
+                               makeTeam("Liverpool", 2))]
+
+    coordinator = MatchCoordinator()
+    everton = coordinator.addTeam("Everton")
+    coordinator.update()
+
+    assert not everton.hasTeamPage
+    assert everton.AwayScore == 2
+    assert getStore().get("teampage:everton") is False
+    assert not coordinator._unchecked
+
+
+def test_unreachable_team_page_checked_again(server, monkeypatch):
+    from footballscores.footballmatch import FootballMatch
+
+    server.events = [makeEvent("1", makeTeam("Everton", 0),
+                               makeTeam("Liverpool", 2))]
+    monkeypatch.setattr(FootballMatch, "teamprefix", "http://127.0.0.1:9/")
+
+    coordinator = MatchCoordinator()
+    everton = coordinator.addTeam("Everton")
+    coordinator.update()
+
+    assert not everton.hasTeamPage
+    assert everton.AwayScore == 2
+    assert coordinator._unchecked == {id(everton)}
+
+
+def test_team_page_error_is_not_stored(server):
+    server.routes.append(("HEAD", "/teams/everton",
+                          lambda h: h.sendJSON({}, status=503)))
+    server.events = [makeEvent("1", makeTeam("Everton", 0),
+                               makeTeam("Liverpool", 2))]
+
+    coordinator = MatchCoordinator()
+    everton = coordinator.addTeam("Everton")
+    coordinator.update()
+
+    assert not everton.hasTeamPage
+    assert getStore().get("teampage:everton") is None
+    assert coordinator._unchecked == {id(everton)}
+
+    server.routes = []
+    server.teampages.add("everton")
+    coordinator.update(force=True)
+
+    assert everton.hasTeamPage
+    assert getStore().get("teampage:everton") is True
+
+
+def test_names_are_looked_up_in_the_catalogue(server):
+    server.catalogue = [
+        {"name": "Paris Saint-Germain", "shortName": "PSG",
+         "url": "/sport/football/teams/paris-st-germain"},
+        {"name": "Premier League", "shortName": "Prem",
+         "url": "/sport/football/premier-league"}]
+    getStore().set("teampage:paris-st-germain", True, 60)
+    server.events = [makeEvent("1", makeTeam("Paris Saint-Germain", 2),
+                               makeTeam("Lyon", 0), slug="ligue-1")]
+
+    coordinator = MatchCoordinator()
+    psg = coordinator.addTeam("PSG")
+    prem = coordinator.addLeague("Prem")
+    # Aliases don't need the catalogue
+    spurs = coordinator.addTeam("Spurs")
+
+    assert spurs._teamPage()[0] == "tottenham-hotspur"
+    assert not psg.hasTeamPage
+
+    coordinator.update()
+
+    assert psg.myteampage == "team/paris-st-germain"
+    assert prem.leagueid == "premier-league"
+    assert psg.HomeScore == 2
+
+    # The catalogue is only loaded once a day
+    coordinator.update(force=True)
+    assert len([p for p in server.requests() if p.startswith("/p?")]) == 1
+
+
+def hangUp(handler):
+    handler.close_connection = True
+
+
+def test_failing_source_does_not_affect_others(server):
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0)),
+                     makeEvent("2", makeTeam("Celtic", 3),
+                               makeTeam("Hearts", 0), slug="scottish")]
+    server.routes.append(("GET", "/tournament/scottish/", hangUp))
+
+    coordinator = MatchCoordinator()
+    prem = coordinator.addLeague("premier-league")
+    # A longer window gives the league a request of its own
+    scottish = coordinator.addLeague("scottish", window=3)
+
+    assert not coordinator.update()
+
+    assert prem.matches[0].HomeScore == 1
+    assert coordinator.isStale(scottish)
+    assert not coordinator.isStale(prem)
+    assert [s for s, _ in coordinator.failures] == [scottish]
+
+
+def test_slow_jobs_time_out_from_submission():
+    release = threading.Event()
+    coordinator = MatchCoordinator(workers=1, source_timeout=0.3)
+    a, b = object(), object()
+    coordinator._busy.update([id(a), id(b)])
+
+    slow = ((a,), release.wait, (5,))
+    queued = ((b,), lambda: None, ())
+
+    started = time.time()
+    failed = coordinator._runJobs([slow, queued])
+
+    # The queued job never got a worker but is still given up on
+    assert time.time() - started < 1
+    assert failed == [(slow, None), (queued, None)]
+    # Only the job which is still running keeps its sources busy
+    assert coordinator._busy == {id(a)}
+
+    release.set()
+    assert waitFor(lambda: not coordinator._busy)
+    coordinator.close()
+
+
+def test_lookups_leave_running_updates_busy(server):
+    calls = []
+
+    def slow(handler):
+        calls.append(handler.path)
+        server.closed.wait(2)
+        hangUp(handler)
+
+    server.routes.append(("HEAD", "/teams/everton",
+                          lambda h: h.sendJSON({}, status=503)))
+    server.routes.append(("GET", "full-priority-order", slow))
+
+    coordinator = MatchCoordinator(source_timeout=0.3)
+    everton = coordinator.addTeam("Everton")
+
+    assert not coordinator.update()
+    assert coordinator._busy == {id(everton)}
+
+    # Everton's page is looked up again while its update is still running
+    coordinator.update(force=True)
+
+    assert len(server.requests("HEAD")) == 2
+    assert len(calls) == 1
+    assert coordinator.isStale(everton)
+
+
+def test_lookups_share_one_timeout(server):
+    def slow(handler):
+        server.closed.wait(2)
+        hangUp(handler)
+
+    server.events = [makeEvent("1", makeTeam("Liverpool", 1),
+                               makeTeam("Everton", 0))]
+    server.routes.append(("HEAD", "/teams/liverpool", slow))
+    # Only the calendar asks for a week of fixtures
+    end = dateWindow(datetime.now().strftime("%Y-%m-%d"), 7)[1]
+    server.routes.append(("GET", "endDate/{}/".format(end), slow))
+
+    coordinator = MatchCoordinator(calendar=FixtureCalendar(),
+                                   source_timeout=0.5)
+    liverpool = coordinator.addTeam("Liverpool")
+
+    started = time.time()
+    coordinator.update()
+
+    assert time.time() - started < 0.9
+    assert getMetrics().counter("calendar.failures") == 1
+    assert liverpool.HomeScore == 1
+
+
+def test_job_errors_are_returned():
+    coordinator = MatchCoordinator()
+    error = ValueError("bad")
+
+    def fail():
+        raise error
+
+    failing = ((), fail, ())
+    working = ((), lambda: True, ())
+
+    assert coordinator._runJobs([failing, working]) == [(failing, error)]
+    coordinator.close()
+
+
+def test_error_response_keeps_live_match(server):
+    server.teampages.add("arsenal")
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0))]
+
+    scheduler = PollScheduler(live_interval=60)
+    coordinator = MatchCoordinator(scheduler=scheduler)
+    arsenal = coordinator.addTeam("Arsenal")
+    coordinator.update()
+
+    server.routes.append(("GET", "/team/arsenal/",
+                          lambda h: h.sendJSON({}, status=503)))
+    getCache().clear()
+
+    with pytest.raises(FSConnectionError):
+        coordinator.update(force=True)
+
+    # Still shown and tried again soon rather than tomorrow
+    assert arsenal.HomeScore == 1
+    assert coordinator.isStale(arsenal)
+    assert coordinator.nextUpdate() <= scheduler.retry_interval
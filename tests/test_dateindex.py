@@ -0,0 +1,255 @@
+from datetime import date, datetime
+
+import pytest
+
+from footballscores import FootballMatch, League, MatchCoordinator
+from footballscores import coordinator, footballmatch, league
+from footballscores.dateindex import DateIndex, dateString, dateWindow
+
+from fakes import makeEvent, makeTeam
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    '''Sets the date seen by teams, leagues and the coordinator. Change it
+    with clock.day = "YYYY-MM-DD".'''
+    class Clock(datetime):
+        day = "2026-10-18"
+
+        @classmethod
+        def now(cls, tz=None):
+            value = datetime.strptime(cls.day + " 23:59", "%Y-%m-%d %H:%M")
+            return value.replace(tzinfo=tz) if tz else value
+
+    for module in (coordinator, footballmatch, league):
+        monkeypatch.setattr(module, "datetime", Clock)
+
+    return Clock
+
+
+def fixtures():
+    '''Arsenal play on the 18th and 20th, Chelsea only on the 18th.'''
+    return [
+        makeEvent("1", makeTeam("Arsenal", 1), makeTeam("Chelsea", 0),
+                  date="2026-10-18"),
+        makeEvent("2", makeTeam("Everton"), makeTeam("Arsenal"),
+                  status="pre-event", date="2026-10-20"),
+        makeEvent("3", makeTeam("Fulham"), makeTeam("Brentford"),
+                  status="pre-event", date="2026-10-19"),
+    ]
+
+
+# DateIndex
+
+def test_date_window():
+    assert dateWindow("2026-10-18", 1) == ("2026-10-18", "2026-10-18")
+    assert dateWindow("2026-10-30", 3) == ("2026-10-30", "2026-11-01")
+    assert dateWindow("2026-12-31", 2) == ("2026-12-31", "2027-01-01")
+
+
+def test_date_string():
+    assert dateString(date(2026, 1, 2)) == "2026-01-02"
+    assert dateString(datetime(2026, 1, 2, 23, 59)) == "2026-01-02"
+    assert dateString("2026-01-02") == "2026-01-02"
+
+
+def test_set_keeps_first_event_per_date():
+    index = DateIndex()
+    index.set([("2026-10-18", "a"), ("2026-10-18", "b"),
+               ("2026-10-20", "c")], "2026-10-18", "2026-10-20", "2026-10-18")
+
+    assert index.get("2026-10-18") == "a"
+    assert index.get("2026-10-19") is None
+    assert index.dates == ["2026-10-18", "2026-10-20"]
+    assert index.after("2026-10-19") == ["2026-10-20"]
+
+
+def test_many_keeps_every_event():
+    index = DateIndex(many=True)
+    index.set([("2026-10-18", "a"), ("2026-10-18", "b")],
+              "2026-10-18", "2026-10-18", "2026-10-18")
+
+    assert index.get("2026-10-18") == ["a", "b"]
+    assert index.get("2026-10-19") == []
+
+    # get returns a copy
+    index.get("2026-10-18").append("c")
+    assert index.get("2026-10-18") == ["a", "b"]
+
+
+def test_covers():
+    index = DateIndex()
+    assert not index.covers("2026-10-18")
+
+    index.set([], "2026-10-18", "2026-10-20", "2026-10-18")
+
+    assert index.covers("2026-10-18")
+    assert index.covers("2026-10-20")
+    assert not index.covers("2026-10-17")
+    assert not index.covers("2026-10-21")
+
+
+def test_rollover_only_on_first_call_of_new_day():
+    index = DateIndex()
+    index.set([("2026-10-19", "b")], "2026-10-18", "2026-10-19",
+              "2026-10-18")
+
+    assert index.rollover("2026-10-18") is None
+    assert index.rollover("2026-10-19") == "b"
+    assert index.day == "2026-10-19"
+    # Later updates on the same day request fresh data
+    assert index.rollover("2026-10-19") is None
+
+
+def test_rollover_to_day_without_events():
+    index = DateIndex()
+    index.set([("2026-10-18", "a")], "2026-10-18", "2026-10-19",
+              "2026-10-18")
+
+    assert index.rollover("2026-10-19") == {}
+
+    many = DateIndex(many=True)
+    many.set([("2026-10-18", "a")], "2026-10-18", "2026-10-19",
+             "2026-10-18")
+
+    assert many.rollover("2026-10-19") == []
+
+
+def test_rollover_outside_window():
+    index = DateIndex()
+    assert index.rollover("2026-10-18") is None
+
+    index.set([("2026-10-18", "a")], "2026-10-18", "2026-10-18",
+              "2026-10-18")
+
+    assert index.rollover("2026-10-19") is None
+    assert index.day == "2026-10-18"
+
+
+# Requests and midnight
+
+def test_team_requests_its_window(clock):
+    url = FootballMatch("Arsenal", data={}, window=3)._scoresFixturesUrl()
+
+    assert "2026-10-18" in url and "2026-10-20" in url
+
+    dated = FootballMatch("Arsenal", data={}, matchdate="2026-12-31",
+                          window=2)
+    url = dated._scoresFixturesUrl()
+
+    assert "2026-12-31" in url and "2027-01-01" in url
+
+
+def test_league_requests_its_window(clock):
+    url = League("premier-league", data=[], window=2)._scoresFixturesUrl()
+
+    assert "2026-10-18" in url and "2026-10-19" in url
+
+
+def test_team_rolls_over_at_midnight_without_request(server, clock):
+    server.teampages.add("arsenal")
+    server.events = fixtures()
+    arsenal = FootballMatch("Arsenal", window=3)
+
+    assert arsenal.HomeScore == 1
+    assert arsenal.MatchDates == ["2026-10-18", "2026-10-20"]
+    requests = len(server.requests())
+
+    # No match on the 19th
+    clock.day = "2026-10-19"
+    arsenal.update()
+
+    assert not arsenal
+    assert len(server.requests()) == requests
+
+    clock.day = "2026-10-20"
+    arsenal.update()
+
+    assert arsenal.HomeTeam == "Everton"
+    assert arsenal.isFixture
+    assert len(server.requests()) == requests
+
+    # The next update on the same day asks the server
+    arsenal.update()
+    assert len(server.requests()) == requests + 1
+
+
+def test_team_requests_after_window(server, clock):
+    server.teampages.add("arsenal")
+    server.events = fixtures()
+    arsenal = FootballMatch("Arsenal")
+    requests = len(server.requests())
+
+    clock.day = "2026-10-19"
+    arsenal.update()
+
+    assert len(server.requests()) == requests + 1
+
+
+def test_next_match_and_match_on(server, clock):
+    server.teampages.add("arsenal")
+    server.events = fixtures()
+    arsenal = FootballMatch("Arsenal", window=3)
+    requests = len(server.requests())
+
+    upcoming = arsenal.NextMatch
+    assert (upcoming.HomeTeam, upcoming.AwayTeam) == ("Everton", "Arsenal")
+
+    assert arsenal.matchOn(date(2026, 10, 18)).HomeScore == 1
+    assert arsenal.matchOn("2026-10-19") is None
+    assert len(server.requests()) == requests
+
+
+def test_league_rolls_over_at_midnight(server, clock):
+    server.events = fixtures()
+    lg = League("premier-league", window=2)
+
+    assert lg.MatchDates == ["2026-10-18", "2026-10-19"]
+    assert [m.HomeTeam for m in lg.matches] == ["Arsenal"]
+    assert [m.HomeTeam for m in lg.matchesOn("2026-10-19")] == ["Fulham"]
+    requests = len(server.requests())
+
+    clock.day = "2026-10-19"
+    lg.update()
+
+    assert [m.HomeTeam for m in lg.matches] == ["Fulham"]
+    assert len(server.requests()) == requests
+
+
+def test_coordinator_rolls_over_at_midnight(server, clock):
+    server.events = fixtures()
+    coord = MatchCoordinator(window=3)
+    chelsea = coord.addTeam("Chelsea")
+    lg = coord.addLeague("premier-league")
+
+    coord.update()
+
+    assert chelsea.AwayScore == 0
+    assert len(lg.matches) == 1
+    requests = len(server.requests())
+
+    clock.day = "2026-10-19"
+    coord.update(force=True)
+
+    assert not chelsea
+    assert [m.HomeTeam for m in lg.matches] == ["Fulham"]
+    assert len(server.requests()) == requests
+
+    coord.update(force=True)
+    assert len(server.requests()) > requests
+
+
+def test_coordinator_requests_if_any_source_is_outside_window(server, clock):
+    server.events = fixtures()
+    coord = MatchCoordinator(window=2)
+    chelsea = coord.addTeam("Chelsea")
+
+    coord.update()
+    requests = len(server.requests())
+
+    # Chelsea's index only covers the 18th and 19th
+    clock.day = "2026-10-20"
+    coord.update(force=True)
+
+    assert not chelsea
+    assert len(server.requests()) > requests
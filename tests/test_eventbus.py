@@ -0,0 +1,59 @@
+from footballscores import EventBus, FootballMatch
+from footballscores.matchevent import MatchEvent
+from footballscores.stats import getMetrics
+
+from fakes import makeEvent, makeTeam
+
+
+def event(home=0, away=0):
+    return makeEvent("1", makeTeam("Arsenal", home), makeTeam("Chelsea", away))
+
+
+def test_repeated_events_for_a_match_are_coalesced():
+    batches = []
+    bus = EventBus(batches.append)
+    arsenal = FootballMatch("Arsenal", data=event(), on_goal=bus.post)
+    everton = object()
+
+    for score in range(1, 4):
+        arsenal.update(data=event(score))
+
+    bus.post(MatchEvent(MatchEvent.TYPE_GOAL, everton, home=False))
+    arsenal.update(data=event(3, 1))
+
+    assert len(bus) == 3
+    assert bus.flush() == 3
+    assert len(batches) == 1
+
+    # One event per match, type and side, in the order first posted
+    assert [(e.match, e.home) for e in batches[0]] == [(arsenal, True),
+                                                       (everton, False),
+                                                       (arsenal, False)]
+    assert getMetrics().counter("bus.coalesced") == 2
+
+    assert bus.flush() == 0
+    assert len(batches) == 1
+
+
+def test_latest_event_replaces_earlier_one():
+    bus = EventBus()
+    match = object()
+    first = MatchEvent(MatchEvent.TYPE_STATUS, match)
+    latest = MatchEvent(MatchEvent.TYPE_STATUS, match)
+    red = MatchEvent(MatchEvent.TYPE_RED_CARD, match, home=True)
+
+    for e in (first, red, latest):
+        bus.post(e)
+
+    assert bus.drain() == [latest, red]
+    assert len(bus) == 0
+
+
+def test_dispatch_is_given_the_handler():
+    dispatched = []
+    bus = EventBus(print, dispatch=lambda *args: dispatched.append(args))
+    goal = MatchEvent(MatchEvent.TYPE_GOAL, object(), home=True)
+    bus.post(goal)
+
+    assert bus.flush() == 1
+    assert dispatched == [(print, [goal])]
@@ -0,0 +1,164 @@
+from datetime import datetime, timezone
+import time
+
+import pytest
+
+from footballscores import (FixtureCalendar, FootballMatch, League,
+                            MatchCoordinator)
+from footballscores.dateindex import dateWindow
+from footballscores.exceptions import FSConnectionError
+from footballscores.stats import getMetrics
+
+from fakes import makeEvent, makeTeam
+
+HOUR = 60 * 60
+
+
+def kickingOff(key, home, away, offset):
+    '''A match kicking off offset seconds from now.'''
+    event = makeEvent(key, makeTeam(home), makeTeam(away),
+                      status="pre-event")
+    start = datetime.fromtimestamp(time.time() + offset, timezone.utc)
+    event["startTime"] = start.isoformat()
+    return event
+
+
+def hangUp(handler):
+    handler.close_connection = True
+
+
+@pytest.fixture
+def fixtures(server):
+    server.teampages.update(["liverpool", "arsenal"])
+    server.events = [kickingOff("1", "Liverpool", "Everton", 3 * HOUR),
+                     kickingOff("2", "Arsenal", "Chelsea", -HOUR)]
+    return server
+
+
+def teams(*names):
+    '''Returns a calendar and teams with their own pages.'''
+    sources = []
+
+    for name in names:
+        team = FootballMatch(name, data={})
+        team.hasTeamPage = True
+        team.myteampage = "team/" + name.lower()
+        sources.append(team)
+
+    return FixtureCalendar(), sources
+
+
+def test_refresh_uses_the_proxy(fixtures):
+    calendar, (liverpool, arsenal) = teams("Liverpool", "Arsenal")
+
+    assert calendar.refresh([liverpool, arsenal])
+
+    assert not calendar.isLive(liverpool)
+    assert calendar.isLive(arsenal)
+    assert calendar.nextKickOff()[1] is liverpool
+    assert not any(p.startswith("/p?") for p in fixtures.requests())
+
+    # Nothing more to fetch today
+    requests = len(fixtures.requests())
+    assert not calendar.refresh()
+    assert len(fixtures.requests()) == requests
+
+
+def test_teams_without_pages_share_a_request(fixtures):
+    calendar = FixtureCalendar()
+    coordinator = MatchCoordinator()
+    everton = coordinator.addTeam("Everton")
+    chelsea = coordinator.addTeam("Chelsea")
+    prem = League("premier-league", data=[])
+
+    groups = calendar.pending([everton, chelsea, prem])
+
+    assert [(page, len(s)) for page, s in groups] == [
+        ("tournament/premier-league", 1),
+        ("tournament/full-priority-order", 2)]
+
+    for page, sources in groups:
+        calendar.fetch(page, sources)
+
+    assert not calendar.isLive(everton)
+    assert calendar.isLive(chelsea)
+    assert calendar.isLive(prem)
+
+
+def test_failed_request_does_not_stop_the_others(fixtures):
+    fixtures.routes.append(("GET", "/team/liverpool/", hangUp))
+    calendar, (liverpool, arsenal) = teams("Liverpool", "Arsenal")
+
+    with pytest.raises(FSConnectionError):
+        calendar.refresh([liverpool, arsenal])
+
+    # Arsenal's match has finished by then but Liverpool's fixtures aren't
+    # known
+    later = time.time() + 3 * HOUR
+    assert not calendar.isLive(arsenal, later)
+    assert calendar.isLive(liverpool, later)
+
+
+def test_failed_request_waits_before_retrying(fixtures):
+    fixtures.routes.append(("GET", "/team/liverpool/", hangUp))
+    calendar, (liverpool,) = teams("Liverpool")
+
+    with pytest.raises(FSConnectionError):
+        calendar.refresh([liverpool])
+
+    # Treated as live until its fixtures are known
+    assert calendar.isLive(liverpool)
+    assert calendar.pending() == []
+
+    fixtures.routes = []
+    later = time.time() + calendar.retry_interval + 1
+    groups = calendar.pending(now=later)
+    assert groups == [("team/liverpool", [liverpool])]
+
+    calendar.fetch(*groups[0])
+    assert not calendar.isLive(liverpool)
+
+
+def test_force_retries_straight_away(fixtures):
+    fixtures.routes.append(("GET", "/team/liverpool/", hangUp))
+    calendar, (liverpool,) = teams("Liverpool")
+
+    with pytest.raises(FSConnectionError):
+        calendar.refresh([liverpool])
+
+    fixtures.routes = []
+    assert calendar.refresh(force=True)
+    assert not calendar.isLive(liverpool)
+
+
+def test_coordinator_fetches_on_worker_pool(fixtures):
+    calls = []
+
+    def slow(handler):
+        calls.append(handler.path)
+        fixtures.closed.wait(2)
+        hangUp(handler)
+
+    # Only the calendar asks for a week of fixtures
+    end = dateWindow(datetime.now().strftime("%Y-%m-%d"), 7)[1]
+    pattern = "endDate/{}/.*/team/liverpool/".format(end)
+    fixtures.routes.append(("GET", pattern, slow))
+
+    calendar = FixtureCalendar()
+    coordinator = MatchCoordinator(calendar=calendar, source_timeout=0.5)
+    liverpool = coordinator.addTeam("Liverpool")
+    arsenal = coordinator.addTeam("Arsenal")
+
+    started = time.time()
+    coordinator.update()
+
+    # The slow calendar request was given up on after source_timeout and
+    # the teams were still updated
+    assert time.time() - started < 1.5
+    assert getMetrics().counter("calendar.failures") == 1
+    assert liverpool and arsenal
+    assert not calendar.isLive(arsenal, time.time() + 3 * HOUR)
+
+    # The request still running isn't made again
+    coordinator.update(force=True)
+    assert len(calls) == 1
@@ -0,0 +1,138 @@
+import copy
+import json
+
+import pytest
+
+from footballscores import FootballMatch
+from footballscores.matchdict import MatchDict
+
+from fakes import makeAction, makeEvent, makeTeam
+
+
+def event(home=0, away=0, actions=None):
+    return makeEvent("1", makeTeam("Arsenal", home, actions),
+                     makeTeam("Chelsea", away, []))
+
+
+def test_properties():
+    match = FootballMatch("Arsenal", data=event(2, 1))
+
+    assert match
+    assert (match.HomeTeam, match.HomeScore) == ("Arsenal", 2)
+    assert (match.AwayTeam, match.AwayScore) == ("Chelsea", 1)
+    assert match.Competition == "Premier League"
+    assert match.isLive
+
+
+def test_unchanged_update_keeps_snapshot():
+    data = event()
+    match = FootballMatch("Arsenal", data=data)
+    snapshot = match.snapshot
+    revision = match.revision
+
+    assert match.update(data=copy.deepcopy(data))
+    assert match.update(data=data)
+
+    assert match.snapshot is snapshot
+    assert match.revision == revision
+
+
+def test_changed_update_swaps_snapshot():
+    goals = []
+    match = FootballMatch("Arsenal", data=event(), on_goal=goals.append)
+    snapshot = match.snapshot
+
+    match.update(data=event(1))
+
+    assert match.snapshot is not snapshot
+    assert match.HomeScore == 1
+    assert [(e.eventType, e.home) for e in goals] == [("GOAL", True)]
+
+    # The same data again doesn't fire the goal a second time
+    match.update(data=event(1))
+    assert len(goals) == 1
+
+
+def test_match_gives_dict_access():
+    scorer = makeAction("Bukayo Saka", "goal", 20)
+    match = FootballMatch("Arsenal", data=event(1, actions=[scorer]),
+                          keep_raw=True)
+
+    assert isinstance(match.match, MatchDict)
+    assert match.match.homeTeam.name.full == "Arsenal"
+    assert match.match["eventProgress"]["period"] == "FIRSTHALF"
+    assert match.match is match.match
+
+    match.update(data=event(2, actions=[scorer]))
+    assert match.match.homeTeam.scores.score == 2
+
+
+def test_match_empty_without_a_match():
+    match = FootballMatch("Arsenal", data={})
+
+    assert not match
+    assert not match.match
+
+
+def test_json_only_kept_with_keep_raw(tmp_path):
+    match = FootballMatch("Arsenal", data=event())
+
+    assert match.raw is None
+    assert not match.match
+    assert not any(isinstance(v, dict) and "eventKey" in v
+                   for v in vars(match).values())
+
+    with pytest.raises(ValueError):
+        match._dump(str(tmp_path / "match.json"))
+
+
+def test_dump(tmp_path):
+    data = event()
+    match = FootballMatch("Arsenal", data=data, keep_raw=True)
+    path = tmp_path / "match.json"
+
+    match._dump(str(path))
+
+    assert json.loads(path.read_text()) == data
+
+    # An unchanged update still keeps the latest JSON
+    data["comment"] = "Kick off delayed"
+    match.update(data=data)
+    assert match.raw["comment"] == "Kick off delayed"
+
+
+def playing(minutes, actions=None):
+    '''The match after minutes. Lightweight unless actions are given.'''
+    return makeEvent("1", makeTeam("Arsenal", 0, actions),
+                     makeTeam("Chelsea", 0, actions and []), minutes=minutes)
+
+
+def test_first_detail_after_lightweight_is_a_baseline():
+    reds = []
+    match = FootballMatch("Arsenal", detailed=False, on_red=reds.append,
+                          data=playing(10))
+    match.update(data=playing(30))
+
+    # The red card was given before the last update so isn't news
+    sent_off = makeAction("Declan Rice", "red-card", 25)
+    match.update(data=playing(31, actions=[sent_off]))
+
+    assert reds == []
+    assert match.HomeRedCards
+
+    # But one after it is
+    again = makeAction("Ben White", "red-card", 40)
+    match.update(data=playing(41, actions=[sent_off, again]))
+
+    assert [e.eventType for e in reds] == ["RED"]
+
+
+def test_red_in_first_detail_since_last_update_fires():
+    reds = []
+    match = FootballMatch("Arsenal", detailed=False, on_red=reds.append,
+                          data=playing(30))
+
+    sent_off = makeAction("Declan Rice", "red-card", 31)
+    match.update(data=playing(32, actions=[sent_off]))
+
+    assert len(reds) == 1
@@ -0,0 +1,77 @@
+import pytest
+
+from footballscores import FootballMatch
+from footballscores.formatter import compileTemplate
+
+from fakes import makeAction, makeEvent, makeTeam
+
+TEMPLATES = ["{H} {h}-{a} {A}",
+             "{H:>12} {h} - {a} {A:<12} ({T})",
+             "{S}: {C} at {v}",
+             "{G} | {g}",
+             "{R!r} {r!s}",
+             "{{H}} {H[0]}{A[0]}",
+             "No fields at all",
+             ""]
+
+
+def oldFormat(match, text):
+    '''formatText before templates were compiled.'''
+    values = {k[1]: getattr(match, v) for k, v in match.match_format.items()}
+    return text.format(**values)
+
+
+def outcome(func, *args):
+    '''The result, or the type of error raised.'''
+    try:
+        return func(*args)
+    except Exception as e:
+        return type(e)
+
+
+def matches():
+    home = makeTeam("Arsenal", 2, [
+        makeAction("Bukayo Saka", "goal", 20),
+        makeAction("Bukayo Saka", "goal", 45, added=2, penalty=True),
+        makeAction("Declan Rice", "red-card", 70)])
+    away = makeTeam("Chelsea", 1, [
+        makeAction("Cole Palmer", "goal", 60, own_goal=True)])
+
+    return [FootballMatch("Arsenal", data=makeEvent("1", home, away)),
+            FootballMatch("Everton", data=makeEvent(
+                "2", makeTeam("Everton"), makeTeam("Fulham"),
+                status="pre-event")),
+            FootballMatch("Arsenal", data={})]
+
+
+@pytest.mark.parametrize("text", TEMPLATES)
+def test_compiled_templates_match_old_format(text):
+    for match in matches():
+        assert (outcome(match.formatText, text) ==
+                outcome(oldFormat, match, text))
+
+
+def test_unknown_field_still_raises():
+    match = matches()[0]
+
+    with pytest.raises(KeyError):
+        match.formatText("{X}")
+
+
+def test_only_used_fields_are_read():
+    fields = FootballMatch("Arsenal", data={})._formatFields()
+    template = compileTemplate("{H.upper} {h[0]} {{G}}", fields)
+
+    assert dict(template.names) == {"H": "HomeTeam", "h": "HomeScore"}
+
+
+def test_rendered_text_follows_updates():
+    match = FootballMatch("Arsenal", data=makeEvent(
+        "1", makeTeam("Arsenal", 0), makeTeam("Chelsea", 0)))
+
+    assert match.formatText("{h}-{a}") == "0-0"
+
+    match.update(data=makeEvent("1", makeTeam("Arsenal", 1),
+                                makeTeam("Chelsea", 0)))
+
+    assert match.formatText("{h}-{a}") == "1-0"
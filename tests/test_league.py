@@ -0,0 +1,95 @@
+import copy
+
+import pytest
+
+from footballscores import League
+from footballscores.cache import getCache
+from footballscores.exceptions import FSConnectionError
+
+from fakes import makeEvent, makeTeam
+
+
+def events():
+    return [makeEvent("1", makeTeam("Arsenal", 0), makeTeam("Chelsea", 0)),
+            makeEvent("2", makeTeam("Everton", 1), makeTeam("Fulham", 1))]
+
+
+def test_matches_indexed_by_event_key():
+    league = League("Premier League", data=events())
+
+    assert len(league) == 2
+    assert [m.HomeTeam for m in league] == ["Arsenal", "Everton"]
+    assert set(league._index) == {"1", "2"}
+
+
+def test_unchanged_update_keeps_matches():
+    data = events()
+    league = League("Premier League", data=data)
+    matches = list(league.matches)
+
+    assert not league.update(data=copy.deepcopy(data))
+    assert all(a is b for a, b in zip(league.matches, matches))
+
+
+def test_update_adds_removes_and_changes_in_place():
+    goals = []
+    data = events()
+    league = League("Premier League", data=data, on_goal=goals.append)
+    arsenal = league[0]
+
+    data = copy.deepcopy(data)
+    data[0]["homeTeam"]["scores"]["score"] = 1
+    del data[1]
+    data.append(makeEvent("3", makeTeam("Burnley", 0),
+                          makeTeam("Wolves", 0)))
+
+    added, removed, changed = league._update(data)
+
+    assert (added, removed, changed) == (["3"], ["2"], ["1"])
+    assert league[0] is arsenal
+    assert arsenal.HomeScore == 1
+    assert [m.HomeTeam for m in league] == ["Arsenal", "Burnley"]
+    assert [(e.eventType, e.home) for e in goals] == [("GOAL", True)]
+
+
+def test_match_order_follows_events():
+    data = events()
+    league = League("Premier League", data=data)
+
+    league.update(data=list(reversed(copy.deepcopy(data))))
+
+    assert [m.HomeTeam for m in league] == ["Everton", "Arsenal"]
+
+
+def test_event_without_key_uses_home_abbreviation():
+    data = events()
+    del data[0]["eventKey"]
+    league = League("Premier League", data=data)
+
+    assert set(league._index) == {"ARS", "2"}
+
+
+def test_league_requests_its_own_data(server):
+    server.events = events() + [
+        makeEvent("3", makeTeam("Celtic", 2), makeTeam("Rangers", 0),
+                  slug="scottish-premiership")]
+
+    league = League("Premier League")
+
+    assert [m.HomeTeam for m in league] == ["Arsenal", "Everton"]
+    assert all("/tournament/premier-league/" in p
+               for p in server.requests())
+
+
+def test_error_response_keeps_matches(server):
+    server.events = events()
+    league = League("Premier League")
+
+    server.routes.append(("GET", "/tournament/premier-league/",
+                          lambda h: h.sendJSON({}, status=500)))
+    getCache().clear()
+
+    with pytest.raises(FSConnectionError):
+        league.update()
+
+    assert [m.HomeTeam for m in league] == ["Arsenal", "Everton"]
@@ -0,0 +1,133 @@
+import copy
+
+from footballscores import matchdict
+from footballscores.matchdict import MISSING, MatchDelta, MatchDict, diff
+
+from fakes import makeAction, makeEvent, makeTeam
+
+
+def event():
+    return makeEvent("1", makeTeam("Arsenal", 0, []),
+                     makeTeam("Chelsea", 0, []))
+
+
+def test_attribute_access():
+    match = MatchDict(event())
+
+    assert match.homeTeam.name.full == "Arsenal"
+    assert match.eventProgress.period == "FIRSTHALF"
+    assert match.notAKey is None
+
+
+def test_diff_lists_only_changed_values():
+    old = event()
+    new = copy.deepcopy(old)
+    new["homeTeam"]["scores"]["score"] = 1
+    new["minutesElapsed"] = 11
+
+    changes = {c.path: (c.old, c.new) for c in diff(old, new)}
+
+    assert changes == {("homeTeam", "scores", "score"): (0, 1),
+                       ("minutesElapsed",): (10, 11)}
+
+
+def test_diff_added_and_removed_keys():
+    old = {"a": 1, "b": {"c": 2}}
+    new = {"b": {"d": 3}}
+
+    changes = {c.path: (c.old, c.new) for c in diff(old, new)}
+
+    assert changes == {("a",): (1, MISSING),
+                       ("b", "c"): (2, MISSING),
+                       ("b", "d"): (MISSING, 3)}
+
+
+def test_delta_value():
+    delta = MatchDelta(("homeTeam", "scores"), {"score": 0}, {"score": 1})
+
+    assert delta.value(("homeTeam", "scores", "score")) == (0, 1)
+    assert delta.value(("homeTeam",)) == (MISSING, MISSING)
+    assert delta.value(("awayTeam", "scores")) is None
+
+
+def test_update_applies_changes_in_place():
+    match = MatchDict(event())
+    away = match.awayTeam
+    new = event()
+    new["homeTeam"]["scores"]["score"] = 2
+
+    changes = match.update(new)
+
+    assert [c.path for c in changes] == [("homeTeam", "scores", "score")]
+    assert match.homeTeam.scores.score == 2
+    # Parts of the match which didn't change are the same objects
+    assert match.awayTeam is away
+
+
+def test_update_with_no_changes():
+    match = MatchDict(event())
+
+    assert match.update(event()) == []
+
+
+def test_callbacks_receive_grouped_changes():
+    calls = []
+    match = MatchDict(event(), add_callbacks=True)
+    match.add_callback("homeTeam", lambda v, c: calls.append((v, c)))
+
+    new = event()
+    new["homeTeam"]["scores"]["score"] = 1
+    new["homeTeam"]["playerActions"] = [makeAction("Bukayo Saka", "goal",
+                                                   20)]
+    match.update(new)
+
+    assert len(calls) == 1
+    value, changes = calls[0]
+    assert value is match.homeTeam
+    assert {c.path for c in changes} == {("homeTeam", "scores", "score"),
+                                         ("homeTeam", "playerActions")}
+
+
+def test_callbacks_not_run_for_new_values():
+    calls = []
+    match = MatchDict({"a": None}, add_callbacks=True)
+    match.add_callback("a", lambda v, c: calls.append(v))
+
+    match.update({"a": 1})
+    match.update({"a": 2})
+
+    assert calls == [2]
+
+
+def test_remove_callback():
+    calls = []
+    match = MatchDict(event(), add_callbacks=True)
+    match.add_callback("minutesElapsed", calls.append)
+    match.remove_callback("minutesElapsed", calls.append)
+
+    match.update({"minutesElapsed": 20})
+
+    assert calls == []
+
+
+def test_one_argument_callbacks_get_the_value():
+    calls = []
+
+    def onMinutes(value):
+        calls.append(value)
+
+    match = MatchDict(event(), add_callbacks=True)
+    match.add_callback("minutesElapsed", onMinutes)
+    match.add_callback("minutesElapsed", calls.append)
+
+    match.update({"minutesElapsed": 20})
+
+    assert calls == [20, 20]
+
+
+def test_unchanged_update_skips_the_diff(monkeypatch):
+    match = MatchDict(event(), add_callbacks=True)
+    monkeypatch.setattr(matchdict, "diff", None)
+
+    assert match.update(event()) == []
+    assert match.update({"minutesElapsed": 10}) == []
@@ -0,0 +1,74 @@
+from footballscores import FootballMatch
+from footballscores.playeraction import ActionIndex
+from footballscores.snapshot import MatchSnapshot, _actionRecords
+
+from fakes import makeAction, makeEvent, makeTeam
+
+
+def index(*actions):
+    return ActionIndex(_actionRecords(actions))
+
+
+def names(actions):
+    return [a.FullName for a in actions]
+
+
+def test_actions_grouped_by_type_in_time_order():
+    idx = index(makeAction("Cole Palmer", "goal", 60),
+                makeAction("Cole Palmer", "goal", 45, added=2),
+                makeAction("Reece James", "yellow-card", 30),
+                makeAction("Nicolas Jackson", "goal", 45))
+
+    assert [(a.ElapsedTime, a.AddedTime) for a in idx.get("goal")] == [
+        (45, 0), (45, 2), (60, 0)]
+    assert names(idx.get("yellow-card")) == ["Reece James"]
+    assert idx.get("red-card") == ()
+    assert idx.last("goal").ElapsedTime == 60
+    assert idx.last("red-card") is None
+
+
+def test_reds_include_second_bookings():
+    idx = index(makeAction("Declan Rice", "yellow-red-card", 70),
+                makeAction("Ben White", "red-card", 20),
+                makeAction("Bukayo Saka", "yellow-card", 10))
+
+    assert names(idx.reds) == ["Ben White", "Declan Rice"]
+    assert idx.lastRed.isSecondBooking
+    assert index().lastRed is None
+
+
+def test_index_shared_while_actions_unchanged():
+    home = makeTeam("Arsenal", 1, [makeAction("Bukayo Saka", "goal", 20)])
+    first = MatchSnapshot(makeEvent("1", home, makeTeam("Chelsea", 0, [])))
+    built = first.homeTeam.index
+    second = MatchSnapshot(makeEvent("1", home, makeTeam("Chelsea", 0, [])),
+                           previous=first)
+
+    assert second.homeTeam.index is built
+
+
+def test_red_card_lookups():
+    home = makeTeam("Arsenal", 0, [
+        makeAction("Declan Rice", "red-card", 30),
+        makeAction("Ben White", "yellow-red-card", 80)])
+    away = makeTeam("Chelsea", 0, [
+        makeAction("Reece James", "red-card", 60)])
+    match = FootballMatch("Arsenal", data=makeEvent("1", home, away))
+
+    assert names(match.HomeRedCards) == ["Declan Rice", "Ben White"]
+    assert names(match.AwayRedCards) == ["Reece James"]
+    assert match.LastHomeRedCard.FullName == "Ben White"
+    assert match.LastAwayRedCard.FullName == "Reece James"
+    assert match.LastRedCard.FullName == "Ben White"
+
+
+def test_red_card_lookups_without_reds():
+    match = FootballMatch("Arsenal", data=makeEvent(
+        "1", makeTeam("Arsenal", 0, []), makeTeam("Chelsea", 0, [])))
+
+    assert match.HomeRedCards == [] and match.AwayRedCards == []
+    assert match.LastRedCard is None
+
+    empty = FootballMatch("Arsenal", data={})
+    assert empty.HomeRedCards == []
+    assert empty.LastRedCard == ""
@@ -0,0 +1,176 @@
+import json
+import logging
+
+import pytest
+
+from footballscores import FootballMatch, PushClient
+from footballscores.push import MomentParser, topicKey
+
+from fakes import (PushStreams, makeEvent, makeMoment, makePayload, makeTeam,
+                   waitFor)
+
+
+def payload(home=0):
+    event = makeEvent("1", makeTeam("Arsenal", home),
+                      makeTeam("Atlético Madrid", 0))
+    return makePayload([event])
+
+
+def encode(*moments):
+    return json.dumps({"moments": list(moments)},
+                      ensure_ascii=False).encode("utf-8")
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture
+def client():
+    clients = []
+
+    def make(*sources, **kwargs):
+        kwargs.setdefault("idle_timeout", 5)
+        c = PushClient(sources, **kwargs)
+        clients.append(c)
+        return c
+
+    yield make
+
+    for c in clients:
+        c.stop(5)
+
+
+def test_topic_key():
+    assert topicKey("morph://data/x") == topicKey("/data/x") == "/data/x"
+
+
+def test_parser_handles_any_split():
+    moments = [makeMoment("/a", {"n": i, "name": "Atlético"})
+               for i in range(3)]
+    data = encode(*moments[:2]) + json.dumps(moments[2]).encode()
+
+    for size in (1, 2, 7, len(data)):
+        parser = MomentParser()
+        found = []
+
+        for chunk in split(data, size):
+            found += parser.feed(chunk)
+
+        assert found == moments
+
+
+def test_parser_handles_arrays():
+    moments = [makeMoment("/a", {"n": i}) for i in range(2)]
+
+    assert MomentParser().feed(json.dumps(moments)) == moments
+
+
+def test_parser_gives_up_on_oversized_moment(monkeypatch):
+    from footballscores import push
+    monkeypatch.setattr(push, "MAX_BUFFER", 10)
+
+    with pytest.raises(ValueError):
+        MomentParser().feed('{"topic": "/a", "payload": "' + "x" * 20)
+
+
+def test_moments_split_across_chunks(server, client):
+    arsenal = FootballMatch("Arsenal", data={})
+    push = client(arsenal)
+    data = encode(makeMoment(push.topicFor(arsenal), payload(1)))
+    server.routes.append(("GET", r"^/p\?",
+                          PushStreams([split(data, 5)], hold=5)))
+
+    push.start()
+
+    assert waitFor(lambda: arsenal.HomeScore == 1)
+    assert arsenal.AwayTeam == "Atlético Madrid"
+
+
+def test_repeated_moments_ignored(server, client):
+    goals = []
+    arsenal = FootballMatch("Arsenal", data={}, on_goal=goals.append)
+    push = client(arsenal, events_on_first_run=True)
+    topic = push.topicFor(arsenal)
+    moments = [makeMoment(topic, payload(n)) for n in (0, 1, 1)]
+    server.routes.append(("GET", r"^/p\?",
+                          PushStreams([[encode(m) for m in moments]],
+                                      hold=5)))
+
+    push.start()
+
+    assert waitFor(lambda: arsenal.HomeScore == 1)
+    assert waitFor(lambda: push.moments == 2)
+    assert len(goals) == 1
+
+
+def test_reconnects_and_ignores_resent_state(server, client):
+    goals = []
+    arsenal = FootballMatch("Arsenal", data={}, on_goal=goals.append)
+    push = client(arsenal)
+    topic = push.topicFor(arsenal)
+    first = encode(makeMoment(topic, payload(1)))
+    second = encode(makeMoment(topic, payload(2)))
+    # The first stream ends straight away. The second resends the state
+    # before the next goal.
+    streams = PushStreams([[first], [first, second]], hold=0.2)
+    server.routes.append(("GET", r"^/p\?", streams))
+
+    push.start()
+
+    assert waitFor(lambda: arsenal.HomeScore == 2)
+    assert streams.connections >= 2
+    assert push.reconnects >= 1
+    assert push.moments == 2
+    assert len(goals) == 1
+
+
+def test_bad_moment_logged_and_skipped(server, client, caplog):
+    arsenal = FootballMatch("Arsenal", data={})
+    push = client(arsenal)
+    topic = push.topicFor(arsenal)
+    bad = makeMoment(topic, {"matchData": [{"tournamentDatesWithEvents":
+                                            {"2026-10-18": [{}]}}]})
+    good = makeMoment(topic, payload(1))
+    server.routes.append(("GET", r"^/p\?",
+                          PushStreams([[encode(bad), encode(good)]],
+                                      hold=5)))
+
+    with caplog.at_level(logging.ERROR, logger="footballscores.push"):
+        push.start()
+        assert waitFor(lambda: arsenal.HomeScore == 1)
+
+    assert push._thread.is_alive()
+    assert "Unable to apply moment" in caplog.text
+
+
+def test_stop_closes_stream(server, client, caplog):
+    arsenal = FootballMatch("Arsenal", data={})
+    push = client(arsenal)
+    streams = PushStreams([[b" "]], hold=10)
+    server.routes.append(("GET", r"^/p\?", streams))
+
+    with caplog.at_level(logging.ERROR, logger="footballscores.push"):
+        push.start()
+        assert waitFor(lambda: streams.connections == 1)
+        assert waitFor(lambda: push._response is not None)
+        thread = push._thread
+        push.stop(5)
+
+    assert not thread.is_alive()
+    assert caplog.text == ""
+
+
+def test_subscribing_reopens_stream(server, client):
+    arsenal = FootballMatch("Arsenal", data={})
+    push = client(arsenal)
+    streams = PushStreams([[b" "]], hold=10)
+    server.routes.append(("GET", r"^/p\?", streams))
+
+    push.start()
+    assert waitFor(lambda: push._response is not None)
+
+    push.subscribe(FootballMatch("Chelsea", data={}, matchdate="2026-10-19"))
+
+    assert waitFor(lambda: streams.connections == 2, timeout=2)
+    assert server.requests()[-1].count("t=") == 2
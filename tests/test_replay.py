@@ -0,0 +1,61 @@
+import pytest
+
+from footballscores import replay
+from footballscores.session import getPool
+
+from fakes import sendChunked
+
+
+def test_usage_names_the_module(capsys):
+    with pytest.raises(SystemExit):
+        replay.main(["--help"])
+
+    usage = capsys.readouterr().out
+    assert usage.startswith(
+        "usage: python -m livefootballscores.footballscores.replay")
+
+
+
+def chunks(handler):
+    sendChunked(handler, [b'{"moments": [', b'{"topic": "a"}', b"]}"])
+
+
+def test_streams_are_recorded_and_replayed_chunked(server, tmp_path):
+    server.routes.append(("GET", "/stream", chunks))
+    path = str(tmp_path / "archive.jsonl.gz")
+    pool = getPool()
+
+    replay.startRecording(path)
+    try:
+        r = pool.get(server.url + "/stream", stream=True)
+        body = b"".join(r.iter_content(chunk_size=None))
+        r.close()
+
+        # Read from the raw body, as ijson does, and stop early
+        r = pool.get(server.url + "/stream/raw", stream=True)
+        r.raw.decode_content = True
+        start = r.raw.read(5)
+        r.close()
+    finally:
+        replay.stopRecording()
+
+    assert body == b'{"moments": [{"topic": "a"}]}'
+
+    archive = replay.ReplayArchive(path)
+    recorded = {k: archive.lookup(m, k, archive.end)
+                for m, k in archive.requests}
+
+    assert [(r["b"], r["c"]) for r in recorded.values()] == [
+        (body.decode(), 1), (start.decode(), 1)]
+
+    player = replay.ReplayServer(archive).start()
+    replay.replayThrough(player)
+    try:
+        r = pool.get(server.url + "/stream", stream=True)
+
+        assert r.headers["Transfer-Encoding"] == "chunked"
+        assert b"".join(r.iter_content(chunk_size=None)) == body
+        r.close()
+    finally:
+        replay.replayThrough(None)
+        player.stop()
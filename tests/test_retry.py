@@ -0,0 +1,116 @@
+import time
+
+import pytest
+import requests
+
+from footballscores import retry
+from footballscores.base import matchcommon
+from footballscores.exceptions import FSCircuitOpenError
+from footballscores.retry import CircuitBreaker, RetryPolicy
+from footballscores.session import getPool
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05,
+                             max_reset_timeout=0.2)
+    monkeypatch.setattr(retry, "BREAKER", breaker)
+    return breaker
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.recordFailure()
+
+
+def test_delay_within_limits():
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+
+    assert all(0 <= policy.delay(a) <= min(5, 2 ** a) for a in range(6))
+
+
+def test_retries_limited_by_kind_and_budget():
+    policy = RetryPolicy(max_retries={RetryPolicy.TIMEOUT: 3}, budget=2)
+
+    assert policy.shouldRetry(RetryPolicy.TIMEOUT, 0)
+    assert not policy.shouldRetry(RetryPolicy.TIMEOUT, 3)
+    assert policy.shouldRetry(RetryPolicy.TIMEOUT, 1)
+    # The budget of two retries has been used
+    assert not policy.shouldRetry(RetryPolicy.TIMEOUT, 2)
+
+
+def test_breaker_opens_after_threshold(breaker):
+    breaker.recordFailure()
+    assert breaker.allow()
+
+    breaker.recordFailure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_allows_one_probe(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.recordSuccess()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_opens_for_longer(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.recordFailure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert 0.05 < breaker.retryAfter <= 0.1
+
+
+def test_lost_probe_given_up_on(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    # The probe never reports back
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.ChunkedEncodingError,
+                                   requests.exceptions.TooManyRedirects,
+                                   requests.exceptions.ContentDecodingError])
+def test_probe_failing_with_other_errors_reopens(breaker, monkeypatch, error):
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(getPool(), "request", fail)
+    trip(breaker)
+    time.sleep(0.06)
+
+    with pytest.raises(error):
+        matchcommon()._send("GET", "http://127.0.0.1:9/")
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(FSCircuitOpenError):
+        matchcommon()._send("GET", "http://127.0.0.1:9/")
+
+    time.sleep(0.11)
+    assert breaker.allow()
+
+
+def test_server_errors_count_as_failures(breaker, server):
+    server.routes.append(("GET", "/broken",
+                          lambda h: h.sendJSON({}, status=503)))
+    common = matchcommon()
+
+    for _ in range(2):
+        assert common._send("GET", server.url + "/broken").status_code == 503
+
+    with pytest.raises(FSCircuitOpenError):
+        common._send("GET", server.url + "/broken")
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from footballscores.session import HTTPPool
+
+
+@pytest.fixture
+def pool():
+    pool = HTTPPool()
+    yield pool
+    pool.close()
+
+
+def test_one_session_per_thread_sharing_one_adapter(pool):
+    sessions = []
+
+    def grab():
+        sessions.append(pool._session())
+
+    threads = [threading.Thread(target=grab) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    grab()
+    grab()
+
+    # The main thread keeps its session
+    assert sessions[-1] is sessions[-2]
+    assert len(set(id(s) for s in sessions)) == 4
+
+    adapters = set(id(s.get_adapter("http://example.com"))
+                   for s in sessions)
+    assert adapters == {id(pool._adapter)}
+
+
+def test_connections_are_reused(pool, server):
+    for _ in range(3):
+        assert pool.get(server.url + "/teams/arsenal").status_code == 200
+
+    assert pool.stats == {"requests": 3, "opened": 1, "reused": 2}
+
+
+def test_without_keep_alive_each_request_connects(server):
+    pool = HTTPPool(keep_alive=False)
+
+    for _ in range(2):
+        pool.get(server.url + "/teams/arsenal")
+
+    assert pool.stats["opened"] == 2
+    pool.close()
+
+
+def test_configure_rebuilds_sessions(pool, server):
+    session = pool._session()
+    pool.configure(read_timeout=1)
+
+    assert pool._session() is not session
+    assert pool.timeout == (pool.connect_timeout, 1)
+
+    pool.get(server.url + "/teams/arsenal")
+    assert pool.stats["requests"] == 1
+
+
+def test_rewrite_and_recorder(pool, server):
+    recorded = []
+
+    class Recorder(object):
+        def record(self, method, url, status, headers, body, elapsed):
+            recorded.append((method, url, status))
+
+    pool.rewrite = lambda url: url.replace("http://bbc", server.url)
+    pool.recorder = Recorder()
+
+    pool.get("http://bbc/teams/arsenal")
+
+    assert server.requests() == ["/teams/arsenal"]
+    assert recorded == [("GET", server.url + "/teams/arsenal", 200)]
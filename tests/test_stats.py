@@ -0,0 +1,80 @@
+from footballscores import FootballMatch
+from footballscores.stats import (Histogram, Metrics, endpointName,
+                                  getMetrics, getStats, resetStats)
+
+from fakes import makeEvent, makeTeam
+
+
+def test_endpoint_names():
+    morph = ("http://push.api.bbci.co.uk/proxy/data/"
+             "bbc-morph-football-scores-match-list-data/version/2.4.0")
+    push = ("http://push.api.bbci.co.uk/p?t=morph%3A%2F%2Fdata%2F"
+            "bbc-morph-sport-teams-competitions-list%2Fversion%2F1&c=1")
+
+    assert endpointName(morph) == "morph:football-scores-match-list-data"
+    assert endpointName(push) == "push:sport-teams-competitions-list"
+    assert endpointName("http://push.api.bbci.co.uk/p?t=x") == "push:unknown"
+    assert endpointName(
+        "https://www.bbc.co.uk/sport/football/teams/arsenal") == "teampage"
+    assert endpointName("http://example.com/other") == "example.com"
+
+
+def test_histogram():
+    hist = Histogram(bounds=(1, 2, 5))
+
+    assert hist.percentile(50) is None
+
+    for value in (0.5, 1.5, 1.5, 10):
+        hist.add(value)
+
+    stats = hist.asDict()
+
+    assert stats["buckets"] == {"1": 1, "2": 2, "5": 0, "inf": 1}
+    assert (stats["count"], stats["min"], stats["max"]) == (4, 0.5, 10)
+    assert stats["mean"] == 13.5 / 4
+    # Percentiles are the upper bound of their bucket
+    assert (stats["p50"], stats["p95"]) == (2, 10)
+
+
+def test_metrics():
+    metrics = Metrics()
+    metrics.incr("requests")
+    metrics.incr("requests", 2)
+
+    with metrics.timer("update"):
+        pass
+
+    assert metrics.counter("requests") == 3
+    assert metrics.counter("missing") == 0
+    assert metrics.asDict()["timings"]["update"]["count"] == 1
+
+    metrics.enabled = False
+    metrics.incr("requests")
+    metrics.observe("update", 1)
+
+    assert metrics.counter("requests") == 3
+    assert metrics.asDict()["timings"]["update"]["count"] == 1
+
+    metrics.reset()
+    assert metrics.asDict()["counters"] == {}
+
+
+def test_stats_follow_requests(server):
+    server.events = [makeEvent("1", makeTeam("Arsenal", 1),
+                               makeTeam("Chelsea", 0))]
+    FootballMatch("Arsenal", data=None)
+
+    stats = getStats()
+    endpoint = "morph:football-scores-match-list-data"
+
+    assert set(stats) == {"since", "counters", "timings", "pool", "cache",
+                          "breaker"}
+    assert stats["counters"]["requests." + endpoint] == 1
+    assert stats["counters"]["bytes." + endpoint] > 0
+    assert stats["timings"]["request." + endpoint]["count"] == 1
+    assert stats["cache"]["misses"] == 1
+    assert stats["breaker"]["state"] == "closed"
+    assert stats["pool"]["requests"] >= 1
+
+    resetStats()
+    assert getMetrics().counter("requests." + endpoint) == 0
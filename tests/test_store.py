@@ -0,0 +1,48 @@
+from footballscores.store import PersistentStore
+
+
+def test_values_kept_on_disk(tmp_path):
+    path = str(tmp_path / "store.json")
+    PersistentStore(path).set("teampage:arsenal", True, 60)
+
+    assert PersistentStore(path).get("teampage:arsenal") is True
+
+
+def test_expired_values_not_returned(tmp_path):
+    store = PersistentStore(str(tmp_path / "store.json"))
+    store.set("catalogue", [1, 2], -1)
+
+    assert store.get("catalogue", "missing") == "missing"
+
+
+def test_changes_from_another_store_picked_up(tmp_path):
+    path = str(tmp_path / "store.json")
+    first = PersistentStore(path)
+    second = PersistentStore(path)
+
+    first.set("a", 1, 60)
+    assert second.get("a") == 1
+
+    second.set("b", 2, 60)
+    assert first.get("a") == 1
+    assert first.get("b") == 2
+
+
+def test_unwritable_store_keeps_values_in_memory(tmp_path):
+    # The store's directory can't be created under a file
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    store = PersistentStore(str(blocker / "store.json"))
+
+    store.set("teampage:arsenal", True, 60)
+
+    assert store.get("teampage:arsenal") is True
+    assert store.get("teampage:arsenal") is True
+
+
+def test_clear(tmp_path):
+    store = PersistentStore(str(tmp_path / "store.json"))
+    store.set("a", 1, 60)
+    store.clear()
+
+    assert store.get("a") is None
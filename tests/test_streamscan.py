@@ -0,0 +1,146 @@
+import io
+import json
+import random
+
+import pytest
+
+from footballscores import FootballMatch, MatchCoordinator
+from footballscores import streamscan
+from footballscores.base import iterDatedEvents
+from footballscores.exceptions import FSConnectionError
+from footballscores.stats import getMetrics
+
+from fakes import makeAction, makeEvent, makePayload, makeTeam
+
+
+class ChunkedResponse(object):
+    '''Stands in for a streaming requests response, returning the body in
+    chunks of random sizes.'''
+    def __init__(self, body, seed=0):
+        self.body = body
+        self.raw = io.BytesIO(body)
+        self._random = random.Random(seed)
+
+    def iter_content(self, chunk_size=None):
+        pos = 0
+
+        while pos < len(self.body):
+            size = self._random.randint(1, 2000)
+            yield self.body[pos:pos + size]
+            pos += size
+
+
+def awkwardPayload():
+    '''Names with braces, quotes, escapes, non-ASCII characters and the
+    keys the scanner looks for.'''
+    events = []
+
+    for i in range(200):
+        home = makeTeam('Home {}"events": [{{'.format(i), 1,
+                        [makeAction("Pl\\ayer ]}} " + str(i), "goal", 5)])
+        away = makeTeam(u"Atlético \"2026-10-19\": [ {}".format(i), 0)
+        events.append(makeEvent(str(i), home, away,
+                                slug="comp-{}".format(i % 7),
+                                date="2026-10-{}".format(18 + i % 3)))
+
+    return makePayload(events)
+
+
+@pytest.fixture
+def textScan(monkeypatch):
+    monkeypatch.setattr(streamscan, "HAS_IJSON", False)
+
+
+@pytest.mark.parametrize("ascii", [True, False])
+def test_random_chunks_match_full_decode(textScan, ascii):
+    payload = awkwardPayload()
+    expected = list(iterDatedEvents(payload))
+    body = json.dumps(payload, ensure_ascii=ascii, indent=None if ascii else 1)
+
+    for seed in range(20):
+        response = ChunkedResponse(body.encode("utf-8"), seed)
+        assert list(streamscan.iterStreamedEvents(response)) == expected
+
+    assert getMetrics().counter("stream_scan.decoded") == 20 * len(expected)
+
+
+def test_ijson_matches_full_decode(monkeypatch):
+    ijson = pytest.importorskip("ijson")
+    monkeypatch.setattr(streamscan, "HAS_IJSON", True)
+    monkeypatch.setattr(streamscan, "ijson", ijson, raising=False)
+
+    payload = awkwardPayload()
+    response = ChunkedResponse(json.dumps(payload).encode("utf-8"))
+
+    assert (list(streamscan.iterStreamedEvents(response)) ==
+            list(iterDatedEvents(payload)))
+
+
+def test_undecodable_response(textScan, monkeypatch):
+    monkeypatch.setattr(streamscan, "MAX_BUFFER", 100)
+    body = b'{"matchData": [{"events": [{"eventKey": "' + b"x" * 500
+
+    with pytest.raises(ValueError):
+        list(streamscan.iterStreamedEvents(ChunkedResponse(body)))
+
+
+def busyDay(server, first):
+    '''Puts first at the top of a long list of matches.'''
+    server.events = [first] + [
+        makeEvent(str(i), makeTeam("Home {}".format(i)),
+                  makeTeam("Away {}".format(i)), slug="comp-{}".format(i))
+        for i in range(2000)]
+
+
+def cutOff(handler):
+    '''Sends part of a chunked response and then hangs up.'''
+    handler.send_response(200)
+    handler.send_header("Transfer-Encoding", "chunked")
+    handler.end_headers()
+    chunk = b'{"matchData": [{"tournamentDatesWithEvents": {"2026-10-18": ['
+    handler.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+    handler.wfile.write(b"ff\r\n{")
+    handler.close_connection = True
+
+
+def test_team_stops_reading_once_found(server, textScan):
+    busyDay(server, makeEvent("1", makeTeam("Everton", 2),
+                              makeTeam("Fulham", 1)))
+    everton = FootballMatch("Everton", stream_scan=True)
+
+    assert everton.HomeScore == 2
+    assert getMetrics().counter("stream_scan.early_stop") == 1
+    assert getMetrics().counter("stream_scan.decoded") < 100
+
+
+def test_coordinator_stops_reading_once_found(server, textScan):
+    busyDay(server, makeEvent("1", makeTeam("Everton", 2),
+                              makeTeam("Fulham", 1)))
+    coordinator = MatchCoordinator(stream_scan=True)
+    everton = coordinator.addTeam("Everton")
+    fulham = coordinator.addTeam("Fulham")
+
+    coordinator.update()
+
+    assert everton.HomeScore == 2 and fulham.AwayScore == 1
+    assert getMetrics().counter("stream_scan.early_stop") == 1
+    assert getMetrics().counter("stream_scan.decoded") < 100
+
+
+def test_cut_off_response_is_a_connection_error(server):
+    server.routes.append(("GET", "full-priority-order", cutOff))
+    everton = FootballMatch("Everton", data={}, stream_scan=True)
+
+    with pytest.raises(FSConnectionError):
+        everton.update()
+
+
+def test_coordinator_cut_off_response_is_a_connection_error(server):
+    server.routes.append(("GET", "full-priority-order", cutOff))
+    coordinator = MatchCoordinator(stream_scan=True)
+    everton = coordinator.addTeam("Everton")
+
+    with pytest.raises(FSConnectionError):
+        coordinator.update()
+
+    assert coordinator.isStale(everton)
@@ -0,0 +1,159 @@
+from footballscores import FootballMatch
+from footballscores.snapshot import _actionRecords
+from footballscores.timeline import Timeline, TimelineEvent
+
+from fakes import makeAction, makeEvent, makeTeam
+
+
+def records(*actions):
+    return _actionRecords(actions)
+
+
+def kinds(timeline):
+    return [(e.eventType, e.period or e.action._fullname) for e in timeline]
+
+
+def test_new_actions_are_added_once():
+    timeline = Timeline()
+    goal = makeAction("Bukayo Saka", "goal", 20)
+
+    assert len(timeline.addActions(True, records(goal))) == 1
+    assert timeline.addActions(True, records(goal)) == []
+
+    card = makeAction("Declan Rice", "red-card", 30)
+    new = timeline.addActions(True, records(goal, card))
+
+    assert [e.eventType for e in new] == [TimelineEvent.TYPE_RED_CARD]
+    assert len(timeline) == 2
+
+
+def test_display_time_correction_is_appended():
+    timeline = Timeline()
+    goal, = timeline.addActions(True, records(
+        makeAction("Bukayo Saka", "goal", 45, display="45'")))
+    corrected = makeAction("Bukayo Saka", "goal", 45, display="45'+2'")
+
+    correction, = timeline.addActions(True, records(corrected))
+
+    assert correction.corrects == goal.seq
+    assert correction.action._actiondisplaytime == "45'+2'"
+    assert list(timeline) == [goal, correction]
+    assert timeline.addActions(True, records(corrected)) == []
+
+
+def test_name_correction_is_appended():
+    timeline = Timeline()
+    goal, = timeline.addActions(
+        True, records(makeAction("Bukayo Sak", "goal", 20)))
+
+    correction, = timeline.addActions(
+        True, records(makeAction("Bukayo Saka", "goal", 20)))
+
+    assert kinds(timeline) == [("goal", "Bukayo Sak"),
+                               ("goal", "Bukayo Saka")]
+    assert correction.corrects == goal.seq
+    assert goal.action._fullname == "Bukayo Sak"
+
+
+def test_time_correction_is_appended():
+    timeline = Timeline()
+    goal, = timeline.addActions(
+        True, records(makeAction("Bukayo Saka", "goal", 44)))
+    timeline.addPeriod("HALFTIME")
+
+    # The goal was given in added time at the end of the first half
+    correction, = timeline.addActions(
+        True, records(makeAction("Bukayo Saka", "goal", 45, added=2)))
+
+    assert kinds(timeline) == [("goal", "Bukayo Saka"),
+                               ("period", "HALFTIME"),
+                               ("goal", "Bukayo Saka")]
+    assert correction.corrects == goal.seq
+    assert correction.action._actionaddedtime == 2
+    assert goal.action._actiontime == 44
+
+    # Later corrections replace the latest event
+    again, = timeline.addActions(
+        True, records(makeAction("Bukayo Saka", "goal", 45, added=3)))
+    assert again.corrects == correction.seq
+
+
+def test_flag_correction_changes_the_type():
+    timeline = Timeline()
+    timeline.addActions(True, records(makeAction("Bukayo Saka", "goal", 20)))
+    timeline.addActions(True, records(makeAction("Bukayo Saka", "goal", 20,
+                                                 penalty=True)))
+
+    assert kinds(timeline) == [("goal", "Bukayo Saka"),
+                               ("penalty", "Bukayo Saka")]
+
+
+def test_same_player_later_is_new():
+    timeline = Timeline()
+    first = makeAction("Bukayo Saka", "goal", 20)
+    timeline.addActions(True, records(first))
+
+    second = makeAction("Bukayo Saka", "goal", 60)
+    assert len(timeline.addActions(True, records(first, second))) == 1
+
+
+def test_late_goals_are_appended():
+    timeline = Timeline()
+    timeline.addPeriod("HALFTIME")
+    timeline.addPeriod("SECONDHALF")
+    last = timeline.seq
+
+    late = timeline.addActions(False, records(
+        makeAction("Cole Palmer", "goal", 45, added=3),
+        makeAction("Cole Palmer", "goal", 44)))
+
+    assert [e.action._actiontime for e in late] == [44, 45]
+    assert kinds(timeline) == [("period", "HALFTIME"),
+                               ("period", "SECONDHALF"),
+                               ("goal", "Cole Palmer"),
+                               ("goal", "Cole Palmer")]
+    assert timeline.since(last) == late
+    assert timeline.since(timeline.seq) == []
+
+
+def test_new_match_carries_on_the_sequence():
+    timeline = Timeline()
+    timeline.addActions(True, records(makeAction("Bukayo Saka", "goal", 80)))
+    timeline.addPeriod("FULLTIME")
+    timeline.newMatch()
+    timeline.addActions(True, records(makeAction("Bukayo Saka", "goal", 80)))
+
+    assert [e.seq for e in timeline] == [1, 2, 3]
+
+
+def test_oldest_events_are_dropped():
+    timeline = Timeline(maxlen=2)
+    timeline.addPeriod("HALFTIME")
+    timeline.addActions(True, records(makeAction("Bukayo Saka", "goal", 50)))
+    timeline.addPeriod("FULLTIME")
+
+    assert kinds(timeline) == [("goal", "Bukayo Saka"),
+                               ("period", "FULLTIME")]
+    assert timeline.first == 2
+    assert [e.seq for e in timeline.since(0)] == [2, 3]
+    assert [e.seq for e in timeline.since(2)] == [3]
+
+
+def test_match_timeline_with_late_detail():
+    def event(period, actions=None, score=0):
+        return makeEvent("1", makeTeam("Arsenal", score, actions),
+                         makeTeam("Chelsea", 0, []), period=period)
+
+    match = FootballMatch("Arsenal", data=event("FIRSTHALF", actions=[]))
+
+    # Lightweight data has the score but not the scorer
+    match.update(data=event("FIRSTHALF", score=1))
+    match.update(data=event("HALFTIME", score=1))
+    last = match.timeline.seq
+
+    scorer = makeAction("Bukayo Saka", "goal", 44)
+    match.update(data=event("HALFTIME", actions=[scorer], score=1))
+
+    assert kinds(match.timeline) == [("period", "HALFTIME"),
+                                     ("goal", "Bukayo Saka")]
+    assert [e.eventType for e in match.timeline.since(last)] == ["goal"]
@@ -0,0 +1,97 @@
+import pytest
+
+pytest.importorskip("libqtile")
+
+from livefootballscores import LiveFootballScoresWidget  # noqa: E402
+
+
+class FakeLayout(object):
+
+    def __init__(self, text):
+        self.text = text
+        self.width = 10 * len(text)
+        self.height = 10
+        self.finalized = False
+
+    def finalize(self):
+        self.finalized = True
+
+
+class FakeDrawer(object):
+
+    def __init__(self):
+        self.created = []
+
+    def textlayout(self, text, colour, font, fontsize, fontshadow,
+                   wrap=True):
+        layout = FakeLayout(text)
+        self.created.append(layout)
+        return layout
+
+
+@pytest.fixture
+def widget():
+    widget = LiveFootballScoresWidget(layout_cache_size=2)
+    widget.drawer = FakeDrawer()
+    return widget
+
+
+def test_layout_is_reused(widget):
+    layout, width = widget.get_layout("Arsenal 1-0 Chelsea")
+
+    assert widget.get_layout("Arsenal 1-0 Chelsea") == (layout, width)
+    assert width == layout.width
+    assert len(widget.drawer.created) == 1
+
+    # A different colour needs its own layout
+    widget.font_colour = "ff0000"
+    assert widget.get_layout("Arsenal 1-0 Chelsea")[0] is not layout
+
+
+def test_least_recently_used_layout_is_finalized(widget):
+    first, _ = widget.get_layout("first")
+    second, _ = widget.get_layout("second")
+
+    # Using the first layout again means the second is the oldest
+    widget.get_layout("first")
+    third, _ = widget.get_layout("third")
+
+    assert second.finalized
+    assert not first.finalized and not third.finalized
+    assert [k[0] for k in widget.layouts] == ["first", "third"]
+
+    # An evicted layout is created again when it's needed
+    assert widget.get_layout("second")[0] is not second
+
+
+def test_clear_layouts_finalizes_them_all(widget):
+    layouts = [widget.get_layout(t)[0] for t in ("first", "second")]
+
+    widget.clear_layouts()
+
+    assert all(layout.finalized for layout in layouts)
+    assert not widget.layouts
+
+
+def test_cmd_stats(widget):
+    from livefootballscores.footballscores import MatchCoordinator
+    from livefootballscores.footballscores.stats import (getMetrics,
+                                                         resetStats)
+
+    resetStats()
+    getMetrics().incr("requests.teampage")
+    widget.get_layout("Arsenal 1-0 Chelsea")
+
+    stats = widget.cmd_stats()
+
+    assert stats["counters"] == {"requests.teampage": 1}
+    assert {"timings", "pool", "cache", "breaker"} <= set(stats)
+    assert stats["layouts"] == 1
+    assert stats["stale"] == []
+
+    widget.coordinator = MatchCoordinator()
+    arsenal = widget.coordinator.addTeam("Arsenal")
+    widget.coordinator.addTeam("Chelsea")
+    widget.coordinator._stale.add(id(arsenal))
+
+    assert widget.cmd_stats()["stale"] == [repr(arsenal)]